@@ -0,0 +1,143 @@
+from __future__ import annotations
+import hashlib, json, mmap, os, threading, time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+from .paths import data_dir
+from .model_inventory import is_ollama_blob, ollama_models_root
+
+_CHUNK = 64 * 1024 * 1024      # bytes fed to hashlib per update; hashlib drops the GIL while hashing
+
+def verify_cache_path() -> Path:
+    return data_dir() / "blob_verify.json"
+
+@dataclass
+class VerifyReport:
+    files: int = 0
+    skipped: int = 0               # unchanged since a previous run (result cache / checkpoint)
+    verified: int = 0
+    bytes_hashed: int = 0
+    corrupt: List[str] = field(default_factory=list)
+    errors: List[str] = field(default_factory=list)
+    cancelled: bool = False
+    elapsed_s: float = 0.0
+
+    @property
+    def gbps(self) -> float:
+        return self.bytes_hashed / 1e9 / self.elapsed_s if self.elapsed_s > 0 else 0.0
+
+    def summary(self) -> str:
+        return (f"{self.verified} verified, {self.skipped} unchanged, {len(self.corrupt)} corrupt, "
+                f"{self.bytes_hashed / 1e9:.2f} GB at {self.gbps:.2f} GB/s"
+                + (" (cancelled; resumes next run)" if self.cancelled else ""))
+
+def _read_cache() -> Dict:
+    try:
+        return json.loads(verify_cache_path().read_text(encoding="utf-8"))
+    except Exception:
+        return {"schema": 1, "blobs": {}}
+
+def _write_cache(data: Dict) -> None:
+    p = verify_cache_path()
+    try:
+        p.parent.mkdir(parents=True, exist_ok=True)
+        tmp = p.with_suffix(f".{os.getpid()}.tmp")
+        tmp.write_text(json.dumps(data, separators=(",", ":")), encoding="utf-8")
+        os.replace(tmp, p)
+    except Exception:
+        pass
+
+def sha256_file(path: str | Path, stop: Optional[threading.Event] = None,
+                on_bytes: Optional[Callable[[int], None]] = None) -> Optional[str]:
+    """sha256 of a file over a read-only mmap, in chunks. Returns None when stopped."""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if size == 0:
+            return h.hexdigest()
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            try: mm.madvise(mmap.MADV_SEQUENTIAL)
+            except Exception: pass
+            view = memoryview(mm)
+            try:
+                for off in range(0, size, _CHUNK):
+                    if stop is not None and stop.is_set():
+                        return None
+                    chunk = view[off:off + _CHUNK]
+                    h.update(chunk)
+                    if on_bytes: on_bytes(len(chunk))
+                    chunk.release()
+            finally:
+                view.release()
+    return h.hexdigest()
+
+def verify_blobs(config: Dict | None = None, *, root: Path | None = None, workers: Optional[int] = None,
+                 force: bool = False, checkpoint_s: float = 5.0,
+                 progress: Optional[Callable[[int, int], None]] = None,
+                 stop: Optional[threading.Event] = None) -> VerifyReport:
+    """
+    Check every Ollama blob (blobs/sha256-<hex>) against the digest in its name.
+      • a thread pool hashes several blobs at once (mmap + chunked hashlib)
+      • results are cached by size+mtime in data_dir()/blob_verify.json and written at least
+        every `checkpoint_s` seconds, so an interrupted run resumes where it stopped and later
+        runs only hash new or changed blobs (force=True re-hashes all)
+      • progress(done_bytes, total_bytes) is called from worker threads
+    A single blob cannot be resumed mid-file (hashlib state is not serialisable); its
+    checkpoint granularity is the whole file.
+    """
+    t0 = time.perf_counter()
+    rep = VerifyReport()
+    blob_dir = (root or ollama_models_root(config)) / "blobs"
+    cache = _read_cache()
+    known: Dict[str, Dict] = cache.setdefault("blobs", {})
+    todo = []
+    if blob_dir.is_dir():
+        with os.scandir(blob_dir) as it:
+            for e in it:
+                if not (is_ollama_blob(e.name) and e.is_file()):
+                    continue
+                rep.files += 1
+                st = e.stat()
+                ent = known.get(e.name)
+                if not force and ent and ent.get("size") == st.st_size and ent.get("mtime_ns") == st.st_mtime_ns:
+                    rep.skipped += 1
+                    if not ent.get("ok"): rep.corrupt.append(e.path)
+                    continue
+                todo.append((e.path, e.name, st))
+    # biggest first so the long hashes overlap with the many small ones
+    todo.sort(key=lambda t: -t[2].st_size)
+    total = sum(st.st_size for _, _, st in todo)
+    lock = threading.Lock()
+    done = [0]; last_cp = [time.monotonic()]
+
+    def bump(n: int) -> None:
+        with lock:
+            done[0] += n; d = done[0]
+        if progress: progress(d, total)
+
+    def work(item):
+        path, name, st = item
+        return path, name, st, sha256_file(path, stop, bump)
+
+    names = {e for e in os.listdir(blob_dir)} if blob_dir.is_dir() else set()
+    with ThreadPoolExecutor(max_workers=workers or min(8, os.cpu_count() or 2), thread_name_prefix="blob-verify") as ex:
+        futs = [ex.submit(work, t) for t in todo]
+        for fut in as_completed(futs):
+            try:
+                path, name, st, digest = fut.result()
+            except Exception as e:
+                rep.errors.append(str(e)); continue
+            if digest is None:
+                rep.cancelled = True; continue
+            ok = digest == name.split("-", 1)[1]
+            rep.verified += 1; rep.bytes_hashed += st.st_size
+            if not ok: rep.corrupt.append(path)
+            with lock:
+                known[name] = {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "ok": ok, "checked": time.time()}
+                if time.monotonic() - last_cp[0] >= checkpoint_s:
+                    last_cp[0] = time.monotonic(); _write_cache(cache)
+    cache["blobs"] = {k: v for k, v in known.items() if k in names}
+    _write_cache(cache)
+    rep.elapsed_s = time.perf_counter() - t0
+    return rep
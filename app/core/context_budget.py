@@ -0,0 +1,186 @@
+from __future__ import annotations
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple
+
+STRATEGIES = ("sliding", "pinned_system", "summarize")
+
+_MSG_OVERHEAD = 4      # role/template tokens the chat template adds per message
+
+def context_window(meta: Optional[Dict], max_window: int = 0) -> Optional[int]:
+    """
+    Tokens a model attends to, from model_meta: the Modelfile's num_ctx, else its trained
+    context_length capped at max_window (0 = no cap; long windows cost KV-cache memory).
+    None when the metadata is missing.
+    """
+    if not meta:
+        return None
+    if meta.get("num_ctx"):
+        return int(meta["num_ctx"])
+    n = meta.get("context_length")
+    if not n:
+        return None
+    return min(int(n), max_window) if max_window > 0 else int(n)
+
+class TokenEstimator:
+    """
+    Cheap token estimate (~4 chars/token) cached per message content.
+    Assistant messages that carry the server's eval_count use that exact number instead.
+    """
+    def __init__(self, max_entries: int = 4096):
+        self._cache: "OrderedDict[Tuple[str, int, int], int]" = OrderedDict()
+        self._max = max_entries
+
+    def count(self, msg: Dict) -> int:
+        exact = msg.get("eval_count") if msg.get("role") == "assistant" else None
+        if isinstance(exact, int):
+            return exact + _MSG_OVERHEAD
+        content = msg.get("content") or ""
+        key = (msg.get("role") or "", len(content), hash(content))
+        n = self._cache.get(key)
+        if n is None:
+            n = (len(content) + 3) // 4 + _MSG_OVERHEAD
+            self._cache[key] = n
+            if len(self._cache) > self._max:
+                self._cache.popitem(last=False)
+        else:
+            self._cache.move_to_end(key)
+        return n
+
+class ContextBudgeter:
+    """
+    Picks which stored messages are sent with the next /api/chat turn.
+      • sliding        newest messages that fit the budget
+      • pinned_system  system messages always kept, then the newest messages
+      • summarize      pinned_system + a rolling summary of everything that fell out of the
+                       window, written in the background by a cheaper model
+    The window start only moves forward, and when it moves it drops down to `low_water` of
+    the budget. So the prefix sent to the server stays the same for many turns and the
+    server can reuse its KV cache instead of re-prefilling.
+    """
+    def __init__(self, budget: int = 4096, *, strategy: str = "pinned_system",
+                 reserve: int = 512, low_water: float = 0.7, max_window: int = 32768,
+                 summarizer: Optional[Callable[[str], Optional[str]]] = None,
+                 summary_chunk: int = 8):
+        self.budget = max(256, int(budget))           # fallback when the model's window is unknown
+        self.max_window = max(0, int(max_window))
+        self.strategy = strategy if strategy in STRATEGIES else "pinned_system"
+        self.reserve = max(0, int(reserve))          # room left for the reply
+        self.low_water = min(0.95, max(0.1, float(low_water)))
+        self.summarizer = summarizer                  # text -> summary (runs on a worker thread)
+        self.summary_chunk = max(1, int(summary_chunk))
+        self.tokens = TokenEstimator()
+        self._start: Dict[str, int] = {}              # conv -> index of first windowed message
+        self._windows: Dict[str, int] = {}            # conv -> budget the window start was chosen for
+        self._summaries: Dict[str, Tuple[int, str]] = {}   # conv -> (messages covered, summary)
+        self._busy: set = set()
+        self._lock = threading.Lock()
+
+    def estimate(self, messages: List[Dict]) -> int:
+        return sum(self.tokens.count(m) for m in messages)
+
+    def window_for(self, meta: Optional[Dict]) -> int:
+        """Token budget for a model: its context window (see context_window), else `budget`."""
+        return max(256, context_window(meta, self.max_window) or self.budget)
+
+    def select(self, messages: List[Dict], conv: str = "", *, window: Optional[int] = None) -> List[Dict]:
+        """window: the model's context size in tokens (window_for); defaults to `budget`."""
+        budget = max(256, int(window or self.budget))
+        with self._lock:
+            if self._windows.get(conv) != budget:
+                self._windows[conv] = budget; self._start.pop(conv, None)   # other model: re-fit from scratch
+        limit = budget - self.reserve
+        pinned: List[Dict] = []
+        body = list(enumerate(messages))
+        if self.strategy in ("pinned_system", "summarize"):
+            pinned = [m for m in messages if m.get("role") == "system"]
+            body = [(i, m) for i, m in body if m.get("role") != "system"]
+        avail = limit - self.estimate(pinned)
+
+        summary_msg: Optional[Dict] = None
+        if self.strategy == "summarize":
+            with self._lock:
+                covered, text = self._summaries.get(conv, (0, ""))
+            if text:
+                summary_msg = {"role": "system", "content": f"Summary of the earlier conversation:\n{text}"}
+                avail -= self.tokens.count(summary_msg)
+
+        start = self._window_start(conv, body, avail)
+        window = [m for i, m in body if i >= start]
+        if self.strategy == "summarize":
+            dropped = [m for i, m in body if i < start]
+            self._maybe_summarize(conv, dropped)
+            if summary_msg is not None and covered > 0:
+                return pinned + [summary_msg] + window
+        return pinned + window
+
+    def _window_start(self, conv: str, body: List[Tuple[int, Dict]], avail: int) -> int:
+        with self._lock:
+            start = self._start.get(conv, 0)
+        costs = [(i, self.tokens.count(m)) for i, m in body]
+        total = sum(c for i, c in costs if i >= start)
+        if total > avail:
+            # overflow: advance to low water so the next several turns share this prefix
+            target = int(avail * self.low_water)
+            for i, c in costs:
+                if i < start:
+                    continue
+                if total <= target:
+                    break
+                total -= c; start = i + 1
+            # never drop the newest message, even when it alone is over budget
+            if body and start > body[-1][0]:
+                start = body[-1][0]
+        with self._lock:
+            self._start[conv] = start
+        return start
+
+    def _maybe_summarize(self, conv: str, dropped: List[Dict]) -> None:
+        """Fold newly dropped messages into the rolling summary, a chunk at a time."""
+        upto = len(dropped)
+        if not self.summarizer or not upto:
+            return
+        with self._lock:
+            covered, prev = self._summaries.get(conv, (0, ""))
+            if covered > upto:
+                covered, prev = 0, ""     # history was rewritten; start over
+            if conv in self._busy or upto - covered < min(self.summary_chunk, upto):
+                return
+            self._busy.add(conv)
+        new = dropped[covered:]
+        lines = [f"{m.get('role')}: {m.get('content')}" for m in new]
+        text = ((f"Previous summary:\n{prev}\n\n" if prev else "") +
+                "Summarize the following conversation turns concisely, keeping facts, names, "
+                "decisions and open questions:\n\n" + "\n".join(lines))
+
+        def work():
+            try:
+                out = self.summarizer(text)
+                if out:
+                    with self._lock:
+                        self._summaries[conv] = (upto, out.strip())
+            except Exception:
+                pass
+            finally:
+                with self._lock:
+                    self._busy.discard(conv)
+        threading.Thread(target=work, name="ctx-summarize", daemon=True).start()
+
+    def forget(self, conv: str) -> None:
+        with self._lock:
+            self._start.pop(conv, None); self._summaries.pop(conv, None); self._windows.pop(conv, None)
+
+def budgeter_from_config(config: Dict | None) -> ContextBudgeter:
+    """Build from settings['context']; the summarizer calls the (cheaper) summary_model via Ollama."""
+    sect = (config or {}).get("context", {}) if isinstance(config, dict) else {}
+    summarizer = None
+    model = (sect.get("summary_model") or "").strip()
+    if model:
+        from .ollama_tools import prompt
+        def summarizer(text: str) -> Optional[str]:
+            ok, out = prompt(model, text, config=config, timeout=300)
+            return out if ok else None
+    return ContextBudgeter(int(sect.get("budget", 4096)), strategy=sect.get("strategy", "pinned_system"),
+                           reserve=int(sect.get("reserve", 512)), low_water=float(sect.get("low_water", 0.7)),
+                           max_window=int(sect.get("max_window", 32768) or 0),
+                           summarizer=summarizer)
@@ -0,0 +1,195 @@
+from __future__ import annotations
+import json, sqlite3, threading, time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS conversations (
+    name        TEXT PRIMARY KEY,
+    model       TEXT,
+    meta        TEXT NOT NULL DEFAULT '{}',
+    created     REAL NOT NULL,
+    updated     REAL NOT NULL,
+    n_messages  INTEGER NOT NULL DEFAULT 0,
+    tokens      INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS conversations_updated ON conversations(updated);
+CREATE INDEX IF NOT EXISTS conversations_model   ON conversations(model);
+CREATE TABLE IF NOT EXISTS messages (
+    id       INTEGER PRIMARY KEY,
+    conv     TEXT NOT NULL REFERENCES conversations(name) ON DELETE CASCADE,
+    seq      INTEGER NOT NULL,
+    role     TEXT,
+    content  TEXT NOT NULL DEFAULT '',
+    tokens   INTEGER NOT NULL DEFAULT 0,
+    created  REAL NOT NULL,
+    extra    TEXT
+);
+CREATE UNIQUE INDEX IF NOT EXISTS messages_conv_seq ON messages(conv, seq);
+"""
+
+_FTS = """
+CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts USING fts5(content, content='messages', content_rowid='id');
+CREATE TRIGGER IF NOT EXISTS messages_ai AFTER INSERT ON messages BEGIN
+    INSERT INTO messages_fts(rowid, content) VALUES (new.id, new.content);
+END;
+CREATE TRIGGER IF NOT EXISTS messages_ad AFTER DELETE ON messages BEGIN
+    INSERT INTO messages_fts(messages_fts, rowid, content) VALUES ('delete', old.id, old.content);
+END;
+"""
+
+def _tokens(msg: Dict) -> int:
+    """Server-reported count when present, else a cheap ~4 chars/token estimate."""
+    for k in ("tokens", "eval_count"):
+        v = msg.get(k)
+        if isinstance(v, int):
+            return v
+    return (len(msg.get("content") or "") + 3) // 4
+
+class ConversationDB:
+    """
+    SQLite conversation store (WAL): one row per message, FTS5 index over content,
+    indexed metadata (model, created/updated, message and token counts).
+    Mirrors the file API in ollama_tools: list/load/save/append/update_meta (+ search).
+    One connection shared across threads, serialised by a lock.
+    """
+    def __init__(self, path: Path | str):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.RLock()
+        self._db = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute("PRAGMA foreign_keys=ON")
+        self._db.executescript(_SCHEMA)
+        try:
+            self._db.executescript(_FTS)
+            self.has_fts = True
+        except sqlite3.OperationalError:
+            self.has_fts = False    # sqlite built without FTS5: search falls back to LIKE
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+    def is_empty(self) -> bool:
+        with self._lock:
+            return self._db.execute("SELECT 1 FROM conversations LIMIT 1").fetchone() is None
+
+    # ----- reads -----
+    def list(self) -> List[str]:
+        with self._lock:
+            return [r[0] for r in self._db.execute("SELECT name FROM conversations ORDER BY name")]
+
+    def list_info(self, order: str = "updated") -> List[Dict]:
+        col = order if order in ("name", "updated", "created", "n_messages", "tokens") else "updated"
+        desc = "" if col == "name" else " DESC"
+        with self._lock:
+            rows = self._db.execute(
+                f"SELECT name, model, created, updated, n_messages, tokens FROM conversations ORDER BY {col}{desc}")
+            return [dict(r) for r in rows]
+
+    def load(self, name: str) -> Optional[Dict]:
+        with self._lock:
+            row = self._db.execute("SELECT meta FROM conversations WHERE name=?", (name,)).fetchone()
+            if row is None:
+                return None
+            data = json.loads(row["meta"] or "{}")
+            msgs = []
+            for r in self._db.execute("SELECT role, content, extra FROM messages WHERE conv=? ORDER BY seq", (name,)):
+                m = json.loads(r["extra"]) if r["extra"] else {}
+                m["role"] = r["role"]; m["content"] = r["content"]
+                msgs.append(m)
+        data["messages"] = msgs
+        return data
+
+    def search(self, query: str, limit: int = 50) -> List[Dict]:
+        """Full-text search over message content → [{conv, seq, role, snippet}], best first."""
+        q = (query or "").strip()
+        if not q:
+            return []
+        with self._lock:
+            if self.has_fts:
+                fts_q = " ".join('"' + t.replace('"', '""') + '"' for t in q.split())
+                rows = self._db.execute(
+                    "SELECT m.conv, m.seq, m.role, snippet(messages_fts, 0, '[', ']', '…', 12) AS snippet "
+                    "FROM messages_fts JOIN messages m ON m.id = messages_fts.rowid "
+                    "WHERE messages_fts MATCH ? ORDER BY rank LIMIT ?", (fts_q, limit))
+            else:
+                rows = self._db.execute(
+                    "SELECT conv, seq, role, substr(content, 1, 120) AS snippet FROM messages "
+                    "WHERE content LIKE ? ORDER BY conv, seq LIMIT ?", (f"%{q}%", limit))
+            return [dict(r) for r in rows]
+
+    # ----- writes -----
+    def _ensure(self, name: str, now: float) -> None:
+        self._db.execute("INSERT OR IGNORE INTO conversations(name, meta, created, updated) VALUES (?, ?, ?, ?)",
+                         (name, json.dumps({"id": name}), now, now))
+
+    def _insert_messages(self, name: str, msgs: List[Dict], first_seq: int, now: float) -> int:
+        tok = 0
+        rows = []
+        for i, m in enumerate(msgs):
+            t = _tokens(m); tok += t
+            extra = {k: v for k, v in m.items() if k not in ("role", "content")}
+            rows.append((name, first_seq + i, m.get("role"), m.get("content") or "", t, now,
+                         json.dumps(extra, ensure_ascii=False) if extra else None))
+        self._db.executemany(
+            "INSERT INTO messages(conv, seq, role, content, tokens, created, extra) VALUES (?,?,?,?,?,?,?)", rows)
+        return tok
+
+    def save(self, name: str, data: Dict) -> None:
+        meta = {k: v for k, v in data.items() if k != "messages"}
+        msgs = data.get("messages") or []
+        now = time.time()
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                self._ensure(name, now)
+                self._db.execute("DELETE FROM messages WHERE conv=?", (name,))
+                tok = self._insert_messages(name, msgs, 0, now)
+                self._db.execute("UPDATE conversations SET model=?, meta=?, updated=?, n_messages=?, tokens=? WHERE name=?",
+                                 (meta.get("model"), json.dumps(meta, ensure_ascii=False), now, len(msgs), tok, name))
+                self._db.execute("COMMIT")
+            except Exception:
+                self._db.execute("ROLLBACK"); raise
+
+    def append(self, name: str, messages: List[Dict], meta: Optional[Dict] = None) -> None:
+        now = time.time()
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                self._ensure(name, now)
+                if meta:
+                    self._merge_meta(name, meta)
+                row = self._db.execute("SELECT n_messages FROM conversations WHERE name=?", (name,)).fetchone()
+                tok = self._insert_messages(name, messages, row[0], now)
+                self._db.execute("UPDATE conversations SET updated=?, n_messages=n_messages+?, tokens=tokens+? WHERE name=?",
+                                 (now, len(messages), tok, name))
+                self._db.execute("COMMIT")
+            except Exception:
+                self._db.execute("ROLLBACK"); raise
+
+    def update_meta(self, name: str, fields: Dict) -> None:
+        now = time.time()
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                self._ensure(name, now)
+                self._merge_meta(name, fields)
+                self._db.execute("UPDATE conversations SET updated=? WHERE name=?", (now, name))
+                self._db.execute("COMMIT")
+            except Exception:
+                self._db.execute("ROLLBACK"); raise
+
+    def _merge_meta(self, name: str, fields: Dict) -> None:
+        row = self._db.execute("SELECT meta FROM conversations WHERE name=?", (name,)).fetchone()
+        meta = json.loads(row[0] or "{}") if row else {}
+        meta.update({k: v for k, v in fields.items() if k != "messages"})
+        self._db.execute("UPDATE conversations SET meta=?, model=? WHERE name=?",
+                         (json.dumps(meta, ensure_ascii=False), meta.get("model"), name))
+
+    def delete(self, name: str) -> None:
+        with self._lock:
+            self._db.execute("DELETE FROM conversations WHERE name=?", (name,))
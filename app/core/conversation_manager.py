@@ -0,0 +1,182 @@
+from __future__ import annotations
+import atexit, copy, threading, time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+from . import ollama_tools as store
+from . import crash_guard
+
+class ConversationManager:
+    """
+    In-memory front for the conversation store (ollama_tools list/load/save/append).
+      • reads: LRU of recently used conversations → no disk I/O on the hot path
+      • writes: applied to the cached copy immediately, queued, and persisted by a
+        background thread at most `flush_delay` seconds later (write-behind)
+      • flush(): synchronous drain; called on close, at exit and from crash_guard's hook
+    """
+    def __init__(self, capacity: int = 16, flush_delay: float = 0.5):
+        self.capacity = max(1, capacity)
+        self.flush_delay = flush_delay
+        self._cache: "OrderedDict[str, Dict]" = OrderedDict()
+        self._names: Optional[set] = None
+        self._pending: "OrderedDict[str, List[Tuple]]" = OrderedDict()   # name -> ops, oldest dirty first
+        self._dirty_since: Dict[str, float] = {}
+        self._failures: Dict[str, int] = {}   # consecutive failed writes per conversation (retry backoff)
+        self._lock = threading.RLock()
+        self._io_lock = threading.Lock()      # one writer at a time (worker or flush())
+        self._cv = threading.Condition(self._lock)
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="conv-writer", daemon=True)
+        self._thread.start()
+        atexit.register(self.flush)
+        crash_guard.on_crash(self.flush)
+
+    # ----- reads -----
+    def get(self, name: str) -> Dict:
+        """Cached conversation dict. Treat it as read-only; mutate through append/update_meta/save."""
+        with self._lock:
+            data = self._cache.get(name)
+            if data is not None:
+                self._cache.move_to_end(name)
+                return data
+        data = store.load_conversation(name)     # miss: one disk read, outside the lock
+        with self._lock:
+            data = self._cache.setdefault(name, data)
+            self._cache.move_to_end(name)
+            self._evict()
+            return data
+
+    def names(self) -> List[str]:
+        with self._lock:
+            if self._names is None:
+                self._names = set(store.list_conversations())
+            return sorted(self._names | set(self._cache))
+
+    # ----- writes (never block on disk) -----
+    def append(self, name: str, message: Dict, *, meta: Optional[Dict] = None) -> None:
+        data = self.get(name)
+        with self._lock:
+            if meta: data.update(meta)
+            data.setdefault("messages", []).append(message)
+            self._queue(name, ("append", message, dict(meta) if meta else None))
+
+    def update_meta(self, name: str, **fields) -> None:
+        if not fields:
+            return
+        data = self.get(name)
+        with self._lock:
+            data.update(fields)
+            self._queue(name, ("meta", fields))
+
+    def save(self, name: str, data: Dict) -> None:
+        with self._lock:
+            self._cache[name] = data; self._cache.move_to_end(name)
+            self._pending.pop(name, None)          # a full save supersedes queued ops
+            self._queue(name, ("save",))
+            self._evict()
+
+    def _queue(self, name: str, op: Tuple) -> None:
+        if self._names is not None:
+            self._names.add(name)
+        self._pending.setdefault(name, []).append(op)
+        self._dirty_since.setdefault(name, time.monotonic())
+        self._cv.notify()
+
+    def _evict(self) -> None:
+        # dirty entries stay until written so the cached copy remains the source of truth
+        while len(self._cache) > self.capacity:
+            victim = next((k for k in self._cache if k not in self._pending), None)
+            if victim is None:
+                break
+            del self._cache[victim]
+
+    # ----- persistence -----
+    def _take(self, only_due: bool) -> List[Tuple[str, List[Tuple], Dict]]:
+        now = time.monotonic()
+        batch = []
+        for name in list(self._pending):
+            if only_due and now - self._dirty_since.get(name, now) < self.flush_delay:
+                continue
+            ops = self._pending.pop(name); self._dirty_since.pop(name, None)
+            snapshot = copy.deepcopy(self._cache.get(name)) if any(o[0] == "save" for o in ops) else {}
+            batch.append((name, ops, snapshot))
+        return batch
+
+    def _write(self, batch: List[Tuple[str, List[Tuple], Dict]]) -> List[Tuple[str, List[Tuple], Exception]]:
+        """Persist a batch; returns (name, ops not yet written, error) for the entries that failed."""
+        failed = []
+        for name, ops, snapshot in batch:
+            done = 0
+            try:
+                if any(op[0] == "save" for op in ops):
+                    # the snapshot already includes every later append/meta op
+                    store.save_conversation(name, snapshot); continue
+                for op in ops:
+                    if op[0] == "append":
+                        store.append_message(name, op[1], meta=op[2])
+                    elif op[0] == "meta":
+                        store.update_conversation_meta(name, **op[1])
+                    done += 1
+            except Exception as e:
+                failed.append((name, ops[done:], e))
+        return failed
+
+    def _requeue(self, failed: List[Tuple[str, List[Tuple], Exception]]) -> None:
+        """Put failed ops back in front of anything queued since, retried with backoff (max 30 s)."""
+        with self._lock:
+            for name, ops, err in failed:
+                n = self._failures[name] = self._failures.get(name, 0) + 1
+                delay = min(30.0, self.flush_delay * 2 ** n)
+                crash_guard.log("CONV", f"write of '{name}' failed ({err}); retrying in {delay:.1f} s")
+                self._pending[name] = ops + self._pending.get(name, [])
+                self._pending.move_to_end(name, last=False)
+                # due again once `delay` has passed (due = dirty for flush_delay)
+                self._dirty_since[name] = time.monotonic() + delay - self.flush_delay
+            self._cv.notify()
+
+    def _persist(self, batch: List[Tuple[str, List[Tuple], Dict]]) -> List[Tuple[str, List[Tuple], Exception]]:
+        failed = self._write(batch)
+        if failed:
+            self._requeue(failed)
+        with self._lock:
+            bad = {f[0] for f in failed}
+            for name, _, _ in batch:
+                if name not in bad: self._failures.pop(name, None)
+        return failed
+
+    def _run(self) -> None:
+        while True:
+            with self._lock:
+                while not self._pending and not self._closed:
+                    self._cv.wait()
+                if self._closed and not self._pending:
+                    return
+                oldest = min(self._dirty_since.values(), default=time.monotonic())
+                wait = self.flush_delay - (time.monotonic() - oldest)
+                if wait > 0 and not self._closed:
+                    self._cv.wait(wait)
+            with self._io_lock:
+                with self._lock:
+                    batch = self._take(only_due=not self._closed or bool(self._failures))
+                self._persist(batch)
+                if self._closed and self._pending and not batch:
+                    return     # closed with writes that keep failing; flush() reported them
+
+    def flush(self) -> None:
+        """Write everything pending now, on the calling thread (one immediate retry on failure)."""
+        with self._io_lock:
+            for attempt in range(2):
+                with self._lock:
+                    batch = self._take(only_due=False)
+                if not self._persist(batch):
+                    return
+            with self._lock:
+                left = list(self._pending)
+        if left:
+            crash_guard.log("CONV", f"not saved yet: {', '.join(left)}")
+
+    def close(self) -> None:
+        self.flush()
+        store.sync_conversation_logs()
+        with self._lock:
+            self._closed = True; self._cv.notify()
+        self._thread.join(2.0)
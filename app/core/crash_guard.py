@@ -12,9 +12,22 @@ def _write_log(prefix: str, msg: str):
     except Exception:
         pass
 
+_ON_CRASH: list = []
+
+def log(prefix: str, msg: str) -> None:
+    """Append a line to the app log (same file as crash reports)."""
+    _write_log(prefix, msg)
+
+def on_crash(fn) -> None:
+    """Run fn() (best effort) when an unhandled exception reaches the hook, before it is reported."""
+    _ON_CRASH.append(fn)
+
 def install():
     # 1) Python exceptions
     def excepthook(exc_type, exc, tb):
+        for fn in list(_ON_CRASH):
+            try: fn()
+            except Exception: pass
         details = "".join(traceback.format_exception(exc_type, exc, tb))
         _write_log("EXC", details)
         try:
@@ -0,0 +1,155 @@
+from __future__ import annotations
+import json, os, subprocess, time
+from typing import Any, Dict, List, Optional
+from .runtime_host import RuntimeHostError, RuntimeWorker
+from .venv_tools import _imports_for, _pybin
+
+# Runs inside the venv interpreter. It imports the venv's modules once, then forks one
+# child per "call" job, so children inherit the warm module state copy-on-write. The
+# parent stays single-threaded and multiplexes stdin and the child result pipes with
+# select. That avoids forking while other threads hold locks.
+_FORK_CODE = r"""
+import sys, os, json, struct, time, importlib, traceback, select
+HDR = struct.Struct(">I")
+proto_out = os.fdopen(os.dup(1), "wb", buffering=0)
+os.dup2(2, 1); sys.stdout = sys.stderr
+IN = sys.stdin.fileno()
+cfg = json.loads(sys.argv[1]) if len(sys.argv) > 1 else {}
+def send(obj):
+    data = json.dumps(obj, default=repr).encode("utf-8")
+    proto_out.write(HDR.pack(len(data)) + data)
+t0 = time.perf_counter(); failed = {}
+for m in cfg.get("preload", []):
+    try: importlib.import_module(m)
+    except Exception as e: failed[m] = repr(e)
+preload_s = round(time.perf_counter() - t0, 4)
+started = time.time(); stats = {"jobs": 0, "fork_ms": 0.0}
+def resolve(target):
+    mod, _, attr = target.partition(":")
+    obj = importlib.import_module(mod)
+    for part in filter(None, attr.split(".")):
+        obj = getattr(obj, part)
+    return obj
+def child(req, w, t_fork):
+    fork_ms = (time.monotonic() - t_fork) * 1000.0
+    os.close(IN)
+    t1 = time.perf_counter()
+    try:
+        p = req.get("params") or {}
+        value = resolve(p["target"])(*p.get("args", []), **p.get("kwargs", {}))
+        out = {"result": {"value": value, "fork_ms": round(fork_ms, 3), "pid": os.getpid(),
+                          "run_s": round(time.perf_counter() - t1, 4)}}
+    except BaseException as e:
+        out = {"error": f"{type(e).__name__}: {e}", "trace": traceback.format_exc()}
+    data = json.dumps(out, default=repr).encode("utf-8")
+    while data:
+        data = data[os.write(w, data):]
+    os._exit(0)
+children = {}   # read fd -> [request id, pid, chunks]
+def spawn(req):
+    r, w = os.pipe()
+    t_fork = time.monotonic()
+    pid = os.fork()
+    if pid == 0:
+        os.close(r)
+        for fd in children: os.close(fd)
+        child(req, w, t_fork)
+    os.close(w)
+    children[r] = [req.get("id"), pid, []]
+def reap(fd):
+    rid, pid, chunks = children.pop(fd)
+    os.close(fd)
+    _, status = os.waitpid(pid, 0)
+    try:
+        msg = json.loads(b"".join(chunks).decode("utf-8"))
+    except Exception:
+        msg = {"error": f"job process {pid} died (status {status})"}
+    if "result" in msg:
+        stats["jobs"] += 1; stats["fork_ms"] += msg["result"]["fork_ms"]
+    msg["id"] = rid
+    send(msg)
+send({"id": 0, "result": {"ready": True, "pid": os.getpid(), "preload_s": preload_s}})
+buf = b""
+while True:
+    ready, _, _ = select.select([IN] + list(children), [], [])
+    for fd in ready:
+        if fd != IN:
+            chunk = os.read(fd, 65536)
+            if chunk: children[fd][2].append(chunk)
+            else: reap(fd)
+            continue
+        chunk = os.read(IN, 65536)
+        if not chunk:
+            os._exit(0)
+        buf += chunk
+        while len(buf) >= HDR.size and len(buf) >= HDR.size + HDR.unpack(buf[:HDR.size])[0]:
+            n = HDR.unpack(buf[:HDR.size])[0]
+            req = json.loads(buf[HDR.size:HDR.size + n].decode("utf-8")); buf = buf[HDR.size + n:]
+            m = req.get("method")
+            if m == "shutdown":
+                send({"id": req.get("id"), "result": True}); os._exit(0)
+            elif m == "ping":
+                send({"id": req.get("id"), "result": {
+                    "pid": os.getpid(), "uptime": round(time.time() - started, 3), "jobs": stats["jobs"],
+                    "running": len(children), "preload_s": preload_s, "preload_failed": failed,
+                    "fork_ms_avg": round(stats["fork_ms"] / stats["jobs"], 3) if stats["jobs"] else None,
+                    "python": sys.version.split()[0]}})
+            elif m == "call":
+                try: spawn(req)
+                except Exception as e: send({"id": req.get("id"), "error": f"fork failed: {e}"})
+            else:
+                send({"id": req.get("id"), "error": f"unsupported method: {m}"})
+"""
+
+def cold_start_s(venv_name: str, mods: Optional[List[str]] = None, timeout: float = 600.0) -> Optional[float]:
+    """Wall time of a fresh interpreter importing `mods` (default: the venv's import list)."""
+    py = _pybin(venv_name)
+    if not py.exists():
+        return None
+    mods = _imports_for(venv_name) if mods is None else mods
+    code = "".join(f"\ntry: import {m}\nexcept Exception: pass" for m in mods) or "pass"
+    t0 = time.perf_counter()
+    try:
+        subprocess.run([str(py), "-c", code], capture_output=True, timeout=timeout)
+    except Exception:
+        return None
+    return time.perf_counter() - t0
+
+class ForkServer(RuntimeWorker):
+    """
+    Linux fork-server for one venv. The parent imports the venv's "imports" once, and
+    every job then runs in a fresh forked child: process isolation without paying
+    `import torch` again. run() returns {"value", "fork_ms", "run_s", "pid"}. call()
+    returns only the value. Only "call" jobs are supported. Use RuntimeWorker.load for
+    state that should stay resident.
+    """
+    code = _FORK_CODE
+
+    def __init__(self, venv_name: str, *, preload: Optional[List[str]] = None, **kw):
+        if not hasattr(os, "fork"):
+            raise RuntimeHostError("fork-server mode needs a POSIX system (os.fork)")
+        super().__init__(venv_name, preload=_imports_for(venv_name) if preload is None else preload, **kw)
+
+    @property
+    def log_name(self) -> str:
+        return f"forkserver_{self.venv}"
+
+    def run(self, target: str, *args, timeout: Optional[float] = None, **kwargs) -> Dict[str, Any]:
+        return self.request("call", {"target": target, "args": list(args), "kwargs": kwargs}, timeout)
+
+    def call(self, target: str, *args, timeout: Optional[float] = None, **kwargs) -> Any:
+        return self.run(target, *args, timeout=timeout, **kwargs)["value"]
+
+    def load(self, *a, **k):
+        raise RuntimeHostError("fork-server jobs do not keep state; use RuntimeWorker.load")
+
+    invoke = unload = load
+
+    def compare(self, samples: int = 3) -> Dict[str, Any]:
+        """Per-job fork latency vs a cold interpreter importing the same modules."""
+        forks = [self.run("os:getpid")["fork_ms"] for _ in range(max(1, samples))]
+        cold = cold_start_s(self.venv, self.preload)
+        fork_ms = sum(forks) / len(forks)
+        return {"fork_ms": round(fork_ms, 3), "cold_start_ms": round(cold * 1000.0, 1) if cold else None,
+                "speedup": round(cold * 1000.0 / fork_ms, 1) if cold and fork_ms > 0 else None,
+                "preload": self.preload}
@@ -0,0 +1,81 @@
+from __future__ import annotations
+import re
+from typing import List, Optional, Tuple
+
+_FENCE = re.compile(r"^ {0,3}(`{3,}|~{3,})")
+_LIST = re.compile(r"^ {0,3}([-*+]|\d{1,9}[.)])(\s|$)")
+_HEADING = re.compile(r"^ {0,3}#{1,6}(\s|$)")
+
+class MarkdownBlockSplitter:
+    """
+    Splits a growing Markdown stream into finished top-level blocks plus an open tail.
+    A block is finished when
+      • a fenced code block sees its closing fence,
+      • a heading line is complete,
+      • a blank line is followed by a line that does not continue it
+        (list items / indented lines keep a list open).
+    Only the open tail is rescanned on each feed, so the total work stays linear
+    in the reply length.
+    """
+    def __init__(self):
+        self._open = ""
+
+    @property
+    def tail(self) -> str:
+        return self._open
+
+    def feed(self, text: str) -> List[str]:
+        """Add streamed text; return blocks that became final (may be empty)."""
+        if not text:
+            return []
+        self._open += text.replace("\r\n", "\n")
+        blocks, self._open = _split(self._open)
+        return blocks
+
+    def finish(self) -> List[str]:
+        """End of stream: whatever is left becomes the last block."""
+        rest, self._open = self._open, ""
+        return [rest] if rest.strip() else []
+
+def _split(text: str) -> Tuple[List[str], str]:
+    out: List[str] = []
+    lines = text.split("\n")
+    complete = lines[:-1]           # the last element has no newline yet
+    start = pos = 0
+    fence: Optional[str] = None
+    kind: Optional[str] = None      # None | "para" | "list" | "code"
+    blank_seen = False
+
+    def close(at: int) -> None:
+        nonlocal start, kind
+        if text[start:at].strip():
+            out.append(text[start:at])
+        start, kind = at, None
+
+    for line in complete:
+        nxt = pos + len(line) + 1
+        if fence:
+            s = line.strip()
+            if s and s[0] == fence[0] and len(s) >= len(fence) and set(s) == {fence[0]}:
+                fence = None; close(nxt)
+            pos = nxt; continue
+        if not line.strip():
+            if kind: blank_seen = True
+            else: start = nxt        # drop leading blank lines
+            pos = nxt; continue
+        fm = _FENCE.match(line)
+        is_list = bool(_LIST.match(line))
+        heading = bool(_HEADING.match(line))
+        if kind and (blank_seen or fm or heading):
+            continues = kind == "list" and not (fm or heading) and (is_list or line.startswith(("  ", "\t")))
+            if not continues:
+                close(pos)
+        blank_seen = False
+        if fm:
+            fence, kind = fm.group(1), "code"
+        elif heading:
+            kind = "para"; close(nxt)
+        elif kind is None:
+            kind = "list" if is_list else "para"
+        pos = nxt
+    return out, text[start:]
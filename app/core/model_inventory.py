@@ -0,0 +1,292 @@
+from __future__ import annotations
+import json, os, re, sqlite3, threading, time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from .paths import data_dir, hf_home_dir
+
+# Ollama (OLLAMA_MODELS):  manifests/<registry>/<namespace>/<model>/<tag>   JSON: config + layers[{digest,size}]
+#                          blobs/sha256-<hex>
+# HF hub cache (HF_HOME/hub): models--<org>--<name>/snapshots/<rev>/<file> -> ../../blobs/<etag|sha256>
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS blobs (
+    path      TEXT PRIMARY KEY,
+    source    TEXT NOT NULL,
+    digest    TEXT NOT NULL,
+    size      INTEGER NOT NULL,
+    mtime_ns  INTEGER NOT NULL,
+    atime     REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS blobs_digest ON blobs(source, digest);
+CREATE TABLE IF NOT EXISTS models (
+    source     TEXT NOT NULL,
+    model      TEXT NOT NULL,
+    manifest   TEXT NOT NULL,
+    stamp      TEXT NOT NULL,          -- mtime/size signature; unchanged → not re-parsed
+    used_at    REAL NOT NULL DEFAULT 0,
+    PRIMARY KEY (source, model)
+);
+CREATE TABLE IF NOT EXISTS model_blobs (
+    source  TEXT NOT NULL,
+    model   TEXT NOT NULL,
+    digest  TEXT NOT NULL,
+    file    TEXT NOT NULL DEFAULT '',
+    PRIMARY KEY (source, model, digest, file)
+);
+CREATE INDEX IF NOT EXISTS model_blobs_digest ON model_blobs(source, digest);
+"""
+
+def inventory_db_path() -> Path:
+    return data_dir() / "model_inventory.db"
+
+def ollama_models_root(config: Dict | None = None) -> Path:
+    """The folder holding manifests/ and blobs/, from the Hub's settings or the environment."""
+    cfg = config or {}
+    cands = [cfg.get("ollama_models_dir"), (cfg.get("ollama") or {}).get("models_dir"),
+             os.environ.get("OLLAMA_MODELS"), str(Path.home() / ".ollama" / "models")]
+    for c in filter(None, cands):
+        p = Path(c).expanduser()
+        for root in (p, p / "models"):
+            if (root / "manifests").is_dir() or (root / "blobs").is_dir():
+                return root
+    return Path(next(filter(None, cands))).expanduser()
+
+_BLOB_RE = re.compile(r"sha256-[0-9a-f]{64}")
+
+def is_ollama_blob(name: str) -> bool:
+    """A finished blob file name; in-progress downloads (sha256-<hex>-partial[-N]) don't match."""
+    return _BLOB_RE.fullmatch(name) is not None
+
+def hf_hub_root(config: Dict | None = None) -> Path:
+    home = ((config or {}).get("paths") or {}).get("hf_home") or os.environ.get("HF_HOME") or str(hf_home_dir())
+    return Path(home).expanduser() / "hub"
+
+def _stamp(*paths: Path) -> str:
+    parts = []
+    for p in paths:
+        try:
+            st = p.stat(); parts.append(f"{p.name}:{st.st_mtime_ns}:{st.st_size}")
+        except OSError:
+            parts.append(f"{p.name}:-")
+    return "|".join(parts)
+
+class ModelInventory:
+    """
+    Persistent index of what models are on disk: model → blobs → digest/size.
+      • scan() re-parses only manifests/snapshots whose mtime/size changed and re-stats blobs
+      • queries: total_size, models (with unique vs shared bytes), shared_blobs, orphaned_blobs,
+        last_used (blob atime, or mark_used() when the Hub uses a model)
+    """
+    def __init__(self, path: Path | str | None = None):
+        self.path = Path(path) if path else inventory_db_path()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.RLock()
+        self._db = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(_SCHEMA)
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+    # ----- scanning -----
+    def scan(self, config: Dict | None = None, *, ollama_root: Path | None = None,
+             hf_root: Path | None = None) -> Dict[str, int]:
+        stats = {"models": 0, "parsed": 0, "blobs": 0, "restat": 0}
+        t0 = time.perf_counter()
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                self._scan_ollama(ollama_root or ollama_models_root(config), stats)
+                self._scan_hf(hf_root or hf_hub_root(config), stats)
+                self._db.execute("COMMIT")
+            except Exception:
+                self._db.execute("ROLLBACK"); raise
+        stats["elapsed_ms"] = int((time.perf_counter() - t0) * 1000)
+        return stats
+
+    def _sync_blobs(self, source: str, found: Dict[str, Tuple[str, os.stat_result]], stats: Dict) -> None:
+        """found: path -> (digest, stat). Rows are rewritten only when size/mtime moved."""
+        known = {r["path"]: (r["size"], r["mtime_ns"]) for r in
+                 self._db.execute("SELECT path, size, mtime_ns FROM blobs WHERE source=?", (source,))}
+        rows = []
+        for path, (digest, st) in found.items():
+            if known.get(path) != (st.st_size, st.st_mtime_ns):
+                rows.append((path, source, digest, st.st_size, st.st_mtime_ns, st.st_atime))
+            else:
+                self._db.execute("UPDATE blobs SET atime=? WHERE path=?", (st.st_atime, path))
+        self._db.executemany("INSERT OR REPLACE INTO blobs VALUES (?,?,?,?,?,?)", rows)
+        gone = [(p,) for p in known if p not in found]
+        self._db.executemany("DELETE FROM blobs WHERE path=?", gone)
+        stats["blobs"] += len(found); stats["restat"] += len(rows)
+
+    def _set_model(self, source: str, model: str, manifest: str, stamp: str, blobs: List[Tuple[str, str]]) -> None:
+        self._db.execute("INSERT INTO models(source, model, manifest, stamp) VALUES (?,?,?,?) "
+                         "ON CONFLICT(source, model) DO UPDATE SET manifest=excluded.manifest, stamp=excluded.stamp",
+                         (source, model, manifest, stamp))
+        self._db.execute("DELETE FROM model_blobs WHERE source=? AND model=?", (source, model))
+        self._db.executemany("INSERT OR IGNORE INTO model_blobs VALUES (?,?,?,?)",
+                             [(source, model, d, f) for d, f in blobs])
+
+    def _prune_models(self, source: str, seen: set) -> None:
+        for r in self._db.execute("SELECT model FROM models WHERE source=?", (source,)).fetchall():
+            if r["model"] not in seen:
+                self._db.execute("DELETE FROM models WHERE source=? AND model=?", (source, r["model"]))
+                self._db.execute("DELETE FROM model_blobs WHERE source=? AND model=?", (source, r["model"]))
+
+    def _stamps(self, source: str) -> Dict[str, str]:
+        return {r["model"]: r["stamp"] for r in self._db.execute("SELECT model, stamp FROM models WHERE source=?", (source,))}
+
+    def _scan_ollama(self, root: Path, stats: Dict) -> None:
+        found = {}
+        blob_dir = root / "blobs"
+        if blob_dir.is_dir():
+            with os.scandir(blob_dir) as it:
+                for e in it:
+                    if is_ollama_blob(e.name) and e.is_file():
+                        found[e.path] = (e.name.replace("-", ":", 1), e.stat())
+        self._sync_blobs("ollama", found, stats)
+        stamps, seen = self._stamps("ollama"), set()
+        mroot = root / "manifests"
+        for dirpath, _dirs, files in os.walk(mroot) if mroot.is_dir() else ():
+            for fn in files:
+                mf = Path(dirpath) / fn
+                parts = mf.relative_to(mroot).parts          # registry / namespace / model / tag
+                if len(parts) < 3:
+                    continue
+                reg, ns, name, tag = (parts[0], "/".join(parts[1:-2]), parts[-2], parts[-1])
+                model = f"{name}:{tag}" if ns == "library" and reg == "registry.ollama.ai" else f"{reg}/{ns}/{name}:{tag}"
+                seen.add(model); stats["models"] += 1
+                st = _stamp(mf)
+                if stamps.get(model) == st:
+                    continue
+                try:
+                    m = json.loads(mf.read_text(encoding="utf-8"))
+                except Exception:
+                    continue
+                layers = ([m["config"]] if isinstance(m.get("config"), dict) else []) + list(m.get("layers") or [])
+                self._set_model("ollama", model, str(mf), st,
+                                [(l["digest"], l.get("mediaType", "")) for l in layers if l.get("digest")])
+                stats["parsed"] += 1
+        self._prune_models("ollama", seen)
+
+    def _scan_hf(self, hub: Path, stats: Dict) -> None:
+        found: Dict[str, Tuple[str, os.stat_result]] = {}
+        stamps, seen = self._stamps("hf"), set()
+        repos = sorted(p for p in hub.glob("*--*") if p.is_dir()) if hub.is_dir() else []
+        for repo in repos:
+            kind, _, rest = repo.name.partition("--")
+            model = rest.replace("--", "/") if kind == "models" else f"{kind}:{rest.replace('--', '/')}"
+            seen.add(model); stats["models"] += 1
+            blob_dir = repo / "blobs"
+            if blob_dir.is_dir():
+                with os.scandir(blob_dir) as it:
+                    for e in it:
+                        if e.is_file() and not e.name.endswith(".incomplete"):
+                            found[e.path] = (e.name, e.stat())
+            snaps = sorted(p for p in (repo / "snapshots").glob("*") if p.is_dir())
+            st = _stamp(repo / "refs", *snaps)
+            if stamps.get(model) == st:
+                # unchanged: its plain-file blobs are still on disk even though nothing is re-parsed
+                for r in self._db.execute("SELECT digest FROM model_blobs WHERE source='hf' AND model=? "
+                                          "AND digest LIKE 'file:%'", (model,)).fetchall():
+                    try: found[r["digest"][5:]] = (r["digest"], os.stat(r["digest"][5:]))
+                    except OSError: pass
+                continue
+            files = []
+            for snap in snaps:
+                for dirpath, _d, fns in os.walk(snap):
+                    for fn in fns:
+                        f = Path(dirpath) / fn
+                        rel = str(f.relative_to(snap))
+                        if f.is_symlink():
+                            files.append((Path(os.readlink(f)).name, rel))
+                        else:                       # no-symlink caches (Windows): the file is its own blob
+                            files.append((f"file:{f}", rel))
+                            try: found[str(f)] = (f"file:{f}", f.stat())
+                            except OSError: pass
+            self._set_model("hf", model, str(repo), st, files)
+            stats["parsed"] += 1
+        self._sync_blobs("hf", found, stats)
+        self._prune_models("hf", seen)
+
+    # ----- usage -----
+    def mark_used(self, source: str, model: str, ts: Optional[float] = None) -> None:
+        with self._lock:
+            self._db.execute("UPDATE models SET used_at=? WHERE source=? AND model=?", (ts or time.time(), source, model))
+
+    # ----- queries -----
+    def total_size(self, source: Optional[str] = None) -> int:
+        """Bytes on disk (each blob counted once)."""
+        q = "SELECT COALESCE(SUM(size), 0) FROM blobs" + (" WHERE source=?" if source else "")
+        with self._lock:
+            return int(self._db.execute(q, (source,) if source else ()).fetchone()[0])
+
+    def models(self, source: Optional[str] = None) -> List[Dict]:
+        """[{source, model, size, unique_size, blobs, last_used}], largest first.
+        unique_size is what deleting the model alone would free."""
+        q = """
+        WITH refs AS (SELECT DISTINCT mb.source, mb.model, mb.digest FROM model_blobs mb),
+             sharing AS (SELECT source, digest, COUNT(*) AS n FROM refs GROUP BY source, digest),
+             sizes AS (SELECT source, digest, MAX(size) AS size, MAX(atime) AS atime FROM blobs GROUP BY source, digest)
+        SELECT m.source, m.model, m.used_at,
+               COALESCE(SUM(s.size), 0) AS size,
+               COALESCE(SUM(CASE WHEN sh.n = 1 THEN s.size END), 0) AS unique_size,
+               COUNT(r.digest) AS blobs,
+               MAX(COALESCE(s.atime, 0)) AS atime
+        FROM models m
+        LEFT JOIN refs r ON r.source = m.source AND r.model = m.model
+        LEFT JOIN sizes s ON s.source = r.source AND s.digest = r.digest
+        LEFT JOIN sharing sh ON sh.source = r.source AND sh.digest = r.digest
+        """ + (" WHERE m.source=?" if source else "") + " GROUP BY m.source, m.model ORDER BY size DESC"
+        with self._lock:
+            rows = self._db.execute(q, (source,) if source else ()).fetchall()
+        return [{"source": r["source"], "model": r["model"], "size": r["size"], "unique_size": r["unique_size"],
+                 "blobs": r["blobs"], "last_used": max(r["used_at"] or 0, r["atime"] or 0)} for r in rows]
+
+    def last_used(self, source: str, model: str) -> float:
+        for m in self.models(source):
+            if m["model"] == model:
+                return m["last_used"]
+        return 0.0
+
+    def shared_blobs(self) -> List[Dict]:
+        """Blobs referenced by more than one model → [{source, digest, size, models}]."""
+        q = """SELECT r.source, r.digest, GROUP_CONCAT(r.model, '\n') AS models, COUNT(*) AS n,
+                      (SELECT MAX(size) FROM blobs b WHERE b.source = r.source AND b.digest = r.digest) AS size
+               FROM (SELECT DISTINCT source, model, digest FROM model_blobs) r
+               GROUP BY r.source, r.digest HAVING n > 1 ORDER BY size DESC"""
+        with self._lock:
+            rows = self._db.execute(q).fetchall()
+        return [{"source": r["source"], "digest": r["digest"], "size": r["size"] or 0,
+                 "models": sorted(r["models"].split("\n"))} for r in rows]
+
+    def orphaned_blobs(self) -> List[Dict]:
+        """Blob files no model references (left by deleted models or interrupted pulls)."""
+        q = """SELECT b.source, b.path, b.digest, b.size FROM blobs b
+               WHERE NOT EXISTS (SELECT 1 FROM model_blobs mb WHERE mb.source = b.source AND mb.digest = b.digest)
+               ORDER BY b.size DESC"""
+        with self._lock:
+            return [dict(r) for r in self._db.execute(q)]
+
+    def summary(self) -> Dict[str, int]:
+        orphans = self.orphaned_blobs(); shared = self.shared_blobs()
+        return {"total": self.total_size(), "ollama": self.total_size("ollama"), "hf": self.total_size("hf"),
+                "orphaned": sum(o["size"] for o in orphans), "orphaned_blobs": len(orphans),
+                "shared": sum(s["size"] * (len(s["models"]) - 1) for s in shared), "shared_blobs": len(shared)}
+
+    def register_models(self) -> int:
+        """Copy discovered models into model_registry in one batch; returns the count."""
+        from .model_registry import upsert_models, read_registry
+        existing = read_registry().get("models", {})
+        batch = {}
+        for m in self.models():
+            handle = f"{m['source']}:{m['model']}"
+            info = dict(existing.get(handle) or {})
+            info.update({"type": m["source"], "name": m["model"], "source": m["source"], "size": m["size"]})
+            if existing.get(handle) != info:
+                batch[handle] = info
+        upsert_models(batch)
+        return len(batch)
@@ -0,0 +1,162 @@
+from __future__ import annotations
+import json, os, re, threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional
+from PySide6.QtCore import QObject, Signal
+from .paths import data_dir
+from .ollama_tools import get_client
+
+# Persisted as {"models": [tag entries, last listing], "by_digest": {digest: /api/show extract}}.
+# /api/show results are keyed by digest, so a re-pulled or re-created model (new digest)
+# is fetched again automatically and stale entries simply stop being referenced.
+
+def model_meta_path() -> Path:
+    return data_dir() / "model_meta.json"
+
+_LOCK = threading.Lock()
+
+def _read() -> Dict:
+    try:
+        data = json.loads(model_meta_path().read_text(encoding="utf-8"))
+        return data if isinstance(data, dict) else {}
+    except Exception:
+        return {}
+
+def _write(data: Dict) -> None:
+    p = model_meta_path()
+    try:
+        p.parent.mkdir(parents=True, exist_ok=True)
+        tmp = p.with_suffix(f".{os.getpid()}.tmp")
+        tmp.write_text(json.dumps(data, indent=1, sort_keys=True), encoding="utf-8")
+        os.replace(tmp, p)
+    except Exception:
+        pass
+
+def _from_tags(it: Dict) -> Dict:
+    d = it.get("details") or {}
+    return {"name": it.get("name"), "digest": it.get("digest") or "", "size": it.get("size") or 0,
+            "modified_at": it.get("modified_at") or "", "family": d.get("family") or "",
+            "parameter_size": d.get("parameter_size") or "", "quantization": d.get("quantization_level") or "",
+            "format": d.get("format") or ""}
+
+def _from_show(show: Dict) -> Dict:
+    d = show.get("details") or {}
+    info = show.get("model_info") or {}
+    ctx = next((v for k, v in info.items() if k.endswith(".context_length")), None)
+    m = re.search(r"^num_ctx\s+(\d+)", show.get("parameters") or "", re.M)   # Modelfile override
+    out = {"context_length": int(ctx) if isinstance(ctx, (int, float)) else None,
+           "num_ctx": int(m.group(1)) if m else None,
+           "family": d.get("family") or "", "parameter_size": d.get("parameter_size") or "",
+           "quantization": d.get("quantization_level") or "",
+           "capabilities": list(show.get("capabilities") or [])}
+    arch = info.get("general.architecture")
+    if arch: out["architecture"] = arch
+    pc = info.get("general.parameter_count")
+    if isinstance(pc, (int, float)): out["parameter_count"] = int(pc)
+    return out
+
+def _merge(tag: Dict, show: Optional[Dict]) -> Dict:
+    meta = dict(tag)
+    for k, v in (show or {}).items():
+        if v not in (None, "", []) or k not in meta:
+            meta[k] = v
+    meta["complete"] = show is not None
+    return meta
+
+def load_model_meta() -> List[Dict]:
+    """Last known model list with metadata, from disk only (instant, no network)."""
+    with _LOCK:
+        data = _read()
+    shows = data.get("by_digest") or {}
+    return [_merge(t, shows.get(t.get("digest"))) for t in data.get("models") or []]
+
+def describe(meta: Optional[Dict]) -> str:
+    """e.g. '8.0B · Q4_K_M · 4.9 GB · ctx 131072 · llama'"""
+    if not meta:
+        return ""
+    parts = []
+    if meta.get("parameter_size"): parts.append(str(meta["parameter_size"]))
+    if meta.get("quantization"): parts.append(str(meta["quantization"]))
+    size = meta.get("size") or 0
+    if size: parts.append(f"{size / 1e9:.1f} GB" if size >= 1e9 else f"{size / 1e6:.0f} MB")
+    ctx = meta.get("num_ctx") or meta.get("context_length")
+    if ctx: parts.append(f"ctx {ctx}")
+    if meta.get("family"): parts.append(str(meta["family"]))
+    return " · ".join(parts)
+
+class ModelMetaCache(QObject):
+    """
+    Model list + metadata for pickers. models()/get() answer from memory (seeded from disk),
+    refresh() runs in the background: one /api/tags call, then parallel /api/show calls only
+    for digests not seen before. Signals (queued to the GUI thread):
+      • listed(list of meta dicts)   as soon as /api/tags answers
+      • updated(name, meta)          as each /api/show result arrives
+    """
+    listed = Signal(list)
+    updated = Signal(str, dict)
+
+    def __init__(self, config: Dict | None = None, *, workers: int = 4, parent=None):
+        super().__init__(parent)
+        self.config = config
+        self.workers = max(1, workers)
+        self._lock = threading.Lock()
+        self._models: List[Dict] = load_model_meta()
+        self._busy = False
+
+    def models(self) -> List[Dict]:
+        with self._lock:
+            return [dict(m) for m in self._models]
+
+    def get(self, name: str) -> Optional[Dict]:
+        with self._lock:
+            return next((dict(m) for m in self._models if m.get("name") == name), None)
+
+    def refresh(self, config: Dict | None = None) -> None:
+        if config is not None:
+            self.config = config
+        with self._lock:
+            if self._busy:
+                return
+            self._busy = True
+        threading.Thread(target=self._refresh, name="model-meta", daemon=True).start()
+
+    def _emit(self, sig, *args) -> None:
+        try: sig.emit(*args)
+        except RuntimeError: pass
+
+    def _refresh(self) -> None:
+        try:
+            client = get_client(self.config)
+            info = client.list_model_info()
+            if info is None:
+                return      # unreachable: keep the last known list (memory and disk) as it is
+            tags = [_from_tags(it) for it in info]
+            with _LOCK:
+                shows: Dict[str, Dict] = dict(_read().get("by_digest") or {})
+            metas = [_merge(t, shows.get(t["digest"])) for t in tags]
+            with self._lock:
+                self._models = metas
+            self._emit(self.listed, [dict(m) for m in metas])
+            missing = [t for t in tags if t["digest"] not in shows or not t["digest"]]
+
+            def fetch(tag: Dict):
+                show = client.show_model(tag["name"])
+                return tag, (_from_show(show) if show else None)
+            if missing:
+                with ThreadPoolExecutor(max_workers=min(self.workers, len(missing)), thread_name_prefix="model-show") as ex:
+                    for tag, show in ex.map(fetch, missing):
+                        if show is None:
+                            continue
+                        if tag["digest"]:
+                            shows[tag["digest"]] = show
+                        meta = _merge(tag, show)
+                        with self._lock:
+                            self._models = [meta if m.get("name") == tag["name"] else m for m in self._models]
+                        self._emit(self.updated, tag["name"], meta)
+            live = {t["digest"] for t in tags}
+            with _LOCK:
+                _write({"models": tags, "by_digest": {d: v for d, v in shows.items() if d in live}})
+        finally:
+            with self._lock:
+                self._busy = False
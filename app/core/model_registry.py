@@ -1,7 +1,7 @@
 from __future__ import annotations
-import json, os, sys
+import copy, json, os, sqlite3, sys, threading
 from pathlib import Path
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Iterable, List, Optional, Tuple
 
 def _data_root() -> Path:
     if os.name == "nt":
@@ -12,39 +12,208 @@ def _data_root() -> Path:
         return Path.home() / ".local" / "share" / "AFTP"
 
 def registry_path() -> Path:
+    """JSON registry shared with other AFTP apps: re-exported after every write, and
+    imported back into the SQLite store whenever another app has changed it."""
     d = _data_root()
     d.mkdir(parents=True, exist_ok=True)
     return d / "models_registry.json"
 
-def read_registry() -> Dict[str, Any]:
-    p = registry_path()
-    if p.exists():
+def registry_db_path() -> Path:
+    return registry_path().with_name("models_registry.db")
+
+# models: handle -> {"type": "ollama|hf|tts|stt|custom", "name", "source", "license_url", "notes", …}
+_JSON_SCHEMA = 1      # models_registry.json layout, unchanged by the SQLite store
+_COLS = ("type", "name", "source", "license_url", "notes")
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS models (
+    handle       TEXT PRIMARY KEY,
+    type         TEXT,
+    name         TEXT,
+    source       TEXT,
+    license_url  TEXT,
+    notes        TEXT,
+    info         TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS models_type   ON models(type);
+CREATE INDEX IF NOT EXISTS models_name   ON models(name);
+CREATE INDEX IF NOT EXISTS models_source ON models(source);
+CREATE TABLE IF NOT EXISTS registry_meta (key TEXT PRIMARY KEY, value TEXT);
+"""
+
+class _Store:
+    """
+    SQLite (WAL) store with an in-process cache of the full table. The cache is dropped
+    whenever the db/wal files' mtime or size change, so writes by other processes are
+    picked up without re-querying on every read.
+    models_registry.json stays the exchange format: the (mtime_ns, size) of the last export
+    is kept in registry_meta, and when the file no longer matches it another app edited it,
+    so its content replaces the table (the table equalled that last export).
+    """
+    def __init__(self, path: Path):
+        self.path = path
+        self._lock = threading.RLock()
+        self._db = sqlite3.connect(str(path), check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(_SCHEMA)
+        self._cache: Optional[Dict[str, Dict[str, Any]]] = None
+        self._stamp: Tuple = ()
+        self._json_stamp = ""
+        self._check_json()
+
+    def _file_stamp(self) -> Tuple:
+        out = []
+        for p in (self.path, self.path.with_name(self.path.name + "-wal")):
+            try:
+                st = p.stat(); out.append((st.st_mtime_ns, st.st_size))
+            except OSError:
+                out.append(None)
+        return tuple(out)
+
+    def _json_changed(self) -> Optional[str]:
+        """Stamp of models_registry.json if it differs from the last one we saw, else None."""
+        try:
+            st = registry_path().stat()
+        except OSError:
+            return None
+        stamp = f"{st.st_mtime_ns}:{st.st_size}"
+        return None if stamp == self._json_stamp else stamp
+
+    def _set_json_stamp(self, stamp: str) -> None:
+        self._db.execute("INSERT OR REPLACE INTO registry_meta VALUES ('json_stamp', ?)", (stamp,))
+        self._json_stamp = stamp
+
+    def _sync_json(self) -> None:
+        """Inside a write transaction: take models_registry.json if someone else changed it."""
+        row = self._db.execute("SELECT value FROM registry_meta WHERE key='json_stamp'").fetchone()
+        self._json_stamp = row[0] if row else ""     # another process of this app may have exported since
+        stamp = self._json_changed()
+        if stamp is None:
+            return
+        try: models = json.loads(registry_path().read_text(encoding="utf-8")).get("models", {})
+        except Exception: models = None
+        if isinstance(models, dict):
+            self._db.execute("DELETE FROM models")
+            self._upsert(models)
+            self._cache = None
+        self._set_json_stamp(stamp)
+
+    def _check_json(self) -> None:
+        with self._lock:
+            if self._json_changed() is None:
+                return
+            try:
+                self._db.execute("BEGIN IMMEDIATE")
+                try:
+                    self._sync_json()
+                    self._db.execute("COMMIT")
+                except Exception:
+                    self._db.execute("ROLLBACK"); raise
+            except Exception:
+                pass
+
+    def _upsert(self, models: Dict[str, Dict[str, Any]]) -> None:
+        rows = [(h, *(None if info.get(c) is None else str(info.get(c)) for c in _COLS),
+                 json.dumps(info, ensure_ascii=False)) for h, info in models.items()]
+        self._db.executemany(
+            "INSERT INTO models(handle, type, name, source, license_url, notes, info) VALUES (?,?,?,?,?,?,?) "
+            "ON CONFLICT(handle) DO UPDATE SET type=excluded.type, name=excluded.name, source=excluded.source, "
+            "license_url=excluded.license_url, notes=excluded.notes, info=excluded.info", rows)
+
+    def write(self, upserts: Dict[str, Dict[str, Any]], removes: Iterable[str] = (), replace: bool = False) -> int:
+        """One transaction for the whole batch. Returns the number of rows removed."""
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                self._sync_json()
+                if replace:
+                    self._db.execute("DELETE FROM models")
+                cur = self._db.executemany("DELETE FROM models WHERE handle=?", [(h,) for h in removes])
+                removed = max(cur.rowcount, 0)
+                self._upsert(upserts)
+                self._export_json()
+                self._db.execute("COMMIT")
+            except Exception:
+                self._db.execute("ROLLBACK"); self._json_stamp = ""; raise
+            finally:
+                self._cache = None
+            return removed
+
+    def _export_json(self) -> None:
+        """Mirror the table to models_registry.json (same layout as before the SQLite store)
+        and remember its stamp. Runs inside the write transaction."""
+        p = registry_path()
         try:
-            return json.loads(p.read_text(encoding="utf-8"))
+            models = {h: json.loads(info) for h, info in self._db.execute("SELECT handle, info FROM models ORDER BY handle")}
+            tmp = p.with_suffix(f".{os.getpid()}.tmp")
+            tmp.write_text(json.dumps({"schema": _JSON_SCHEMA, "models": models}, indent=2, ensure_ascii=False), encoding="utf-8")
+            os.replace(tmp, p)
+            st = p.stat()
+            self._set_json_stamp(f"{st.st_mtime_ns}:{st.st_size}")
         except Exception:
             pass
-    return {"schema": 1, "models": {}}
-    # models: { "handle": { "type": "ollama|hf|tts|stt|custom", "name": "...", "source": "...", "license_url": "...", "notes": "" } }
+
+    def all(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            self._check_json()
+            stamp = self._file_stamp()
+            if self._cache is None or stamp != self._stamp:
+                self._cache = {h: json.loads(info) for h, info in
+                               self._db.execute("SELECT handle, info FROM models ORDER BY handle")}
+                self._stamp = stamp
+            return self._cache
+
+    def query(self, **where: Optional[str]) -> Dict[str, Dict[str, Any]]:
+        conds = [(c, v) for c, v in where.items() if v is not None and c in _COLS]
+        if not conds:
+            return copy.deepcopy(self.all())
+        self._check_json()
+        sql = "SELECT handle, info FROM models WHERE " + " AND ".join(f"{c}=?" for c, _ in conds) + " ORDER BY handle"
+        with self._lock:
+            return {h: json.loads(info) for h, info in self._db.execute(sql, [v for _, v in conds])}
+
+_STORE: Optional[_Store] = None
+_STORE_LOCK = threading.Lock()
+
+def _store() -> _Store:
+    global _STORE
+    with _STORE_LOCK:
+        path = registry_db_path()
+        if _STORE is None or _STORE.path != path:
+            _STORE = _Store(path)
+        return _STORE
+
+def read_registry() -> Dict[str, Any]:
+    return {"schema": _JSON_SCHEMA, "models": copy.deepcopy(_store().all())}
 
 def write_registry(data: Dict[str, Any]) -> None:
-    registry_path().write_text(json.dumps(data, indent=2), encoding="utf-8")
+    """Replace the whole registry (one transaction)."""
+    _store().write(dict(data.get("models", {}) or {}), replace=True)
 
 def upsert_model(handle: str, info: Dict[str, Any]) -> None:
-    reg = read_registry()
-    reg.setdefault("models", {})[handle] = info
-    write_registry(reg)
+    _store().write({handle: info})
+
+def upsert_models(models: Dict[str, Dict[str, Any]]) -> None:
+    """Register many models at once: a single write transaction."""
+    if models:
+        _store().write(models)
 
 def remove_model(handle: str) -> bool:
-    reg = read_registry()
-    if handle in reg.get("models", {}):
-        del reg["models"][handle]
-        write_registry(reg)
-        return True
-    return False
+    return _store().write({}, [handle]) > 0
+
+def remove_models(handles: Iterable[str]) -> int:
+    return _store().write({}, list(handles))
+
+def get_model(handle: str) -> Optional[Dict[str, Any]]:
+    info = _store().all().get(handle)
+    return copy.deepcopy(info) if info is not None else None
+
+def find_models(*, kind: Optional[str] = None, name: Optional[str] = None,
+                source: Optional[str] = None) -> Dict[str, Any]:
+    """Indexed lookup by type / name / source (exact match, combined with AND)."""
+    return _store().query(type=kind, name=name, source=source)
 
 def list_models(kind: Optional[str] = None) -> Dict[str, Any]:
-    reg = read_registry()
-    items = reg.get("models", {})
     if kind:
-        items = {k:v for k,v in items.items() if v.get("type")==kind}
-    return items
+        return find_models(kind=kind)
+    return copy.deepcopy(_store().all())
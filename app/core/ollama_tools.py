@@ -1,9 +1,11 @@
 # app/core/ollama_tools.py
 from __future__ import annotations
-import os, sys, json, shutil, subprocess
+import atexit, os, sys, json, shutil, socket, subprocess, threading, time
 from pathlib import Path
 from typing import Dict, List, Tuple, Iterable, Optional, Iterator
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 # ---------- Host/port helpers ----------
 def _resolve_host_port(config: Dict | None = None) -> str:
@@ -36,77 +38,243 @@ def _resolve_host_port(config: Dict | None = None) -> str:
 def _base_url(config: Dict | None = None) -> str:
     return f"http://{_resolve_host_port(config)}"
 
-# ---------- Server & models ----------
-def server_ok(config: Dict | None = None, timeout: float = 2.0) -> bool:
-    try:
-        r = requests.get(_base_url(config) + "/api/tags", timeout=timeout)
-        return r.ok
-    except Exception:
-        return False
+# ---------- Pooled HTTP client ----------
+_HTTP_DEFAULTS: Dict = {"pool_size": 8, "retries": 2, "backoff": 0.25, "connect_timeout": 3.0}
 
-def list_models(config: Dict | None = None) -> List[str]:
-    try:
-        r = requests.get(_base_url(config) + "/api/tags", timeout=10)
-        r.raise_for_status()
-        data = r.json() or {}
-        items = data.get("models") or data.get("data") or []
-        names: List[str] = []
-        for it in items:
-            if isinstance(it, str):
-                names.append(it)
-            elif isinstance(it, dict):
-                nm = it.get("name") or it.get("model")
-                if nm:
-                    names.append(nm)
-        # unique, keep order
-        seen, out = set(), []
-        for n in names:
-            if n not in seen:
-                seen.add(n); out.append(n)
-        return out
-    except Exception:
-        return []
+def _http_settings(config: Dict | None) -> Dict:
+    """Merge config['ollama']['http'] (settings.json) over the built-in pool/retry defaults."""
+    out = dict(_HTTP_DEFAULTS)
+    if isinstance(config, dict):
+        sect = config.get("ollama")
+        if isinstance(sect, dict) and isinstance(sect.get("http"), dict):
+            out.update({k: v for k, v in sect["http"].items() if k in _HTTP_DEFAULTS})
+    return out
 
-def pull_model(name: str, config: Dict | None = None) -> Tuple[bool, str]:
-    try:
-        r = requests.post(_base_url(config) + "/api/pull",
-                          json={"name": name, "stream": False}, timeout=600)
-        return (True, "pulled") if r.ok else (False, f"{r.status_code} {r.text}")
-    except Exception as e:
-        return False, str(e)
+class StreamCancel:
+    """
+    Cancel handle for a streaming request. cancel() may be called from any thread: it shuts
+    down the response socket, so a reader blocked in iter_lines wakes up at once and the
+    server sees the disconnect and stops generating.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._resp: Optional[requests.Response] = None
+        self.cancelled = False
 
-def delete_model(name: str, config: Dict | None = None) -> Tuple[bool, str]:
-    url = _base_url(config) + "/api/delete"
-    try:
-        # Newer servers prefer DELETE; older accepted POST
-        r = requests.delete(url, json={"name": name}, timeout=30)
-        if r.ok:
-            return True, "deleted"
-        r2 = requests.post(url, json={"name": name}, timeout=30)
-        return (True, "deleted") if r2.ok else (False, f"{r.status_code} {r.text}")
-    except Exception as e:
-        return False, str(e)
+    def attach(self, resp: requests.Response) -> None:
+        with self._lock:
+            self._resp = resp
+            abort = self.cancelled
+        if abort:
+            _abort_response(resp)
 
-# ---------- Prompt / generate ----------
-def _gen_payload(model: str, text: str, options: Optional[Dict]) -> Dict:
-    payload = {"model": model, "prompt": text, "stream": True}
-    if options:
-        payload["options"] = options
-    return payload
+    def cancel(self) -> None:
+        with self._lock:
+            self.cancelled = True
+            resp, self._resp = self._resp, None
+        if resp is not None:
+            _abort_response(resp)
 
-def prompt_stream_iter(model: str, text: str, *,
-                       config: Dict | None = None,
-                       options: Dict | None = None,
-                       timeout: float = 600.0) -> Iterator[str]:
+def _abort_response(resp: requests.Response) -> None:
+    # close() alone does not interrupt a recv() blocked in another thread; shutdown() does
+    try:
+        raw = resp.raw
+        sock = getattr(getattr(raw, "_connection", None), "sock", None)
+        if sock is None:
+            fp = getattr(getattr(raw, "_fp", None), "fp", None)
+            sock = getattr(getattr(fp, "raw", None), "_sock", None)
+        if sock is not None:
+            sock.shutdown(socket.SHUT_RDWR)
+    except Exception:
+        pass
+    try: resp.close()
+    except Exception: pass
+
+class OllamaClient:
     """
-    Yields decoded text chunks from Ollama's /api/generate stream.
-    Handles both 'data: {json}' and raw JSON lines. Emits only text pieces.
+    Keep-alive client for one Ollama server. Owns a requests.Session with a pooled
+    HTTPAdapter so repeated /api/tags and /api/generate calls reuse TCP connections.
+    Idempotent calls (GET/DELETE) are retried; POSTs only retry failed connects.
     """
-    url = _base_url(config) + "/api/generate"
-    payload = _gen_payload(model, text, options)
-    with requests.post(url, json=payload, stream=True, timeout=timeout) as r:
-        r.raise_for_status()
-        for raw in r.iter_lines(chunk_size=1024, decode_unicode=False):
+    def __init__(self, config: Dict | None = None, *,
+                 pool_size: int = 8, retries: int = 2, backoff: float = 0.25,
+                 connect_timeout: float = 3.0):
+        self.host = _resolve_host_port(config)
+        self.base_url = f"http://{self.host}"
+        self.connect_timeout = float(connect_timeout)
+        retry = Retry(total=retries, connect=retries, read=retries, status=retries,
+                      backoff_factor=backoff, status_forcelist=(502, 503, 504),
+                      allowed_methods=frozenset({"GET", "HEAD", "DELETE"}),
+                      raise_on_status=False)
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(1, int(pool_size)),
+                              max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def _timeout(self, timeout: float) -> Tuple[float, float]:
+        # (connect, read): a dead host should fail fast even when reads may take minutes
+        return (min(self.connect_timeout, timeout), timeout)
+
+    def close(self) -> None:
+        try: self.session.close()
+        except Exception: pass
+
+    # ----- server & models -----
+    def server_ok(self, timeout: float = 2.0) -> bool:
+        try:
+            r = self.session.get(self.base_url + "/api/tags", timeout=self._timeout(timeout))
+            return r.ok
+        except Exception:
+            return False
+
+    def list_model_info(self, timeout: float = 10.0) -> Optional[List[Dict]]:
+        """/api/tags entries (name, digest, size, modified_at, details…), unique by name, server order.
+        None when the server is unreachable or the reply is unusable ([] means no models)."""
+        try:
+            r = self.session.get(self.base_url + "/api/tags", timeout=self._timeout(timeout))
+            r.raise_for_status()
+            data = r.json() or {}
+            items = data.get("models") or data.get("data") or []
+            seen, out = set(), []
+            for it in items:
+                info = {"name": it} if isinstance(it, str) else dict(it) if isinstance(it, dict) else {}
+                nm = info.get("name") or info.get("model")
+                if nm and nm not in seen:
+                    seen.add(nm); info["name"] = nm; out.append(info)
+            return out
+        except Exception:
+            return None
+
+    def list_models(self, timeout: float = 10.0) -> List[str]:
+        return [it["name"] for it in self.list_model_info(timeout) or []]
+
+    def show_model(self, name: str, timeout: float = 30.0) -> Optional[Dict]:
+        """/api/show: details, model_info (context length, …), parameters, template. None on failure."""
+        try:
+            r = self.session.post(self.base_url + "/api/show", json={"name": name, "model": name},
+                                  timeout=self._timeout(timeout))
+            return r.json() if r.ok else None
+        except Exception:
+            return None
+
+    def pull_model(self, name: str, timeout: float = 600.0) -> Tuple[bool, str]:
+        try:
+            r = self.session.post(self.base_url + "/api/pull",
+                                  json={"name": name, "stream": False}, timeout=self._timeout(timeout))
+            return (True, "pulled") if r.ok else (False, f"{r.status_code} {r.text}")
+        except Exception as e:
+            return False, str(e)
+
+    def pull_stream(self, name: str, *, cancel: StreamCancel | None = None,
+                    timeout: float = 60.0) -> Iterator[Dict]:
+        """
+        Streaming /api/pull: yields each progress record ({"status", "digest", "total", "completed"}).
+        `timeout` is the read timeout between records. A server-side failure arrives as a
+        record with "error". A cancelled stream just ends. Re-pulling resumes from the
+        server's partial blobs.
+        """
+        if cancel is not None and cancel.cancelled:
+            return
+        try:
+            r = self.session.post(self.base_url + "/api/pull", json={"name": name, "stream": True},
+                                  stream=True, timeout=self._timeout(timeout))
+        except Exception:
+            if cancel is not None and cancel.cancelled:
+                return
+            raise
+        if cancel is not None:
+            cancel.attach(r)
+        with r:
+            if not r.ok:
+                yield {"error": f"{r.status_code} {r.text[:200]}"}; return
+            try:
+                for raw in r.iter_lines(chunk_size=1024, decode_unicode=False):
+                    if cancel is not None and cancel.cancelled:
+                        return
+                    if raw:
+                        try: yield json.loads(raw.decode("utf-8", "ignore"))
+                        except ValueError: continue
+            except Exception:
+                if cancel is not None and cancel.cancelled:
+                    return
+                raise
+
+    def running_models(self, timeout: float = 5.0) -> Optional[List[Dict]]:
+        """/api/ps: loaded models (name, size, size_vram, expires_at…). None when unreachable."""
+        try:
+            r = self.session.get(self.base_url + "/api/ps", timeout=self._timeout(timeout))
+            r.raise_for_status()
+            return [m for m in (r.json() or {}).get("models") or [] if isinstance(m, dict)]
+        except Exception:
+            return None
+
+    def load_model(self, name: str, keep_alive: str | int | None = None, *,
+                   options: Dict | None = None, timeout: float = 600.0) -> Tuple[bool, str]:
+        """Empty /api/generate: loads the model without generating; keep_alive=0 unloads it.
+        options (num_ctx, …) should match later requests, or the server reloads the model."""
+        payload: Dict = {"model": name, "stream": False}
+        if options:
+            payload["options"] = options
+        if keep_alive is not None:
+            payload["keep_alive"] = keep_alive
+        try:
+            r = self.session.post(self.base_url + "/api/generate", json=payload, timeout=self._timeout(timeout))
+            return (True, "ok") if r.ok else (False, f"{r.status_code} {r.text}")
+        except Exception as e:
+            return False, str(e)
+
+    def unload_model(self, name: str, timeout: float = 60.0) -> Tuple[bool, str]:
+        return self.load_model(name, keep_alive=0, timeout=timeout)
+
+    def delete_model(self, name: str, timeout: float = 30.0) -> Tuple[bool, str]:
+        url = self.base_url + "/api/delete"
+        try:
+            # Newer servers prefer DELETE; older accepted POST
+            r = self.session.delete(url, json={"name": name}, timeout=self._timeout(timeout))
+            if r.ok:
+                return True, "deleted"
+            r2 = self.session.post(url, json={"name": name}, timeout=self._timeout(timeout))
+            return (True, "deleted") if r2.ok else (False, f"{r.status_code} {r.text}")
+        except Exception as e:
+            return False, str(e)
+
+    # ----- generate / chat -----
+    def _stream(self, path: str, payload: Dict, timeout: float,
+                stats: Dict | None, cancel: StreamCancel | None = None) -> Iterator[str]:
+        """
+        Yields decoded text chunks from an Ollama NDJSON stream (/api/generate or /api/chat).
+        Handles both 'data: {json}' and raw JSON lines. Emits only text pieces; the final
+        'done' record (prompt_eval_count, eval_count, durations, context…) goes into `stats`.
+        A cancelled stream just ends (no exception).
+        """
+        if cancel is not None and cancel.cancelled:
+            return
+        try:
+            r = self.session.post(self.base_url + path, json=payload,
+                                  stream=True, timeout=self._timeout(timeout))
+        except Exception:
+            if cancel is not None and cancel.cancelled:
+                return
+            raise
+        if cancel is not None:
+            cancel.attach(r)
+        with r:
+            r.raise_for_status()
+            try:
+                lines = r.iter_lines(chunk_size=1024, decode_unicode=False)
+                yield from self._parse_lines(lines, stats, cancel)
+            except Exception:
+                if cancel is not None and cancel.cancelled:
+                    return
+                raise
+
+    @staticmethod
+    def _parse_lines(lines: Iterator[bytes], stats: Dict | None,
+                     cancel: StreamCancel | None) -> Iterator[str]:
+        for raw in lines:
+            if cancel is not None and cancel.cancelled:
+                break
             if not raw:
                 continue
             # Some versions prefix with 'data:'
@@ -122,12 +290,191 @@ def prompt_stream_iter(model: str, text: str, *,
                 # surface error inside the stream; UI will show it
                 yield f"\n[stream-error] {obj['error']}"
                 break
-            piece = obj.get("response") or ""
+            piece = obj.get("response") or (obj.get("message") or {}).get("content") or ""
             if piece:
                 yield piece
             if obj.get("done"):
+                if stats is not None:
+                    stats.update(_done_stats(obj))
                 break
 
+    def generate_stream(self, model: str, text: str, *,
+                        options: Dict | None = None,
+                        context: List[int] | None = None,
+                        keep_alive: str | int | None = None,
+                        stats: Dict | None = None,
+                        cancel: StreamCancel | None = None,
+                        timeout: float = 600.0) -> Iterator[str]:
+        payload = _gen_payload(model, text, options, context=context, keep_alive=keep_alive)
+        return self._stream("/api/generate", payload, timeout, stats, cancel)
+
+    def generate(self, model: str, text: str, *,
+                 options: Dict | None = None,
+                 context: List[int] | None = None,
+                 keep_alive: str | int | None = None,
+                 stats: Dict | None = None,
+                 timeout: float = 600.0) -> Tuple[bool, str]:
+        try:
+            payload = _gen_payload(model, text, options, context=context, keep_alive=keep_alive)
+            payload["stream"] = False
+            r = self.session.post(self.base_url + "/api/generate", json=payload,
+                                  timeout=self._timeout(timeout))
+            if not r.ok:
+                return False, f"{r.status_code} {r.text}"
+            data = r.json() or {}
+            if stats is not None:
+                stats.update(_done_stats(data))
+            return True, data.get("response", "")
+        except Exception as e:
+            return False, str(e)
+
+    def chat_stream(self, model: str, messages: List[Dict], *,
+                    options: Dict | None = None,
+                    keep_alive: str | int | None = None,
+                    stats: Dict | None = None,
+                    cancel: StreamCancel | None = None,
+                    timeout: float = 600.0) -> Iterator[str]:
+        payload = _chat_payload(model, messages, options, keep_alive)
+        return self._stream("/api/chat", payload, timeout, stats, cancel)
+
+    def chat(self, model: str, messages: List[Dict], *,
+             options: Dict | None = None,
+             keep_alive: str | int | None = None,
+             stats: Dict | None = None,
+             timeout: float = 600.0) -> Tuple[bool, str]:
+        try:
+            payload = _chat_payload(model, messages, options, keep_alive)
+            payload["stream"] = False
+            r = self.session.post(self.base_url + "/api/chat", json=payload,
+                                  timeout=self._timeout(timeout))
+            if not r.ok:
+                return False, f"{r.status_code} {r.text}"
+            data = r.json() or {}
+            if stats is not None:
+                stats.update(_done_stats(data))
+            return True, (data.get("message") or {}).get("content", "")
+        except Exception as e:
+            return False, str(e)
+
+_CLIENTS: Dict[Tuple, OllamaClient] = {}
+_CLIENTS_LOCK = threading.Lock()
+
+def get_client(config: Dict | None = None) -> OllamaClient:
+    """Shared client per resolved host (and pool settings); safe to call from any thread."""
+    http = _http_settings(config)
+    key = (_resolve_host_port(config),) + tuple(sorted(http.items()))
+    with _CLIENTS_LOCK:
+        cli = _CLIENTS.get(key)
+        if cli is None:
+            cli = _CLIENTS[key] = OllamaClient(config, **http)
+        return cli
+
+def close_clients() -> None:
+    with _CLIENTS_LOCK:
+        for cli in _CLIENTS.values():
+            cli.close()
+        _CLIENTS.clear()
+
+# ---------- Server & models ----------
+def server_ok(config: Dict | None = None, timeout: float = 2.0) -> bool:
+    return get_client(config).server_ok(timeout=timeout)
+
+def list_models(config: Dict | None = None) -> List[str]:
+    return get_client(config).list_models()
+
+def list_model_info(config: Dict | None = None) -> Optional[List[Dict]]:
+    return get_client(config).list_model_info()
+
+def show_model(name: str, config: Dict | None = None) -> Optional[Dict]:
+    return get_client(config).show_model(name)
+
+def pull_model(name: str, config: Dict | None = None) -> Tuple[bool, str]:
+    return get_client(config).pull_model(name)
+
+def delete_model(name: str, config: Dict | None = None) -> Tuple[bool, str]:
+    return get_client(config).delete_model(name)
+
+# ---------- Prompt / generate ----------
+def _gen_payload(model: str, text: str, options: Optional[Dict], *,
+                 context: Optional[List[int]] = None,
+                 keep_alive: str | int | None = None) -> Dict:
+    payload = {"model": model, "prompt": text, "stream": True}
+    if options:
+        payload["options"] = options
+    if context:
+        # token context returned by the previous /api/generate turn: the server skips re-prefilling it
+        payload["context"] = context
+    if keep_alive is not None:
+        payload["keep_alive"] = keep_alive
+    return payload
+
+_CHAT_FIELDS = ("role", "content", "images", "tool_calls")
+
+def _chat_payload(model: str, messages: List[Dict], options: Optional[Dict],
+                  keep_alive: str | int | None = None) -> Dict:
+    # stored messages may carry bookkeeping (prompt_eval_count, …); send only what /api/chat knows
+    msgs = [{k: m[k] for k in _CHAT_FIELDS if k in m} for m in messages if m.get("role")]
+    payload = {"model": model, "messages": msgs, "stream": True}
+    if options:
+        payload["options"] = options
+    if keep_alive is not None:
+        # keeps the model (and its KV cache for the shared prefix) resident between turns
+        payload["keep_alive"] = keep_alive
+    return payload
+
+_DONE_FIELDS = ("prompt_eval_count", "eval_count", "total_duration", "load_duration",
+                "prompt_eval_duration", "eval_duration", "context")
+
+def _done_stats(obj: Dict) -> Dict:
+    return {k: obj[k] for k in _DONE_FIELDS if k in obj}
+
+def keep_alive_setting(config: Dict | None) -> str | int | None:
+    if isinstance(config, dict) and isinstance(config.get("ollama"), dict):
+        return config["ollama"].get("keep_alive")
+    return None
+
+def prompt_stream_iter(model: str, text: str, *,
+                       config: Dict | None = None,
+                       options: Dict | None = None,
+                       context: List[int] | None = None,
+                       stats: Dict | None = None,
+                       cancel: StreamCancel | None = None,
+                       timeout: float = 600.0) -> Iterator[str]:
+    """
+    Yields decoded text chunks from Ollama's /api/generate stream.
+    Handles both 'data: {json}' and raw JSON lines. Emits only text pieces.
+    Pass the previous turn's stats['context'] as `context` to continue without re-prefill.
+    Pass a StreamCancel as `cancel` to be able to stop it from another thread.
+    """
+    return get_client(config).generate_stream(model, text, options=options, context=context,
+                                              keep_alive=keep_alive_setting(config),
+                                              stats=stats, cancel=cancel, timeout=timeout)
+
+def chat_stream_iter(model: str, messages: List[Dict], *,
+                     config: Dict | None = None,
+                     options: Dict | None = None,
+                     stats: Dict | None = None,
+                     cancel: StreamCancel | None = None,
+                     timeout: float = 600.0) -> Iterator[str]:
+    """
+    Multi-turn /api/chat stream over the stored messages. With keep_alive set, the server keeps
+    the model loaded and reuses the cached prefix; stats['prompt_eval_count'] shows how many
+    prompt tokens actually had to be evaluated this turn.
+    """
+    return get_client(config).chat_stream(model, messages, options=options,
+                                          keep_alive=keep_alive_setting(config),
+                                          stats=stats, cancel=cancel, timeout=timeout)
+
+def chat(model: str, messages: List[Dict], *,
+         config: Dict | None = None,
+         options: Dict | None = None,
+         stats: Dict | None = None,
+         timeout: float = 600.0) -> Tuple[bool, str]:
+    """Non-streamed /api/chat call; fills `stats` like chat_stream_iter."""
+    return get_client(config).chat(model, messages, options=options,
+                                   keep_alive=keep_alive_setting(config),
+                                   stats=stats, timeout=timeout)
+
 def prompt(model: str, text: str, *,
            config: Dict | None = None,
            options: Dict | None = None,
@@ -144,17 +491,8 @@ def prompt(model: str, text: str, *,
             return True, "".join(acc)
         except Exception as e:
             return False, str(e)
-    try:
-        url = _base_url(config) + "/api/generate"
-        payload = _gen_payload(model, text, options)
-        payload["stream"] = False
-        r = requests.post(url, json=payload, timeout=timeout)
-        if not r.ok:
-            return False, f"{r.status_code} {r.text}"
-        data = r.json() or {}
-        return True, data.get("response", "")
-    except Exception as e:
-        return False, str(e)
+    return get_client(config).generate(model, text, options=options,
+                                       keep_alive=keep_alive_setting(config), timeout=timeout)
 
 # Back-compat for quick_llm_dialog.py
 def generate_once(model: str,
@@ -186,21 +524,223 @@ def _conv_dir() -> Path:
     d.mkdir(parents=True, exist_ok=True)
     return d
 
+# Conversations are append-only JSONL logs: one record per line.
+#   {"meta": {...}}   top-level fields (id, model, …); later records override earlier ones
+#   {"msg":  {...}}   one message, appended in order
+# Legacy pretty-printed <name>.json files are read transparently and migrated on first write.
+# backend="sqlite" keeps the same API but stores everything in conversations.db (see conversation_db).
+_CONV_LOG: Dict = {"backend": "jsonl", "fsync": "interval", "fsync_interval": 2.0, "compact_min": 256}
+_CONV_LOCK = threading.Lock()
+_CONV_STATS: Dict[str, Dict[str, float]] = {}     # name -> {"meta": n redundant meta lines, "msgs": n, "synced": t}
+_CONV_DB = None
+_CONV_DIRTY: set = set()                           # names with appends not yet fsynced ("interval" mode)
+_CONV_TIMER: Optional[threading.Timer] = None
+
+def configure_conversation_log(*, backend: Optional[str] = None,
+                               fsync: Optional[str] = None,
+                               fsync_interval: Optional[float] = None,
+                               compact_min: Optional[int] = None) -> None:
+    """
+    backend: "jsonl" (default, one file per conversation) or "sqlite" (indexed + full-text search).
+    fsync: "always" (every append), "interval" (at most every fsync_interval s), "never".
+    compact_min: rewrite a log once it carries this many superseded meta records.
+    """
+    if backend in ("jsonl", "sqlite"): _CONV_LOG["backend"] = backend
+    if fsync in ("always", "interval", "never"): _CONV_LOG["fsync"] = fsync
+    if fsync_interval is not None: _CONV_LOG["fsync_interval"] = float(fsync_interval)
+    if compact_min is not None: _CONV_LOG["compact_min"] = max(1, int(compact_min))
+
+def _conv_db():
+    """The SQLite store when that backend is selected, else None. Imports existing files once."""
+    global _CONV_DB
+    if _CONV_LOG["backend"] != "sqlite":
+        return None
+    with _CONV_LOCK:
+        if _CONV_DB is None:
+            from .conversation_db import ConversationDB
+            db = ConversationDB(_conv_dir() / "conversations.db")
+            if db.is_empty():
+                for name in _list_conversation_files():
+                    data = _load_conversation_file(name)
+                    if data.get("messages") or len(data) > 2:
+                        db.save(name, data)
+            _CONV_DB = db
+        return _CONV_DB
+
+def _conv_log_path(name: str) -> Path:
+    return _conv_dir() / f"{name}.jsonl"
+
+def _conv_legacy_path(name: str) -> Path:
+    return _conv_dir() / f"{name}.json"
+
 def list_conversations() -> List[str]:
-    return sorted([p.stem for p in _conv_dir().glob("*.json")])
+    db = _conv_db()
+    return db.list() if db is not None else _list_conversation_files()
+
+def _list_conversation_files() -> List[str]:
+    d = _conv_dir()
+    return sorted({p.stem for p in d.glob("*.jsonl")} | {p.stem for p in d.glob("*.json")})
+
+def _read_log(p: Path) -> Tuple[Dict, int]:
+    data: Dict = {"messages": []}
+    meta_lines = 0
+    with p.open("r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                rec = json.loads(line)
+            except Exception:
+                continue      # torn tail after a crash; skip it
+            if "msg" in rec:
+                data["messages"].append(rec["msg"])
+            elif "meta" in rec and isinstance(rec["meta"], dict):
+                data.update({k: v for k, v in rec["meta"].items() if k != "messages"})
+                meta_lines += 1
+    return data, meta_lines
 
 def load_conversation(name: str) -> Dict:
-    p = _conv_dir() / f"{name}.json"
-    if not p.exists():
-        return {"id": name, "messages": []}
+    db = _conv_db()
+    if db is not None:
+        try:
+            return db.load(name) or {"id": name, "messages": []}
+        except Exception:
+            return {"id": name, "messages": []}
+    return _load_conversation_file(name)
+
+def _load_conversation_file(name: str) -> Dict:
+    p = _conv_log_path(name)
     try:
-        return json.loads(p.read_text(encoding="utf-8"))
+        if p.exists():
+            data, meta_lines = _read_log(p)
+            data.setdefault("id", name)
+            _CONV_STATS[name] = {"meta": max(0, meta_lines - 1), "msgs": len(data["messages"]),
+                                 "synced": _CONV_STATS.get(name, {}).get("synced", 0.0)}
+            return data
+        legacy = _conv_legacy_path(name)
+        if legacy.exists():
+            return json.loads(legacy.read_text(encoding="utf-8"))
     except Exception:
-        return {"id": name, "messages": []}
+        pass
+    return {"id": name, "messages": []}
+
+def _fsync(f, name: str, force: bool = False) -> None:
+    """Called with _CONV_LOCK held. In "interval" mode a skipped sync is left to a timer,
+    so the last appends before the app goes idle are on disk within fsync_interval."""
+    global _CONV_TIMER
+    mode = _CONV_LOG["fsync"]
+    st = _CONV_STATS.setdefault(name, {"meta": 0, "msgs": 0, "synced": 0.0})
+    now = time.monotonic()
+    if force or mode == "always" or (mode == "interval" and now - st["synced"] >= _CONV_LOG["fsync_interval"]):
+        f.flush(); os.fsync(f.fileno()); st["synced"] = now
+        _CONV_DIRTY.discard(name)
+    elif mode == "interval":
+        _CONV_DIRTY.add(name)
+        if _CONV_TIMER is None:
+            _CONV_TIMER = threading.Timer(_CONV_LOG["fsync_interval"], sync_conversation_logs)
+            _CONV_TIMER.daemon = True; _CONV_TIMER.start()
+
+def sync_conversation_logs() -> None:
+    """fsync every log with appends that have not been synced yet (timer, close, exit)."""
+    global _CONV_TIMER
+    with _CONV_LOCK:
+        _CONV_TIMER = None
+        names = list(_CONV_DIRTY); _CONV_DIRTY.clear()
+        for name in names:
+            try:
+                with _conv_log_path(name).open("a", encoding="utf-8") as f:
+                    os.fsync(f.fileno())
+                _CONV_STATS.setdefault(name, {"meta": 0, "msgs": 0, "synced": 0.0})["synced"] = time.monotonic()
+            except Exception:
+                pass
+
+atexit.register(sync_conversation_logs)
 
 def save_conversation(name: str, data: Dict) -> None:
-    p = _conv_dir() / f"{name}.json"
-    p.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8")
+    """Rewrite the whole log in compacted form (one meta record + messages)."""
+    db = _conv_db()
+    if db is not None:
+        db.save(name, data); return
+    p = _conv_log_path(name)
+    meta = {k: v for k, v in data.items() if k != "messages"}
+    msgs = data.get("messages") or []
+    tmp = p.with_suffix(".jsonl.tmp")
+    with _CONV_LOCK:
+        with tmp.open("w", encoding="utf-8") as f:
+            f.write(json.dumps({"meta": meta}, ensure_ascii=False) + "\n")
+            for m in msgs:
+                f.write(json.dumps({"msg": m}, ensure_ascii=False) + "\n")
+            _fsync(f, name, force=_CONV_LOG["fsync"] != "never")
+        os.replace(tmp, p)
+        _CONV_STATS[name] = {"meta": 0, "msgs": len(msgs), "synced": time.monotonic()}
+        legacy = _conv_legacy_path(name)
+        if legacy.exists():
+            try: legacy.unlink()
+            except Exception: pass
+
+def _append_records(name: str, records: List[Dict]) -> None:
+    p = _conv_log_path(name)
+    if not p.exists() and _conv_legacy_path(name).exists():
+        save_conversation(name, _load_conversation_file(name))     # one-time migration to JSONL
+    with _CONV_LOCK:
+        fresh = not p.exists()
+        with p.open("a", encoding="utf-8") as f:
+            if fresh:
+                f.write(json.dumps({"meta": {"id": name}}, ensure_ascii=False) + "\n")
+            for rec in records:
+                f.write(json.dumps(rec, ensure_ascii=False) + "\n")
+            _fsync(f, name)
+        st = _CONV_STATS.setdefault(name, {"meta": 0, "msgs": 0, "synced": 0.0})
+        st["meta"] += sum(1 for r in records if "meta" in r)
+        st["msgs"] += sum(1 for r in records if "msg" in r)
+        compact = st["meta"] >= max(_CONV_LOG["compact_min"], st["msgs"])
+    if compact:
+        # superseded meta lines dominate the file: fold them into one header
+        save_conversation(name, _load_conversation_file(name))
+
+def append_message(name: str, message: Dict, *, meta: Optional[Dict] = None) -> None:
+    """O(1) append of one message (plus optional updated meta fields such as the model)."""
+    db = _conv_db()
+    if db is not None:
+        db.append(name, [message], meta); return
+    recs: List[Dict] = []
+    if meta:
+        recs.append({"meta": meta})
+    recs.append({"msg": message})
+    _append_records(name, recs)
+
+def update_conversation_meta(name: str, **fields) -> None:
+    """O(1) update of top-level fields (e.g. model=…) without rewriting messages."""
+    if not fields:
+        return
+    db = _conv_db()
+    if db is not None:
+        db.update_meta(name, fields); return
+    _append_records(name, [{"meta": fields}])
+
+def search_conversations(query: str, limit: int = 50) -> List[Dict]:
+    """
+    Find messages containing `query` → [{conv, seq, role, snippet}].
+    Uses the FTS5 index with the sqlite backend; the file backend falls back to a linear scan.
+    """
+    db = _conv_db()
+    if db is not None:
+        return db.search(query, limit)
+    q = (query or "").strip().lower()
+    hits: List[Dict] = []
+    if not q:
+        return hits
+    for name in _list_conversation_files():
+        for i, m in enumerate(_load_conversation_file(name).get("messages", [])):
+            c = m.get("content") or ""
+            at = c.lower().find(q)
+            if at >= 0:
+                hits.append({"conv": name, "seq": i, "role": m.get("role"),
+                             "snippet": c[max(0, at - 40): at + len(q) + 40]})
+                if len(hits) >= limit:
+                    return hits
+    return hits
 
 # ---------- Ollama binary helpers ----------
 def which_ollama() -> Optional[str]:
@@ -0,0 +1,214 @@
+from __future__ import annotations
+import threading, time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field, replace
+from typing import Deque, Dict, List, Optional, Tuple
+from PySide6.QtCore import QObject, Signal
+from .ollama_tools import StreamCancel, get_client
+
+def _fmt_bytes(n: float) -> str:
+    return f"{n / 1e9:.2f} GB" if n >= 1e9 else f"{n / 1e6:.1f} MB"
+
+@dataclass
+class PullProgress:
+    name: str
+    state: str = "queued"            # queued | pulling | waiting | done | failed | cancelled
+    status: str = ""                 # last server status line ("pulling 8eeb52dfb3bb", "verifying…")
+    layers: Dict[str, Tuple[int, int]] = field(default_factory=dict)   # digest -> (completed, total)
+    rate_bps: float = 0.0
+    attempts: int = 0
+    error: str = ""
+
+    @property
+    def completed(self) -> int:
+        return sum(c for c, _ in self.layers.values())
+
+    @property
+    def total(self) -> int:
+        return sum(t for _, t in self.layers.values())
+
+    @property
+    def fraction(self) -> float:
+        return self.completed / self.total if self.total else 0.0
+
+    @property
+    def eta_s(self) -> Optional[float]:
+        return (self.total - self.completed) / self.rate_bps if self.rate_bps > 0 and self.total else None
+
+    def label(self) -> str:
+        if self.state in ("done", "failed", "cancelled", "queued"):
+            return f"{self.name}: {self.state}" + (f" ({self.error})" if self.error else "")
+        txt = f"{self.name}: {self.status or self.state}"
+        if self.total:
+            txt += f" — {_fmt_bytes(self.completed)} / {_fmt_bytes(self.total)}"
+        if self.rate_bps > 0:
+            txt += f", {_fmt_bytes(self.rate_bps)}/s"
+        if self.eta_s is not None:
+            m, s = divmod(int(self.eta_s), 60)
+            txt += f", ETA {m}:{s:02d}"
+        if self.state == "waiting":
+            txt += " (reconnecting…)" if self.error else " (bandwidth cap)"
+        return txt
+
+class PullManager(QObject):
+    """
+    Queue of streaming /api/pull jobs, `concurrency` at a time, off the GUI thread.
+      • per-layer progress, rate (3 s sliding window) and ETA via progress(name, PullProgress)
+      • dropped connections are retried with backoff; the server keeps partial blobs, so a
+        re-pull resumes instead of starting over
+      • max_bps > 0 caps the download rate, shared across running pulls. The download runs
+        inside the Ollama server, so the cap is enforced by duty-cycling: when a pull gets
+        ahead of its share, its stream is closed and resumed once the average is back under
+        the cap.
+    """
+    progress = Signal(str, object)      # name, PullProgress (a snapshot)
+    finished = Signal(str, bool, str)   # name, ok, message
+
+    def __init__(self, config: Dict | None = None, *, concurrency: int = 2, max_bps: float = 0,
+                 retries: int = 5, backoff: float = 2.0, emit_interval: float = 0.2, parent=None):
+        super().__init__(parent)
+        self.config = config
+        self.concurrency = max(1, int(concurrency))
+        self.max_bps = float(max_bps or 0)
+        self.retries, self.backoff, self.emit_interval = retries, backoff, emit_interval
+        self._pool = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="ollama-pull")
+        self._lock = threading.Lock()
+        self._jobs: Dict[str, PullProgress] = {}
+        self._cancels: Dict[str, StreamCancel] = {}
+        self._stopped: set = set()
+
+    def set_config(self, config: Dict | None) -> None:
+        self.config = config
+
+    def jobs(self) -> List[PullProgress]:
+        with self._lock:
+            return [replace(j, layers=dict(j.layers)) for j in self._jobs.values()]
+
+    def active(self) -> List[str]:
+        with self._lock:
+            return [n for n, j in self._jobs.items() if j.state in ("queued", "pulling", "waiting")]
+
+    def enqueue(self, name: str) -> bool:
+        """False when that model is already queued or pulling."""
+        name = name.strip()
+        with self._lock:
+            if not name or name in self._jobs and self._jobs[name].state in ("queued", "pulling", "waiting"):
+                return False
+            job = self._jobs[name] = PullProgress(name)
+            self._stopped.discard(name)
+        self._emit(job)
+        self._pool.submit(self._run, job)
+        return True
+
+    def cancel(self, name: Optional[str] = None) -> None:
+        with self._lock:
+            names = [name] if name else list(self._jobs)
+            self._stopped.update(names)
+            cancels = [self._cancels[n] for n in names if n in self._cancels]
+        for c in cancels:
+            c.cancel()
+
+    def shutdown(self) -> None:
+        self.cancel()
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+    # ----- worker side -----
+    def _emit(self, job: PullProgress) -> None:
+        try: self.progress.emit(job.name, replace(job, layers=dict(job.layers)))
+        except RuntimeError: pass
+
+    def _finish(self, job: PullProgress, ok: bool, msg: str) -> None:
+        job.state = "done" if ok else ("cancelled" if job.name in self._stopped else "failed")
+        job.rate_bps = 0.0
+        if not ok and job.state == "failed": job.error = msg
+        self._emit(job)
+        try: self.finished.emit(job.name, ok, msg if job.state != "cancelled" else "cancelled")
+        except RuntimeError: pass
+
+    def _share_bps(self) -> float:
+        with self._lock:
+            running = sum(1 for j in self._jobs.values() if j.state in ("pulling", "waiting")) or 1
+        return self.max_bps / running
+
+    def _run(self, job: PullProgress) -> None:
+        if job.name in self._stopped:
+            return self._finish(job, False, "cancelled")
+        window: Deque[Tuple[float, int]] = deque()
+        failures = 0
+        cap_start: Optional[Tuple[float, int]] = None     # (t, bytes) when the capped stretch began
+        while True:
+            cancel = StreamCancel()
+            with self._lock:
+                if job.name in self._stopped:
+                    break
+                self._cancels[job.name] = cancel
+            job.state = "pulling"; job.attempts += 1; job.error = ""
+            self._emit(job)
+            throttled = False
+            last_emit = 0.0
+            try:
+                for rec in get_client(self.config).pull_stream(job.name, cancel=cancel):
+                    if "error" in rec:
+                        return self._finish(job, False, str(rec["error"]))
+                    job.status = str(rec.get("status", job.status))
+                    if rec.get("digest") and rec.get("total"):
+                        job.layers[rec["digest"]] = (int(rec.get("completed") or 0), int(rec["total"]))
+                    if job.status == "success":
+                        return self._finish(job, True, "pulled")
+                    now = time.monotonic(); done = job.completed
+                    window.append((now, done))
+                    while len(window) > 2 and now - window[0][0] > 3.0:
+                        window.popleft()
+                    dt = now - window[0][0]
+                    if dt > 0.2:
+                        job.rate_bps = max(0.0, (done - window[0][1]) / dt)
+                    failures = 0
+                    if self.max_bps > 0:
+                        cap_start = cap_start or (now, done)
+                        allowed = (now - cap_start[0]) * self._share_bps()
+                        if done - cap_start[1] > allowed + self._share_bps():   # > 1 s ahead of the cap
+                            throttled = True; cancel.cancel(); break
+                    if now - last_emit >= self.emit_interval:
+                        last_emit = now; self._emit(job)
+                if job.name in self._stopped:
+                    break
+                if throttled:
+                    # sleep until the average is back under the cap, then resume the pull
+                    job.state = "waiting"; job.rate_bps = 0.0; self._emit(job)
+                    now = time.monotonic()
+                    ahead = (job.completed - cap_start[1]) / self._share_bps() - (now - cap_start[0])
+                    if self._sleep(job, max(0.5, ahead)):
+                        break
+                    continue
+                raise ConnectionError("stream ended before success")
+            except Exception as e:
+                if job.name in self._stopped:
+                    break
+                failures += 1
+                if failures > self.retries:
+                    return self._finish(job, False, f"{e} (after {failures} attempts)")
+                job.state = "waiting"; job.error = str(e)[:200]; job.rate_bps = 0.0
+                self._emit(job)
+                if self._sleep(job, min(60.0, self.backoff * 2 ** (failures - 1))):
+                    break
+            finally:
+                with self._lock:
+                    if self._cancels.get(job.name) is cancel:
+                        self._cancels.pop(job.name, None)
+        self._finish(job, False, "cancelled")
+
+    def _sleep(self, job: PullProgress, seconds: float) -> bool:
+        """Interruptible wait; True when the job was cancelled meanwhile."""
+        end = time.monotonic() + seconds
+        while time.monotonic() < end:
+            if job.name in self._stopped:
+                return True
+            time.sleep(min(0.1, end - time.monotonic()) if end > time.monotonic() else 0)
+        return job.name in self._stopped
+
+def pull_manager_from_config(config: Dict | None, parent=None) -> PullManager:
+    sect = ((config or {}).get("ollama") or {}).get("pull", {}) if isinstance(config, dict) else {}
+    return PullManager(config, concurrency=int(sect.get("concurrency", 2)),
+                       max_bps=float(sect.get("max_mbps", 0) or 0) * 1e6 / 8,
+                       retries=int(sect.get("retries", 5)), parent=parent)
@@ -0,0 +1,144 @@
+from __future__ import annotations
+import threading, time
+from typing import Dict, List, Optional
+from PySide6.QtCore import QObject, Signal
+from .ollama_tools import get_client, keep_alive_setting
+
+class ResidencyManager(QObject):
+    """
+    Keeps the model the user is working with loaded in Ollama, within a memory budget.
+      • polls /api/ps every `poll_s` seconds → changed(list of loaded models, each with last_used)
+      • select(name) preloads the model (empty /api/generate + keep_alive) on the worker
+        thread, so the first prompt after a switch does not pay the cold load
+      • before a preload and after each poll, least-recently-used models are unloaded
+        (keep_alive 0) until the loaded total fits `budget_bytes` (0 = no budget).
+        The selected model is never evicted.
+    Loads and unloads run one at a time on a single thread; only the newest selection is kept.
+    """
+    changed = Signal(list)                # [{name, size, size_vram, expires_at, last_used}]
+    preloaded = Signal(str, bool, float)  # name, ok, seconds
+
+    def __init__(self, config: Dict | None = None, *, budget_bytes: float = 0, poll_s: float = 5.0,
+                 preload: bool = True, parent=None):
+        super().__init__(parent)
+        self.config = config
+        self.budget_bytes = float(budget_bytes or 0)
+        self.poll_s = max(0.5, float(poll_s))
+        self.preload = preload
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._loaded: List[Dict] = []
+        self._last_used: Dict[str, float] = {}
+        self._sizes: Dict[str, int] = {}     # resident size last seen in /api/ps (better than the file size)
+        self._selected: Optional[str] = None
+        self._want: Optional[tuple] = None   # (name, size_hint, options) waiting to be preloaded
+
+    def set_config(self, config: Dict | None) -> None:
+        self.config = config
+        self._wake.set()
+
+    def start(self) -> None:
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="ollama-residency", daemon=True)
+        self._thread.start()
+
+    def stop(self, wait: float = 1.0) -> None:
+        self._stop.set(); self._wake.set()
+        if self._thread:
+            self._thread.join(wait)
+        self._thread = None
+
+    def loaded(self) -> List[Dict]:
+        with self._lock:
+            return [dict(m) for m in self._loaded]
+
+    def touch(self, name: str) -> None:
+        with self._lock:
+            self._last_used[name] = time.time()
+
+    def select(self, name: str, size_hint: int = 0, options: Optional[Dict] = None) -> None:
+        """The user picked `name`: mark it used, protect it from eviction and preload it
+        (with the options chat requests will use, e.g. num_ctx, so they don't reload it)."""
+        if not name:
+            return
+        with self._lock:
+            self._selected = name
+            self._last_used[name] = time.time()
+            if self.preload:
+                self._want = (name, int(size_hint or 0), options)
+        self._wake.set()
+
+    # ----- worker side -----
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self._wake.clear()
+            with self._lock:
+                want, self._want = self._want, None
+            try:
+                if want:
+                    self._preload(*want)
+                self._poll()
+            except Exception:
+                pass
+            self._wake.wait(self.poll_s)
+
+    def _poll(self, evict: bool = True) -> Optional[List[Dict]]:
+        models = get_client(self.config).running_models()
+        if models is None:
+            return None
+        snap = []
+        with self._lock:
+            for m in models:
+                nm = m.get("name") or m.get("model") or ""
+                size = int(m.get("size") or 0)
+                if size: self._sizes[nm] = size
+                self._last_used.setdefault(nm, 0.0)   # loaded by someone else: first to go
+                snap.append({"name": nm, "size": size, "size_vram": int(m.get("size_vram") or 0),
+                             "expires_at": m.get("expires_at") or "", "last_used": self._last_used[nm]})
+            self._loaded = snap
+        try: self.changed.emit([dict(m) for m in snap])
+        except RuntimeError: return None
+        if evict and self._evict():
+            return self._poll(evict=False)
+        return snap
+
+    def _evict(self, incoming: str = "", incoming_size: int = 0) -> bool:
+        """Unload LRU models until loaded + incoming fits the budget. True when something was unloaded."""
+        if self.budget_bytes <= 0:
+            return False
+        with self._lock:
+            loaded = [m for m in self._loaded if m["name"] != incoming]
+            keep = {self._selected, incoming}
+            over = sum(m["size"] for m in loaded) + incoming_size - self.budget_bytes
+            victims = sorted((m for m in loaded if m["name"] not in keep), key=lambda m: m["last_used"])
+        evicted = False
+        client = get_client(self.config)
+        for m in victims:
+            if over <= 0 or self._stop.is_set():
+                break
+            ok, _ = client.unload_model(m["name"])
+            if ok:
+                over -= m["size"]; evicted = True
+        return evicted
+
+    def _preload(self, name: str, size_hint: int, options: Optional[Dict] = None) -> None:
+        if self._poll() is None:
+            return
+        with self._lock:
+            size = self._sizes.get(name, size_hint)
+        if self._evict(name, size):
+            self._poll(evict=False)
+        t0 = time.perf_counter()
+        ok, _ = get_client(self.config).load_model(name, keep_alive=keep_alive_setting(self.config), options=options)
+        try: self.preloaded.emit(name, ok, time.perf_counter() - t0)
+        except RuntimeError: pass
+
+def residency_from_config(config: Dict | None, parent=None) -> ResidencyManager:
+    sect = ((config or {}).get("ollama") or {}).get("residency", {}) if isinstance(config, dict) else {}
+    return ResidencyManager(config, budget_bytes=float(sect.get("budget_gb", 0) or 0) * 1e9,
+                            poll_s=float(sect.get("poll_s", 5) or 5),
+                            preload=bool(sect.get("preload", True)), parent=parent)
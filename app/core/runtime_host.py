@@ -0,0 +1,357 @@
+from __future__ import annotations
+import atexit, itertools, json, os, struct, subprocess, threading, time
+from concurrent.futures import Future
+from typing import Any, Dict, List, Optional
+from .paths import logs_dir
+from .venv_tools import _pybin
+
+# Wire format (both directions): 4-byte big-endian length + UTF-8 JSON object.
+#   request   {"id": int, "method": str, "params": {...}}
+#   response  {"id": int, "result": ...}  or  {"id": int, "error": str, "trace": str}
+_HDR = struct.Struct(">I")
+_MAX_FRAME = 256 * 1024 * 1024
+
+# Runs inside the venv interpreter. Requests are served by a small thread pool, so a
+# long job does not block ping/health checks. Objects created by "load" stay resident
+# in `models` until "unload" or shutdown. Job output on stdout is redirected to stderr
+# so it cannot corrupt the framed channel.
+_WORKER_CODE = r"""
+import sys, os, json, struct, threading, time, importlib, traceback
+from concurrent.futures import ThreadPoolExecutor
+HDR = struct.Struct(">I")
+proto_out = os.fdopen(os.dup(1), "wb", buffering=0)
+os.dup2(2, 1); sys.stdout = sys.stderr
+proto_in = sys.stdin.buffer
+cfg = json.loads(sys.argv[1]) if len(sys.argv) > 1 else {}
+for p in cfg.get("sys_path", []):
+    sys.path.insert(0, p)
+write_lock = threading.Lock(); models = {}; models_lock = threading.Lock()
+started = time.time(); jobs = [0]
+def send(obj):
+    data = json.dumps(obj, default=repr).encode("utf-8")
+    with write_lock:
+        proto_out.write(HDR.pack(len(data)) + data)
+def resolve(target):
+    mod, _, attr = target.partition(":")
+    obj = importlib.import_module(mod)
+    for part in filter(None, attr.split(".")):
+        obj = getattr(obj, part)
+    return obj
+def m_ping(p):
+    with models_lock: keys = sorted(models)
+    return {"pid": os.getpid(), "uptime": round(time.time() - started, 3), "jobs": jobs[0],
+            "models": keys, "python": sys.version.split()[0]}
+def m_import(p):
+    t0 = time.perf_counter()
+    for m in p.get("modules", []): importlib.import_module(m)
+    return {"import_s": round(time.perf_counter() - t0, 4)}
+def m_call(p):
+    return resolve(p["target"])(*p.get("args", []), **p.get("kwargs", {}))
+def m_load(p):
+    key = p["key"]
+    with models_lock:
+        if key in models and not p.get("reload"): return {"key": key, "cached": True}
+    t0 = time.perf_counter()
+    obj = resolve(p["target"])(*p.get("args", []), **p.get("kwargs", {}))
+    with models_lock: models[key] = obj
+    return {"key": key, "cached": False, "load_s": round(time.perf_counter() - t0, 4)}
+def m_invoke(p):
+    with models_lock: obj = models[p["key"]]
+    fn = getattr(obj, p["method"]) if p.get("method") else obj
+    return fn(*p.get("args", []), **p.get("kwargs", {}))
+def m_unload(p):
+    with models_lock: return models.pop(p["key"], None) is not None
+METHODS = {"ping": m_ping, "import": m_import, "call": m_call, "load": m_load,
+           "invoke": m_invoke, "unload": m_unload}
+def handle(req):
+    rid = req.get("id")
+    try:
+        jobs[0] += 1
+        send({"id": rid, "result": METHODS[req["method"]](req.get("params") or {})})
+    except BaseException as e:
+        send({"id": rid, "error": f"{type(e).__name__}: {e}", "trace": traceback.format_exc()})
+pool = ThreadPoolExecutor(max_workers=max(1, int(cfg.get("threads", 2))))
+for m in cfg.get("preload", []):
+    try: importlib.import_module(m)
+    except Exception: pass
+send({"id": 0, "result": {"ready": True, "pid": os.getpid()}})
+while True:
+    hdr = proto_in.read(HDR.size)
+    if len(hdr) < HDR.size: break
+    req = json.loads(proto_in.read(HDR.unpack(hdr)[0]).decode("utf-8"))
+    if req.get("method") == "shutdown":
+        send({"id": req.get("id"), "result": True}); break
+    if req.get("method") == "ping": handle(req)
+    else: pool.submit(handle, req)
+pool.shutdown(wait=False)
+os._exit(0)
+"""
+
+class RuntimeHostError(RuntimeError):
+    pass
+
+class RuntimeWorker:
+    """
+    One warm interpreter for a venv, started on first use.
+    Requests are multiplexed over one pipe pair: every request carries an id, and a reader
+    thread resolves the matching Future when its response arrives, in any order.
+      • call(target, …)          run "pkg.module:function" once
+      • load(key, target, …)     build an object (model, pipeline…) and keep it resident
+      • invoke(key, method, …)   call a method on a resident object
+      • ping()                   health check (answered even while jobs are running)
+    """
+    code = _WORKER_CODE         # script run inside the venv interpreter (subclasses swap it)
+
+    def __init__(self, venv_name: str, *, threads: int = 2, preload: Optional[List[str]] = None,
+                 env: Optional[Dict[str, str]] = None, start_timeout: float = 60.0):
+        self.venv = venv_name
+        self.threads = threads
+        self.preload = list(preload or [])
+        self.env = env
+        self.start_timeout = start_timeout
+        self.last_used = time.monotonic()
+        self._proc: Optional[subprocess.Popen] = None
+        self._pending: Dict[int, Future] = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.RLock()
+        self._write_lock = threading.Lock()
+        self._log = None
+
+    # ----- lifecycle -----
+    @property
+    def log_name(self) -> str:
+        return f"runtime_{self.venv}"
+
+    @property
+    def running(self) -> bool:
+        return self._proc is not None and self._proc.poll() is None
+
+    @property
+    def pid(self) -> Optional[int]:
+        return self._proc.pid if self.running else None
+
+    def busy(self) -> bool:
+        with self._lock:
+            return bool(self._pending)
+
+    def start(self) -> None:
+        with self._lock:
+            if self.running:
+                return
+            py = _pybin(self.venv)
+            if not py.exists():
+                raise RuntimeHostError(f"{self.venv}: venv not created")
+            logs_dir().mkdir(parents=True, exist_ok=True)
+            self._log = open(logs_dir() / f"{self.log_name}.log", "ab")
+            cfg = {"threads": self.threads, "preload": self.preload}
+            env = dict(os.environ, **(self.env or {}), PYTHONUNBUFFERED="1")
+            self._proc = subprocess.Popen([str(py), "-u", "-c", self.code, json.dumps(cfg)],
+                                          stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                          stderr=self._log, env=env)
+            ready = Future(); self._pending = {0: ready}
+            threading.Thread(target=self._reader, args=(self._proc,), name=f"rt-{self.venv}", daemon=True).start()
+        try:
+            ready.result(self.start_timeout)
+        except Exception as e:
+            self.stop(); raise RuntimeHostError(f"{self.venv}: worker failed to start ({e})")
+
+    def stop(self, timeout: float = 3.0) -> None:
+        with self._lock:
+            proc, self._proc = self._proc, None
+        if proc is None:
+            return
+        try:
+            if proc.poll() is None:
+                self._send(proc, {"id": -1, "method": "shutdown"})
+                proc.wait(timeout)
+        except Exception:
+            proc.kill()
+        finally:
+            try: proc.stdin.close()
+            except Exception: pass
+            if self._log:
+                try: self._log.close()
+                except Exception: pass
+                self._log = None
+
+    # ----- transport -----
+    def _reader(self, proc: subprocess.Popen) -> None:
+        f = proc.stdout
+        reason = "worker exited"
+        try:
+            while True:
+                hdr = f.read(_HDR.size)
+                if len(hdr) < _HDR.size:
+                    break
+                n = _HDR.unpack(hdr)[0]
+                if n > _MAX_FRAME:
+                    reason = f"oversized frame ({n} bytes)"; break
+                msg = json.loads(f.read(n).decode("utf-8"))
+                with self._lock:
+                    fut = self._pending.pop(msg.get("id"), None)
+                if fut is None:
+                    continue
+                if "error" in msg:
+                    fut.set_exception(RuntimeHostError(msg["error"]))
+                else:
+                    fut.set_result(msg.get("result"))
+        except Exception as e:
+            reason = f"protocol error ({e})"
+        # treat a broken stream like a crash: the worker is killed, waiting requests fail and
+        # the next submit() starts a fresh worker
+        if proc.poll() is None:
+            try: proc.kill(); proc.wait(5)
+            except Exception: pass
+        try: proc.stdin.close()
+        except Exception: pass
+        with self._lock:
+            log = None
+            if self._proc is proc:
+                self._proc = None; log, self._log = self._log, None
+            pending, self._pending = self._pending, {}
+        if log:
+            try: log.close()
+            except Exception: pass
+        for fut in pending.values():
+            if not fut.done():
+                fut.set_exception(RuntimeHostError(f"{self.venv}: {reason}"))
+
+    def _send(self, proc: subprocess.Popen, obj: Dict) -> None:
+        data = json.dumps(obj).encode("utf-8")
+        with self._write_lock:
+            proc.stdin.write(_HDR.pack(len(data)) + data)
+            proc.stdin.flush()
+
+    def submit(self, method: str, params: Optional[Dict] = None) -> Future:
+        """Send one request; the Future resolves with its result (requests may complete out of order)."""
+        self.start()
+        fut: Future = Future()
+        with self._lock:
+            proc = self._proc
+            if proc is None:
+                raise RuntimeHostError(f"{self.venv}: worker not running")
+            rid = next(self._ids)
+            self._pending[rid] = fut
+        self.last_used = time.monotonic()
+        try:
+            self._send(proc, {"id": rid, "method": method, "params": params or {}})
+        except Exception as e:
+            with self._lock:
+                self._pending.pop(rid, None)
+            raise RuntimeHostError(f"{self.venv}: send failed ({e})")
+        fut.add_done_callback(lambda _f: setattr(self, "last_used", time.monotonic()))
+        return fut
+
+    def request(self, method: str, params: Optional[Dict] = None, timeout: Optional[float] = None) -> Any:
+        return self.submit(method, params).result(timeout)
+
+    # ----- API -----
+    def ping(self, timeout: float = 5.0) -> Dict:
+        return self.request("ping", timeout=timeout)
+
+    def call(self, target: str, *args, timeout: Optional[float] = None, **kwargs) -> Any:
+        return self.request("call", {"target": target, "args": list(args), "kwargs": kwargs}, timeout)
+
+    def load(self, key: str, target: str, *args, reload: bool = False,
+             timeout: Optional[float] = None, **kwargs) -> Dict:
+        return self.request("load", {"key": key, "target": target, "args": list(args),
+                                     "kwargs": kwargs, "reload": reload}, timeout)
+
+    def invoke(self, key: str, method: str = "", *args, timeout: Optional[float] = None, **kwargs) -> Any:
+        return self.request("invoke", {"key": key, "method": method, "args": list(args), "kwargs": kwargs}, timeout)
+
+    def unload(self, key: str) -> bool:
+        return bool(self.request("unload", {"key": key}, 30.0))
+
+class RuntimeHost:
+    """
+    Keeps at most one RuntimeWorker per venv. Workers start lazily on first use and are
+    stopped after `idle_timeout` seconds without requests; resident models go with them.
+    """
+    def __init__(self, *, idle_timeout: float = 600.0, threads: int = 2,
+                 env: Optional[Dict[str, str]] = None):
+        self.idle_timeout = idle_timeout
+        self.threads = threads
+        self.env = env
+        self._workers: Dict[str, RuntimeWorker] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._reaper: Optional[threading.Thread] = None
+
+    def worker(self, venv_name: str) -> RuntimeWorker:
+        with self._lock:
+            w = self._workers.get(venv_name)
+            if w is None:
+                w = self._workers[venv_name] = RuntimeWorker(venv_name, threads=self.threads, env=self.env)
+            self._ensure_reaper()
+        return w
+
+    def fork_server(self, venv_name: str):
+        """Pre-imported fork-server for `venv_name` (Linux only, see fork_server.py)."""
+        from .fork_server import ForkServer
+        key = f"fork:{venv_name}"
+        with self._lock:
+            w = self._workers.get(key)
+            if w is None:
+                w = self._workers[key] = ForkServer(venv_name, env=self.env)
+            self._ensure_reaper()
+        return w
+
+    def _ensure_reaper(self) -> None:
+        if self._reaper is None and self.idle_timeout > 0:
+            self._reaper = threading.Thread(target=self._reap, name="rt-reaper", daemon=True)
+            self._reaper.start()
+
+    def call(self, venv_name: str, target: str, *args, **kwargs) -> Any:
+        return self.worker(venv_name).call(target, *args, **kwargs)
+
+    def health(self, timeout: float = 5.0) -> Dict[str, Dict]:
+        """Ping every running worker → {venv (or "fork:venv"): ping result | {"ok": False, "error": …}}. Dead ones are stopped."""
+        with self._lock:
+            workers = [(k, w) for k, w in self._workers.items() if w.running]
+        out: Dict[str, Dict] = {}
+        for key, w in workers:
+            try:
+                out[key] = dict(w.ping(timeout), ok=True)
+            except Exception as e:
+                out[key] = {"ok": False, "error": str(e)}
+                w.stop(0.5)      # restarted lazily on next use
+        return out
+
+    def _reap(self) -> None:
+        while not self._stop.wait(min(30.0, max(1.0, self.idle_timeout / 4))):
+            now = time.monotonic()
+            with self._lock:
+                idle = [w for w in self._workers.values()
+                        if w.running and not w.busy() and now - w.last_used > self.idle_timeout]
+            for w in idle:
+                w.stop()
+
+    def shutdown(self) -> None:
+        self._stop.set()
+        with self._lock:
+            workers = list(self._workers.values())
+        for w in workers:
+            w.stop()
+
+_HOST: Optional[RuntimeHost] = None
+_HOST_LOCK = threading.Lock()
+
+def runtime_host(config: Dict | None = None) -> RuntimeHost:
+    """Process-wide host, configured from settings['runtimes'] on first use."""
+    global _HOST
+    with _HOST_LOCK:
+        if _HOST is None:
+            sect = (config or {}).get("runtimes", {}) if isinstance(config, dict) else {}
+            paths = (config or {}).get("paths", {}) if isinstance(config, dict) else {}
+            env = {"HF_HOME": paths["hf_home"]} if paths.get("hf_home") else None
+            _HOST = RuntimeHost(idle_timeout=float(sect.get("idle_timeout", 600)),
+                                threads=int(sect.get("worker_threads", 2)), env=env)
+            atexit.register(_HOST.shutdown)
+        return _HOST
+
+def shutdown_runtime_host() -> None:
+    with _HOST_LOCK:
+        host = _HOST
+    if host is not None:
+        host.shutdown()
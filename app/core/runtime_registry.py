@@ -1,32 +1,242 @@
 from __future__ import annotations
-import json
+import contextlib, ctypes, ctypes.util, json, os, select, struct, threading, time
 from pathlib import Path
-from typing import Dict
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+from PySide6.QtCore import QObject, Signal
 from .paths import venvs_dir, runtime_registry_path
 from .venv_tools import is_created
 
-def _read_json(p: Path) -> Dict:
-    if not p.exists(): return {}
+# runtime_registry.json is shared by every AFTP app on the machine:
+#   {"version": n, "updated": ts, "venvs": {name: {"path": …}}}
+# Writers take an exclusive lock on runtime_registry.json.lock, write a temp file and
+# os.replace() it, and bump "version" only when the content changed. Readers never lock;
+# they just compare "version" (or the file's mtime) to know whether anything moved.
+
+@contextlib.contextmanager
+def _file_lock(path: Path) -> Iterator[None]:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path.with_name(path.name + ".lock"), "a+b") as f:
+        if os.name == "nt":
+            import msvcrt
+            f.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1); break
+                except OSError:
+                    time.sleep(0.05)
+            try: yield
+            finally:
+                f.seek(0); msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            try: yield
+            finally: fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+_READ_MEMO: Dict[str, Tuple[Tuple[int, int, int], Dict]] = {}
+_MEMO_LOCK = threading.Lock()
+
+def _read_json(p: Path, *, memo: bool = True) -> Dict:
+    """Parsed file, re-read only when (inode, mtime_ns, size) changed. Callers get a copy.
+    Every write is an os.replace(), so a new inode catches rewrites inside the mtime
+    granularity; read-modify-write under the lock still passes memo=False."""
     try:
-        return json.loads(p.read_text(encoding="utf-8"))
+        st = p.stat()
+    except OSError:
+        return {}
+    key = (st.st_ino, st.st_mtime_ns, st.st_size)
+    with _MEMO_LOCK:
+        hit = _READ_MEMO.get(str(p))
+    if memo and hit and hit[0] == key:
+        return json.loads(json.dumps(hit[1]))
+    try:
+        data = json.loads(p.read_text(encoding="utf-8"))
     except Exception:
         return {}
+    with _MEMO_LOCK:
+        _READ_MEMO[str(p)] = (key, data)
+    return json.loads(json.dumps(data))
 
 def _write_json(p: Path, data: Dict) -> None:
+    """Atomic replace: readers see either the old or the new file, never a torn one."""
     p.parent.mkdir(parents=True, exist_ok=True)
-    p.write_text(json.dumps(data, indent=2, sort_keys=True), encoding="utf-8")
+    tmp = p.with_name(f"{p.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(json.dumps(data, indent=2, sort_keys=True))
+            f.flush(); os.fsync(f.fileno())
+        os.replace(tmp, p)
+    finally:
+        with contextlib.suppress(OSError): tmp.unlink()
 
-def rescan_and_update(expected: Dict[str, dict]) -> Dict:
+def _entry(name: str) -> Optional[Dict]:
+    return {"path": str((venvs_dir() / name).resolve())} if is_created(name) else None
+
+def rescan_and_update(expected: Dict[str, dict] | Iterable[str], names: Optional[Iterable[str]] = None) -> Dict:
+    """
+    Re-check `names` (default: every expected venv) and update the registry under the lock.
+    The file is rewritten, and its version bumped, only if an entry actually changed.
+    """
+    wanted = set(expected)
+    names = wanted if names is None else wanted & set(names)
     reg_path = runtime_registry_path()
-    reg = _read_json(reg_path)
-    reg.setdefault("venvs", {})
-    for name in expected.keys():
-        if is_created(name):
-            reg["venvs"][name] = {"path": str((venvs_dir() / name).resolve())}
-        else:
-            reg["venvs"].pop(name, None)
-    _write_json(reg_path, reg)
+    with _file_lock(reg_path):
+        reg = _read_json(reg_path, memo=False)   # another process may have written since our last read
+        venvs = reg.setdefault("venvs", {})
+        changed = False
+        for name in names:
+            ent = _entry(name)
+            if ent is None:
+                changed |= venvs.pop(name, None) is not None
+            elif venvs.get(name) != ent:
+                venvs[name] = ent; changed = True
+        if changed or "version" not in reg:
+            reg["version"] = int(reg.get("version", 0)) + 1
+            reg["updated"] = time.time()
+            _write_json(reg_path, reg)
     return reg
 
 def read_registry() -> Dict:
     return _read_json(runtime_registry_path())
+
+def registry_version() -> int:
+    return int(read_registry().get("version", 0) or 0)
+
+# ---------- change notification ----------
+_IN_ATTRIB, _IN_CLOSE_WRITE, _IN_MOVED_FROM, _IN_MOVED_TO = 0x4, 0x8, 0x40, 0x80
+_IN_CREATE, _IN_DELETE, _IN_DELETE_SELF, _IN_IGNORED = 0x100, 0x200, 0x400, 0x8000
+_IN_NONBLOCK, _IN_CLOEXEC = 0o4000, 0o2000000
+_WATCH_MASK = _IN_CREATE | _IN_DELETE | _IN_MOVED_FROM | _IN_MOVED_TO | _IN_ATTRIB | _IN_DELETE_SELF
+_EVT = struct.Struct("iIII")
+
+class _Inotify:
+    """Minimal ctypes inotify (Linux). Raises OSError when unavailable."""
+    def __init__(self):
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        if not hasattr(libc, "inotify_init1"):
+            raise OSError("inotify not available")
+        self._libc = libc
+        self.fd = libc.inotify_init1(_IN_NONBLOCK | _IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+
+    def add(self, path: Path, mask: int) -> int:
+        return self._libc.inotify_add_watch(self.fd, os.fsencode(str(path)), mask)
+
+    def read(self, timeout: float) -> List[Tuple[int, int, str]]:
+        if not select.select([self.fd], [], [], timeout)[0]:
+            return []
+        try:
+            buf = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+        out, i = [], 0
+        while i + _EVT.size <= len(buf):
+            wd, mask, _cookie, n = _EVT.unpack_from(buf, i)
+            name = buf[i + _EVT.size:i + _EVT.size + n].rstrip(b"\0").decode("utf-8", "replace")
+            out.append((wd, mask, name)); i += _EVT.size + n
+        return out
+
+    def close(self) -> None:
+        with contextlib.suppress(OSError): os.close(self.fd)
+
+class RegistryWatcher(QObject):
+    """
+    Keeps the registry current without full rescans and tells listeners when it changes.
+      • inotify on venvs_dir(), each venv dir and its bin/ → only the touched venv is rescanned
+        (events are debounced, so a pip install costs one rescan)
+      • also watches the registry file itself, so writes by other AFTP processes are seen
+      • falls back to polling every `poll_interval` seconds where inotify is unavailable
+    `changed(registry)` fires whenever the registry version moves, whoever wrote it.
+    """
+    changed = Signal(dict)
+
+    def __init__(self, expected: Dict[str, dict] | Iterable[str], *, poll_interval: float = 5.0,
+                 debounce: float = 0.5, parent=None):
+        super().__init__(parent)
+        self.expected = list(expected)
+        self.poll_interval, self.debounce = poll_interval, debounce
+        self.mode = ""                       # "inotify" | "poll" once started
+        self._version = -1
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="runtime-registry", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(2.0); self._thread = None
+
+    def _publish(self, reg: Optional[Dict] = None) -> None:
+        reg = read_registry() if reg is None else reg
+        v = int(reg.get("version", 0) or 0)
+        if v != self._version:
+            self._version = v
+            try: self.changed.emit(reg)
+            except RuntimeError: pass
+
+    def _run(self) -> None:
+        self._publish(rescan_and_update(self.expected))
+        try:
+            ino = _Inotify()
+        except Exception:
+            ino = None
+        if ino is None:
+            self.mode = "poll"; return self._poll()
+        self.mode = "inotify"
+        try:
+            self._watch(ino)
+        finally:
+            ino.close()
+
+    def _poll(self) -> None:
+        def snap():
+            return {n: is_created(n) for n in self.expected}
+        last = snap()
+        while not self._stop.wait(self.poll_interval):
+            now = snap()
+            dirty = [n for n in now if now[n] != last.get(n)]
+            last = now
+            self._publish(rescan_and_update(self.expected, dirty) if dirty else None)
+
+    def _watch(self, ino: _Inotify) -> None:
+        root = venvs_dir(); root.mkdir(parents=True, exist_ok=True)
+        reg_path = runtime_registry_path(); reg_path.parent.mkdir(parents=True, exist_ok=True)
+        wds: Dict[int, Optional[str]] = {}          # wd -> venv name (None = root)
+        reg_wd = ino.add(reg_path.parent, _IN_MOVED_TO | _IN_CLOSE_WRITE)
+
+        def watch_venv(name: str) -> None:
+            for p in (root / name, root / name / ("Scripts" if os.name == "nt" else "bin")):
+                if p.is_dir():
+                    wd = ino.add(p, _WATCH_MASK)
+                    if wd >= 0: wds[wd] = name
+
+        wds[ino.add(root, _WATCH_MASK)] = None
+        for name in self.expected:
+            watch_venv(name)
+        dirty: Set[str] = set()
+        due = 0.0
+        while not self._stop.is_set():
+            timeout = max(0.05, due - time.monotonic()) if dirty else 1.0
+            for wd, mask, fname in ino.read(timeout):
+                if wd == reg_wd:
+                    if fname == reg_path.name:
+                        self._publish()
+                    continue
+                if mask & _IN_IGNORED:
+                    wds.pop(wd, None); continue
+                name = wds.get(wd, fname) or fname
+                if name in self.expected:
+                    watch_venv(name)                 # new dirs (venv, bin/) get watched as they appear
+                    dirty.add(name); due = time.monotonic() + self.debounce
+            if dirty and time.monotonic() >= due:
+                names, dirty = set(dirty), set()
+                try:
+                    self._publish(rescan_and_update(self.expected, names))
+                except Exception:
+                    pass
@@ -0,0 +1,96 @@
+from __future__ import annotations
+import threading, time
+from dataclasses import dataclass
+from typing import Dict, Optional
+from PySide6.QtCore import QObject, Signal
+from .ollama_tools import get_client, _resolve_host_port
+
+@dataclass(frozen=True)
+class HealthState:
+    up: bool = False
+    latency_ms: Optional[float] = None
+    last_checked: float = 0.0        # time.time() of the last probe, 0 = never probed
+    host: str = ""
+
+    def label(self) -> str:
+        if not self.last_checked:
+            return "checking…"
+        if self.up:
+            return f"running ({self.latency_ms:.0f} ms)" if self.latency_ms is not None else "running"
+        return f"not reachable ({self.host})"
+
+class ServerHealthMonitor(QObject):
+    """
+    Polls the Ollama server on a background thread and caches the result.
+    UI code reads `state` (never blocks) and listens to `stateChanged`.
+      • server up   → re-check every `interval` seconds
+      • server down → back off from `min_interval` doubling up to `max_interval`
+      • poke()      → re-check now (after start/stop, port change, …)
+    """
+    stateChanged = Signal(object)   # HealthState
+
+    def __init__(self, config: Dict | None = None, *, interval: float = 5.0,
+                 min_interval: float = 1.0, max_interval: float = 30.0,
+                 timeout: float = 2.0, parent=None):
+        super().__init__(parent)
+        self._config = config
+        self.interval, self.min_interval, self.max_interval = interval, min_interval, max_interval
+        self.timeout = timeout
+        self._state = HealthState(host=_resolve_host_port(config))
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def state(self) -> HealthState:
+        return self._state
+
+    def is_up(self) -> bool:
+        return self._state.up
+
+    def set_config(self, config: Dict | None) -> None:
+        self._config = config
+        self.poke()
+
+    def start(self) -> None:
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="ollama-health", daemon=True)
+        self._thread.start()
+
+    def stop(self, wait: float = 1.0) -> None:
+        self._stop.set(); self._wake.set()
+        if self._thread:
+            self._thread.join(wait)
+        self._thread = None
+
+    def poke(self) -> None:
+        self._wake.set()
+
+    def _probe(self) -> HealthState:
+        cfg = self._config
+        t0 = time.perf_counter()
+        ok = get_client(cfg).server_ok(timeout=self.timeout)
+        lat = (time.perf_counter() - t0) * 1000.0
+        return HealthState(up=ok, latency_ms=lat if ok else None,
+                           last_checked=time.time(), host=_resolve_host_port(cfg))
+
+    def _run(self) -> None:
+        delay, prev_up = self.min_interval, True
+        while not self._stop.is_set():
+            self._wake.clear()
+            try:
+                st = self._probe()
+            except Exception:
+                st = HealthState(host=self._state.host, last_checked=time.time())
+            self._state = st
+            try: self.stateChanged.emit(st)
+            except RuntimeError: return   # QObject already deleted during shutdown
+            if st.up:
+                delay = self.interval
+            else:
+                delay = self.min_interval if prev_up else min(self.max_interval, delay * 2)
+            prev_up = st.up
+            if self._wake.wait(delay):
+                prev_up = True   # poked: restart the backoff ladder
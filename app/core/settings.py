@@ -17,6 +17,10 @@ DEFAULTS: Dict[str, Any] = {
         "port": 11434,
         "models_dir": str((Path.home() / ".ollama").resolve()),
         "binary": "",                    # optional absolute path, else PATH
+        "keep_alive": "30m",             # keep the chat model + KV cache resident between turns
+        "http": {"pool_size": 8, "retries": 2, "backoff": 0.25, "connect_timeout": 3.0},
+        "pull": {"concurrency": 2, "max_mbps": 0, "retries": 5},   # max_mbps: download cap in Mbit/s, 0 = off
+        "residency": {"budget_gb": 0, "poll_s": 5, "preload": True},   # budget_gb: loaded-model memory cap, 0 = off
     },
     "paths": {
         "venvs": str(venvs_dir().resolve()),
@@ -25,6 +29,20 @@ DEFAULTS: Dict[str, Any] = {
         "cache": str((data_dir() / "cache").resolve()),
         "logs": str((data_dir() / "logs").resolve()),
     },
+    "runtimes": {
+        "validate_workers": 4,           # venvs validated in parallel (Runtimes tab)
+        "provision_workers": 3,          # venvs built in parallel (shared pip cache)
+        "idle_timeout": 600,             # seconds before an idle warm runtime worker is stopped
+        "worker_threads": 2,             # concurrent jobs per runtime worker
+    },
+    "streaming": {"flush_interval_ms": 16},  # GUI repaint cadence for streamed replies (~60 fps)
+    "conversations": {"backend": "jsonl", "fsync": "interval", "fsync_interval": 2.0, "compact_min": 256},
+    "context": {                         # history sent with each chat turn (see core/context_budget.py)
+        "budget": 4096, "reserve": 512, "low_water": 0.7,   # budget: used only when the model's window is unknown
+        "max_window": 32768,             # cap on a model's trained context length (0 = none); sent as num_ctx
+        "strategy": "pinned_system",     # "sliding" | "pinned_system" | "summarize"
+        "summary_model": "",             # cheaper model used by "summarize"
+    },
     "shortcuts": {"profile": "default"},
     "gpu": {"preference": "auto"},       # "auto" | "cuda" | "rocm" | "intel" | "cpu"
     "proxies": {"http": "", "https": "", "no_proxy": ""},
@@ -0,0 +1,66 @@
+from __future__ import annotations
+import threading, time
+from dataclasses import dataclass
+from typing import List
+
+@dataclass
+class StreamStats:
+    tokens: int = 0
+    flushes: int = 0
+    chars: int = 0
+    worst_flush_ms: float = 0.0
+    started: float = 0.0         # perf_counter() of the first piece
+    last: float = 0.0            # perf_counter() of the latest piece
+
+    def elapsed(self) -> float:
+        return max(1e-6, (self.last or time.perf_counter()) - self.started) if self.started else 0.0
+
+    def tokens_per_s(self) -> float:
+        e = self.elapsed()
+        return self.tokens / e if e else 0.0
+
+    def flushes_per_s(self) -> float:
+        e = self.elapsed()
+        return self.flushes / e if e else 0.0
+
+    def summary(self) -> str:
+        return (f"{self.tokens} tok @ {self.tokens_per_s():.0f} tok/s | "
+                f"{self.flushes} flushes @ {self.flushes_per_s():.0f}/s | "
+                f"worst flush {self.worst_flush_ms:.1f} ms")
+
+class ChunkCoalescer:
+    """
+    Buffers streamed pieces between a producer thread and the GUI.
+      • worker thread: push(piece) — cheap, no Qt signal per token
+      • GUI timer:     drain()     — returns everything buffered since the last drain
+    The GUI decides the cadence (one drain per display frame), so the event loop sees
+    at most ~60 updates/s no matter how fast the model streams.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._buf: List[str] = []
+        self.stats = StreamStats()
+
+    def push(self, piece: str) -> None:
+        if not piece:
+            return
+        now = time.perf_counter()
+        with self._lock:
+            self._buf.append(piece)
+            st = self.stats
+            if not st.started:
+                st.started = now
+            st.tokens += 1; st.chars += len(piece); st.last = now
+
+    def drain(self) -> str:
+        with self._lock:
+            if not self._buf:
+                return ""
+            out = "".join(self._buf); self._buf.clear()
+            return out
+
+    def record_flush(self, seconds: float) -> None:
+        """Report how long the view took to apply one drained batch."""
+        with self._lock:
+            self.stats.flushes += 1
+            self.stats.worst_flush_ms = max(self.stats.worst_flush_ms, seconds * 1000.0)
@@ -0,0 +1,91 @@
+from __future__ import annotations
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+from PySide6.QtCore import QObject, Signal
+from .venv_tools import validate
+
+Check = Callable[..., Tuple[bool, List[str]]]
+
+class ValidationScheduler(QObject):
+    """
+    Validates venvs concurrently on a thread pool. Each job spends most of its time
+    waiting on a probe subprocess, so threads are enough. Results are delivered through
+    Qt signals, which are queued onto the GUI thread:
+      • result(batch, name, ok, missing)   emitted as each venv finishes
+      • finished(batch, {name: (ok, missing)})   emitted once the whole batch is done
+    cancel(batch) drops the batch's queued jobs and silences any that are already running.
+    cancel() with no argument does this for every batch.
+    """
+    result = Signal(int, str, bool, list)
+    finished = Signal(int, dict)
+
+    def __init__(self, workers: int = 4, check: Optional[Check] = None, parent=None):
+        super().__init__(parent)
+        self.workers = max(1, int(workers))
+        self._check: Check = check or validate
+        self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="venv-validate")
+        self._lock = threading.Lock()
+        self._next = 0
+        self._batches: Dict[int, List[Future]] = {}
+
+    def submit(self, names: List[str], *, mode: str = "deep", force: bool = False) -> int:
+        with self._lock:
+            self._next += 1
+            batch = self._next
+            self._batches[batch] = []
+        results: Dict[str, Tuple[bool, List[str]]] = {}
+        if not names:
+            self._finish(batch, results)
+            return batch
+
+        def done(name: str, fut: Future) -> None:
+            if fut.cancelled():
+                return
+            try:
+                ok, missing = fut.result()
+            except Exception as e:
+                ok, missing = False, [f"(validation failed: {e})"]
+            with self._lock:
+                if batch not in self._batches:
+                    return           # cancelled
+                results[name] = (ok, list(missing))
+                last = len(results) == len(names)
+            try:
+                self.result.emit(batch, name, ok, list(missing))
+            except RuntimeError:
+                return               # scheduler already deleted
+            if last:
+                self._finish(batch, results)
+
+        for n in names:
+            fut = self._pool.submit(self._check, n, mode=mode, force=force)
+            with self._lock:
+                if batch in self._batches:
+                    self._batches[batch].append(fut)
+            fut.add_done_callback(lambda f, n=n: done(n, f))
+        return batch
+
+    def _finish(self, batch: int, results: Dict) -> None:
+        with self._lock:
+            if self._batches.pop(batch, None) is None:
+                return
+        try:
+            self.finished.emit(batch, dict(results))
+        except RuntimeError:
+            pass
+
+    def pending(self) -> List[int]:
+        with self._lock:
+            return list(self._batches)
+
+    def cancel(self, batch: Optional[int] = None) -> None:
+        with self._lock:
+            keys = [batch] if batch is not None else list(self._batches)
+            futs = [f for k in keys for f in self._batches.pop(k, [])]
+        for f in futs:
+            f.cancel()
+
+    def shutdown(self) -> None:
+        self.cancel()
+        self._pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,168 @@
+from __future__ import annotations
+import filecmp, hashlib, json, os, stat, threading, time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from .paths import data_dir, venvs_dir
+from .venv_tools import EXPECTED, EXTRA, _site_packages
+
+_CHUNK = 1024 * 1024
+_INDEX_LOCK = threading.Lock()
+
+def dedup_index_path() -> Path:
+    return data_dir() / "dedup_index.json"
+
+@dataclass
+class DedupReport:
+    dry_run: bool
+    files_scanned: int = 0
+    files_hashed: int = 0          # files actually read (index misses)
+    bytes_hashed: int = 0
+    groups: int = 0                # sets of identical files across/within venvs
+    linked: int = 0                # files replaced (or that would be) by a hardlink
+    bytes_reclaimed: int = 0
+    verify_mismatch: int = 0       # same hash but bytes differ (verify mode only)
+    errors: List[str] = field(default_factory=list)
+    elapsed_s: float = 0.0
+
+    def summary(self) -> str:
+        verb = "would reclaim" if self.dry_run else "reclaimed"
+        return (f"{self.files_scanned} files scanned, {self.files_hashed} hashed "
+                f"({self.bytes_hashed / 1e9:.2f} GB), {self.groups} duplicate groups, "
+                f"{self.linked} links, {verb} {self.bytes_reclaimed / 1e9:.2f} GB "
+                f"in {self.elapsed_s:.1f} s" + (f", {len(self.errors)} errors" if self.errors else ""))
+
+def _read_index() -> Dict:
+    try:
+        return json.loads(dedup_index_path().read_text(encoding="utf-8"))
+    except Exception:
+        return {"schema": 1, "files": {}}
+
+def _write_index(data: Dict) -> None:
+    p = dedup_index_path()
+    try:
+        p.parent.mkdir(parents=True, exist_ok=True)
+        tmp = p.with_suffix(f".{os.getpid()}.tmp")
+        tmp.write_text(json.dumps(data, separators=(",", ":")), encoding="utf-8")
+        os.replace(tmp, p)
+    except Exception:
+        pass
+
+def _sha256(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(_CHUNK), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+def _walk(venvs: List[str], min_size: int) -> List[Tuple[str, os.stat_result]]:
+    """Regular files under each venv's site-packages (dist-info metadata is per-install: skipped)."""
+    out = []
+    for name in venvs:
+        for sp in _site_packages(name):
+            for root, dirs, files in os.walk(sp):
+                dirs[:] = [d for d in dirs if not d.endswith((".dist-info", ".egg-info"))]
+                for fn in files:
+                    p = os.path.join(root, fn)
+                    try:
+                        st = os.lstat(p)
+                    except OSError:
+                        continue
+                    if stat.S_ISREG(st.st_mode) and st.st_size >= min_size:
+                        out.append((p, st))
+    return out
+
+def _link(src: str, dst: str) -> None:
+    """Atomically replace dst with a hardlink to src."""
+    tmp = f"{dst}.aftp-dedup.{os.getpid()}"
+    os.link(src, tmp)
+    try:
+        os.replace(tmp, dst)
+    except Exception:
+        os.unlink(tmp); raise
+
+def dedup(venvs: Optional[List[str]] = None, *, dry_run: bool = True, verify: bool = False,
+          min_size: int = 4096, workers: Optional[int] = None) -> DedupReport:
+    """
+    Hardlink identical files across the venvs' site-packages.
+      • only files whose size collides with another file get hashed; the sha256 index
+        (data_dir()/dedup_index.json) is reused while size+mtime are unchanged
+      • files are grouped by (device, size, mode, sha256); already-shared inodes are skipped
+      • dry_run=True (default) only reports; verify=True byte-compares each pair before linking
+    pip replaces files rather than editing them in place, so upgrading one venv later
+    simply breaks the link for that venv.
+    """
+    t0 = time.perf_counter()
+    rep = DedupReport(dry_run=dry_run)
+    if venvs is None:
+        venvs = [n for n in list(EXPECTED) + list(EXTRA) if (venvs_dir() / n).is_dir()]
+    files = _walk(venvs, min_size)
+    rep.files_scanned = len(files)
+
+    by_size: Dict[Tuple[int, int], List[Tuple[str, os.stat_result]]] = {}
+    for p, st in files:
+        by_size.setdefault((st.st_dev, st.st_size), []).append((p, st))
+    candidates = [f for grp in by_size.values() if len({s.st_ino for _, s in grp}) > 1 for f in grp]
+
+    with _INDEX_LOCK:
+        index = _read_index()
+    known: Dict[str, list] = index.setdefault("files", {})
+    digests: Dict[str, str] = {}
+    todo = []
+    for p, st in candidates:
+        ent = known.get(p)
+        if ent and ent[0] == st.st_size and ent[1] == st.st_mtime_ns:
+            digests[p] = ent[2]
+        else:
+            todo.append((p, st))
+
+    def work(item):
+        p, st = item
+        try:
+            return p, st, _sha256(p), None
+        except OSError as e:
+            return p, st, None, f"{p}: {e}"
+    with ThreadPoolExecutor(max_workers=workers or min(8, (os.cpu_count() or 2))) as ex:
+        for p, st, digest, err in ex.map(work, todo):
+            if err:
+                rep.errors.append(err); continue
+            digests[p] = digest; known[p] = [st.st_size, st.st_mtime_ns, digest]
+            rep.files_hashed += 1; rep.bytes_hashed += st.st_size
+
+    groups: Dict[Tuple, List[Tuple[str, os.stat_result]]] = {}
+    for p, st in candidates:
+        if p in digests:
+            groups.setdefault((st.st_dev, st.st_size, st.st_mode, digests[p]), []).append((p, st))
+    for grp in groups.values():
+        if len({s.st_ino for _, s in grp}) < 2:
+            continue
+        rep.groups += 1
+        # keep the inode that already has the most links, so fewest files change
+        grp.sort(key=lambda f: (-f[1].st_nlink, f[0]))
+        keep, keep_st = grp[0]
+        counted = set()
+        for p, st in grp[1:]:
+            if st.st_ino == keep_st.st_ino:
+                continue
+            if verify and not filecmp.cmp(keep, p, shallow=False):
+                rep.verify_mismatch += 1; rep.errors.append(f"{p}: content differs from {keep}"); continue
+            if not dry_run:
+                try:
+                    _link(keep, p)
+                    known[p] = [keep_st.st_size, keep_st.st_mtime_ns, digests[keep]]
+                except OSError as e:
+                    rep.errors.append(f"{p}: {e}"); continue
+            rep.linked += 1
+            # space comes back once the last name of the replaced inode is gone
+            if st.st_ino not in counted:
+                counted.add(st.st_ino)
+                if st.st_nlink <= sum(1 for _, s in grp if s.st_ino == st.st_ino):
+                    rep.bytes_reclaimed += st.st_size
+
+    live = {p for p, _ in files}
+    index["files"] = {p: v for p, v in known.items() if p in live}
+    with _INDEX_LOCK:
+        _write_index(index)
+    rep.elapsed_s = time.perf_counter() - t0
+    return rep
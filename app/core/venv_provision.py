@@ -0,0 +1,202 @@
+from __future__ import annotations
+import os, re, shutil, subprocess, sys, threading, time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional
+from PySide6.QtCore import QObject, Signal
+from .paths import data_dir, venvs_dir
+from .venv_tools import EXPECTED, EXTRA, _pybin, invalidate_validation
+
+def pip_cache_dir() -> Path:
+    """Shared by every venv build: HTTP downloads and locally built wheels are reused."""
+    return data_dir() / "pip_cache"
+
+def wheelhouse_dir() -> Path:
+    """Optional pre-seeded wheels (offline installs, custom builds), used as --find-links."""
+    return data_dir() / "wheelhouse"
+
+_SCRIPTS = Path(__file__).resolve().parents[2] / "scripts"
+
+def packages_for(venv_name: str) -> List[str]:
+    return list((EXPECTED.get(venv_name) or EXTRA.get(venv_name) or {}).get("pip", []))
+
+def setup_script(venv_name: str, flavor: str = "") -> Optional[Path]:
+    """scripts/setup_venv_<name>[_<flavor>].sh (.ps1 on Windows) — the source of truth for pins
+    and GPU/CPU wheel choices. None when there is no such script."""
+    ext = ".ps1" if os.name == "nt" else ".sh"
+    p = _SCRIPTS / f"setup_venv_{venv_name}{'_' + flavor if flavor else ''}{ext}"
+    return p if p.exists() else None
+
+def _base_python() -> str:
+    """Interpreter used to create venvs (not the frozen app binary)."""
+    if not getattr(sys, "frozen", False):
+        return sys.executable
+    return shutil.which("python3") or shutil.which("python") or "python3"
+
+# pip output → (progress floor, message). Collect/download/build lines creep forward
+# inside their phase, because the number of dependencies is not known up front.
+_PHASES = [
+    (re.compile(r"^Collecting (\S+)"),                    0.25, 0.55, "collecting {0}"),
+    (re.compile(r"^\s*Downloading (\S+)"),                0.30, 0.70, "downloading {0}"),
+    (re.compile(r"^\s*Using cached (\S+)"),               0.30, 0.70, "cached {0}"),
+    (re.compile(r"^\s*Building wheel for (\S+)"),         0.70, 0.82, "building {0}"),
+    (re.compile(r"^Installing collected packages: (.+)"), 0.85, 0.85, "installing {0}"),
+    (re.compile(r"^Successfully installed"),              0.98, 0.98, "installed"),
+]
+
+@dataclass
+class ProvisionJob:
+    name: str
+    packages: List[str]
+    index_url: str = ""                  # extra index (plain pip fallback only)
+    script: Optional[Path] = None        # setup script to run; None → plain pip install of `packages`
+    state: str = "queued"                # queued | creating | installing | done | failed | cancelled
+    progress: float = 0.0
+    message: str = ""
+    started: float = 0.0
+    finished: float = 0.0
+    tail: List[str] = field(default_factory=list)   # last output lines, for error reports
+
+    @property
+    def elapsed_s(self) -> float:
+        return ((self.finished or time.time()) - self.started) if self.started else 0.0
+
+class Provisioner(QObject):
+    """
+    Runs several venv builds in parallel on a bounded pool. Each build runs the venv's own
+    setup script (pins and wheel indexes stay there); only the environment is added:
+    PIP_CACHE_DIR=pip_cache_dir() so a wheel is downloaded or built once across venvs, and
+    PIP_FIND_LINKS=wheelhouse_dir() for pre-seeded wheels. Venvs without a script fall back
+    to a plain pip install of their package list. Signals are emitted from pool threads, and Qt queues them
+    to the GUI thread:
+      • progress(name, fraction, message)   • line(name, text)   • finished(name, ok, message)
+    """
+    progress = Signal(str, float, str)
+    line = Signal(str, str)
+    finished = Signal(str, bool, str)
+
+    def __init__(self, workers: int = 3, parent=None):
+        super().__init__(parent)
+        self.workers = max(1, int(workers))
+        self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="venv-provision")
+        self._lock = threading.Lock()
+        self.jobs: Dict[str, ProvisionJob] = {}
+        self._procs: Dict[str, subprocess.Popen] = {}
+
+    def active(self) -> List[str]:
+        with self._lock:
+            return [n for n, j in self.jobs.items() if j.state in ("queued", "creating", "installing")]
+
+    def submit(self, names: List[str], *, index_urls: Optional[Dict[str, str]] = None,
+               scripts: Optional[Dict[str, Path]] = None) -> List[str]:
+        """Queue builds; names already queued or running are skipped. Returns the names queued.
+        scripts overrides the setup script per venv (e.g. a GPU flavor from setup_script(n, "cuda"))."""
+        queued = []
+        for n in names:
+            with self._lock:
+                if n in self.jobs and self.jobs[n].state in ("queued", "creating", "installing"):
+                    continue
+                job = self.jobs[n] = ProvisionJob(n, packages_for(n), (index_urls or {}).get(n, ""),
+                                                  (scripts or {}).get(n) or setup_script(n))
+            queued.append(n)
+            self._emit_progress(job, 0.0, "queued")
+            self._pool.submit(self._run, job)
+        return queued
+
+    def cancel(self, name: Optional[str] = None) -> None:
+        with self._lock:
+            jobs = [j for n, j in self.jobs.items() if name is None or n == name]
+            for j in jobs:
+                if j.state in ("queued", "creating", "installing"):
+                    j.state = "cancelled"
+            procs = [p for n, p in self._procs.items() if name is None or n == name]
+        for p in procs:
+            try: p.terminate()
+            except Exception: pass
+
+    def shutdown(self) -> None:
+        self.cancel()
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+    # ----- worker side -----
+    def _emit_progress(self, job: ProvisionJob, frac: float, msg: str) -> None:
+        job.progress = max(job.progress, min(1.0, frac)); job.message = msg
+        try: self.progress.emit(job.name, job.progress, msg)
+        except RuntimeError: pass
+
+    def _exec(self, job: ProvisionJob, args: List[str], lo: float, hi: float) -> int:
+        env = dict(os.environ, PIP_CACHE_DIR=str(pip_cache_dir()), PIP_FIND_LINKS=str(wheelhouse_dir()),
+                   PIP_DISABLE_PIP_VERSION_CHECK="1", PIP_PROGRESS_BAR="off", PYTHONUNBUFFERED="1")
+        with self._lock:
+            if job.state == "cancelled":
+                return -1
+            proc = subprocess.Popen(args, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True,
+                                    encoding="utf-8", errors="replace", env=env, bufsize=1, cwd=str(_SCRIPTS.parent))
+            self._procs[job.name] = proc
+        steps = 0
+        try:
+            for raw in proc.stdout:
+                text = raw.rstrip()
+                if not text:
+                    continue
+                job.tail = (job.tail + [text])[-40:]
+                try: self.line.emit(job.name, text)
+                except RuntimeError: pass
+                for rx, floor, cap, fmt in _PHASES:
+                    m = rx.match(text)
+                    if m:
+                        steps += 1
+                        # creep toward the phase cap, so progress keeps moving while the count is open-ended
+                        creep = floor + (cap - floor) * (1 - 0.85 ** steps)
+                        self._emit_progress(job, lo + (hi - lo) * max(floor, creep), fmt.format(*m.groups())[:80])
+                        break
+            return proc.wait()
+        finally:
+            with self._lock:
+                self._procs.pop(job.name, None)
+
+    def _run(self, job: ProvisionJob) -> None:
+        if job.state == "cancelled":
+            return self._done(job, False, "cancelled")
+        job.started = time.time()
+        py = _pybin(job.name)
+        pip_cache_dir().mkdir(parents=True, exist_ok=True)
+        wh = wheelhouse_dir(); wh.mkdir(parents=True, exist_ok=True)
+        try:
+            if job.script is not None:
+                job.state = "installing"; self._emit_progress(job, 0.02, f"running {job.script.name}")
+                args = (["powershell", "-ExecutionPolicy", "Bypass", "-File", str(job.script)] if os.name == "nt"
+                        else ["bash", str(job.script)])
+                if self._exec(job, args, 0.0, 1.0) != 0:
+                    return self._done(job, False, job.tail[-1] if job.tail else f"{job.script.name} failed")
+                return self._done(job, True, f"ready in {job.elapsed_s:.0f} s")
+            if not py.exists():
+                job.state = "creating"; self._emit_progress(job, 0.02, "creating venv")
+                if self._exec(job, [_base_python(), "-m", "venv", str(venvs_dir() / job.name)], 0.0, 0.1) != 0:
+                    return self._done(job, False, "venv creation failed")
+            job.state = "installing"
+            self._emit_progress(job, 0.1, "upgrading pip")
+            if self._exec(job, [str(py), "-m", "pip", "install", "--upgrade", "pip", "setuptools", "wheel"], 0.1, 0.2) != 0:
+                return self._done(job, False, "pip bootstrap failed")
+            if job.packages:
+                args = [str(py), "-m", "pip", "install", "--upgrade", "--find-links", str(wh)]
+                if job.index_url:
+                    args += ["--extra-index-url", job.index_url]
+                if self._exec(job, args + job.packages, 0.2, 1.0) != 0:
+                    return self._done(job, False, job.tail[-1] if job.tail else "pip install failed")
+            self._done(job, True, f"ready in {job.elapsed_s:.0f} s")
+        except Exception as e:
+            self._done(job, False, str(e))
+
+    def _done(self, job: ProvisionJob, ok: bool, msg: str) -> None:
+        if job.state == "cancelled":
+            ok, msg = False, "cancelled"
+        else:
+            job.state = "done" if ok else "failed"
+        job.finished = time.time()
+        if ok:
+            job.progress = 1.0
+        invalidate_validation(job.name)
+        try: self.finished.emit(job.name, ok, msg)
+        except RuntimeError: pass
@@ -1,8 +1,8 @@
 from __future__ import annotations
-import os, subprocess
+import hashlib, json, os, subprocess, threading, time
 from pathlib import Path
-from typing import Dict, List, Tuple
-from .paths import venvs_dir
+from typing import Dict, List, Optional, Tuple
+from .paths import venvs_dir, data_dir
 
 EXPECTED: Dict[str, Dict[str, List[str]]] = {
     "core":        {"imports": ["PySide6", "requests"], "pip": ["PySide6", "requests"]},
@@ -17,6 +17,14 @@ EXPECTED: Dict[str, Dict[str, List[str]]] = {
     "ai_dev":      {"imports": ["torch","transformers","datasets","accelerate"], "pip": ["torch","transformers","datasets","accelerate","peft","trl"]},
 }
 
+# Venvs the Hub can build but that are not part of the default set (Runtimes table extras).
+EXTRA: Dict[str, Dict[str, List[str]]] = {
+    "mamba2":      {"imports": ["mamba_ssm", "einops", "transformers", "safetensors"], "pip": ["mamba-ssm","einops","transformers","safetensors"]},
+}
+
+def _imports_for(venv_name: str) -> List[str]:
+    return (EXPECTED.get(venv_name) or EXTRA.get(venv_name) or {}).get("imports", [])
+
 def _pybin(venv_name: str) -> Path:
     base = venvs_dir() / venv_name
     return base / ("Scripts/python.exe" if os.name == "nt" else "bin/python3")
@@ -34,68 +42,273 @@ def py_info(venv_name: str) -> str:
     except Exception as e:
         return f"(failed to run python: {e})"
 
-def _try_imports_verbose(py: Path, mods: List[str]) -> Tuple[bool, List[str], List[str]]:
-    missing: List[str] = []
-    reasons: List[str] = []
-    for m in mods:
-        code = (
-            "import importlib, traceback\n"
-            f"m='{m}'\n"
-            "try:\n"
-            "    importlib.import_module(m)\n"
-            "    print('OK:::{}'.format(m))\n"
-            "except Exception as e:\n"
-            "    print('MISS:::{}:::{}'.format(m, repr(e)))\n"
-        )
-        r = subprocess.run([str(py), "-c", code], capture_output=True, text=True)
-        for line in (r.stdout or "").splitlines():
-            if line.startswith("OK:::"):
+# Runs inside the venv interpreter: imports every module once and prints one JSON object.
+# argv[1] = JSON list of module names, argv[2] = "1" to import in parallel threads.
+_PROBE_CODE = r"""
+import sys, json, time, importlib
+mods = json.loads(sys.argv[1]); parallel = len(sys.argv) > 2 and sys.argv[2] == "1"
+try:
+    import importlib.metadata as im
+    pkg_map = im.packages_distributions()
+except Exception:
+    im, pkg_map = None, {}
+def one(m):
+    info = {"ok": False}
+    t0 = time.perf_counter()
+    try:
+        mod = importlib.import_module(m)
+        info["ok"] = True
+    except BaseException as e:
+        mod = None
+        info["error"] = repr(e)
+    info["import_s"] = round(time.perf_counter() - t0, 4)
+    ver = None
+    for dist in pkg_map.get(m.split(".")[0], []) or [m]:
+        try:
+            ver = im.version(dist); info["dist"] = dist; break
+        except Exception:
+            pass
+    if ver is None and mod is not None:
+        ver = getattr(mod, "__version__", None)
+    if ver:
+        info["version"] = str(ver)
+    return m, info
+if parallel and len(mods) > 1:
+    from concurrent.futures import ThreadPoolExecutor
+    with ThreadPoolExecutor(max_workers=min(8, len(mods))) as ex:
+        results = dict(ex.map(one, mods))
+else:
+    results = dict(one(m) for m in mods)
+results["_python"] = {"exe": sys.executable, "info": sys.executable + "\n" + sys.version}
+sys.stdout.write("\n@@PROBE@@" + json.dumps(results) + "\n")
+"""
+
+def probe(venv_name: str, mods: List[str] | None = None, *, parallel: bool = False,
+          timeout: float = 600.0) -> Dict[str, dict]:
+    """
+    One interpreter start per venv: import every module and report
+      {mod: {"ok", "version", "dist", "import_s", "error"?}, "_python": {...}}
+    parallel=True imports the modules from a thread pool inside that one process.
+    Returns {} when the venv has no python.
+    """
+    py = _pybin(venv_name)
+    if not py.exists():
+        return {}
+    return _run_probe(py, _imports_for(venv_name) if mods is None else mods, parallel=parallel, timeout=timeout)
+
+def _run_probe(py: Path, mods: List[str], *, parallel: bool = False, timeout: float = 600.0) -> Dict[str, dict]:
+    """Run the import probe with any interpreter `py`."""
+    try:
+        r = subprocess.run([str(py), "-c", _PROBE_CODE, json.dumps(mods), "1" if parallel else "0"],
+                           capture_output=True, text=True, timeout=timeout)
+        out = (r.stdout or "").rsplit("@@PROBE@@", 1)
+        if len(out) == 2:
+            return json.loads(out[1])
+        err = (r.stderr or "").strip().splitlines()
+        reason = err[-1] if err else f"probe exited with {r.returncode}"
+    except Exception as e:
+        reason = f"probe failed: {e}"
+    res: Dict[str, dict] = {m: {"ok": False, "error": reason} for m in mods}
+    res["_python"] = {"exe": str(py), "info": "(probe failed)", "failed": True}
+    return res
+
+# ---------- Validation cache (keyed on a cheap venv fingerprint) ----------
+_CACHE_LOCK = threading.Lock()
+
+def validation_cache_path() -> Path:
+    """Lives next to runtime_registry.json."""
+    return data_dir() / "validation_cache.json"
+
+def _site_packages(venv_name: str) -> List[Path]:
+    base = venvs_dir() / venv_name
+    if os.name == "nt":
+        return [base / "Lib" / "site-packages"]
+    return sorted((base / "lib").glob("python*/site-packages"))
+
+def fingerprint(venv_name: str) -> Optional[str]:
+    """
+    Hash of pyvenv.cfg, the python binary and site-packages' *.dist-info names + mtimes.
+    Any install/uninstall/upgrade changes it; costs a directory listing and a few stat()s.
+    """
+    base = venvs_dir() / venv_name
+    py = _pybin(venv_name)
+    h = hashlib.sha1()
+    try:
+        for p in (base / "pyvenv.cfg", py):
+            st = p.stat()
+            h.update(f"{p.name}:{st.st_size}:{st.st_mtime_ns}\n".encode())
+        for sp in _site_packages(venv_name):
+            st = sp.stat()
+            h.update(f"{sp}:{st.st_mtime_ns}\n".encode())
+            with os.scandir(sp) as it:
+                infos = sorted((e.name, e.stat().st_mtime_ns) for e in it
+                               if e.name.endswith((".dist-info", ".egg-info")))
+            for name, mt in infos:
+                h.update(f"{name}:{mt}\n".encode())
+    except OSError:
+        return None
+    return h.hexdigest()
+
+def _read_cache() -> Dict:
+    try:
+        return json.loads(validation_cache_path().read_text(encoding="utf-8"))
+    except Exception:
+        return {"schema": 1, "venvs": {}}
+
+def _write_cache(data: Dict) -> None:
+    p = validation_cache_path()
+    try:
+        p.parent.mkdir(parents=True, exist_ok=True)
+        tmp = p.with_suffix(f".{os.getpid()}.tmp")
+        tmp.write_text(json.dumps(data, indent=2, sort_keys=True), encoding="utf-8")
+        os.replace(tmp, p)
+    except Exception:
+        pass
+
+def cached_probe(venv_name: str, mods: List[str] | None = None, *, force: bool = False) -> Dict[str, dict]:
+    """probe() result, re-probing only when the venv fingerprint (or the module list) changed."""
+    if mods is None:
+        mods = _imports_for(venv_name)
+    fp = fingerprint(venv_name)
+    if fp is None:
+        return probe(venv_name, mods)
+    if not force:
+        with _CACHE_LOCK:
+            ent = _read_cache().get("venvs", {}).get(venv_name)
+        if ent and ent.get("fingerprint") == fp and ent.get("mods") == list(mods):
+            return ent.get("result", {})
+    res = probe(venv_name, mods)
+    if not res or (res.get("_python") or {}).get("failed"):
+        return res      # the probe itself failed (timeout, broken interpreter): not a result to keep
+    with _CACHE_LOCK:
+        data = _read_cache()
+        data.setdefault("venvs", {})[venv_name] = {"fingerprint": fp, "mods": list(mods),
+                                                   "result": res, "checked": time.time()}
+        _write_cache(data)
+    return res
+
+def invalidate_validation(venv_name: str | None = None) -> None:
+    with _CACHE_LOCK:
+        data = _read_cache()
+        if venv_name is None: data["venvs"] = {}
+        else: data.get("venvs", {}).pop(venv_name, None)
+        _write_cache(data)
+
+# ---------- Static ("fast") validation: read dist-info metadata, no interpreter ----------
+_STATIC_MEMO: Dict[Tuple[str, str], Dict[str, dict]] = {}
+
+def _static_paths(venv_name: str) -> List[Path]:
+    """The venv's site-packages, plus the base interpreter's when include-system-site-packages is on."""
+    paths = _site_packages(venv_name)
+    cfg = {}
+    try:
+        for line in (venvs_dir() / venv_name / "pyvenv.cfg").read_text(encoding="utf-8").splitlines():
+            k, _, v = line.partition("=")
+            cfg[k.strip().lower()] = v.strip()
+    except OSError:
+        pass
+    if cfg.get("include-system-site-packages", "").lower() == "true" and cfg.get("home"):
+        prefix = Path(cfg["home"]).parent
+        if os.name == "nt":
+            paths.append(prefix / "Lib" / "site-packages")
+        else:
+            ver = ".".join(cfg.get("version", cfg.get("version_info", "")).split(".")[:2])
+            for lib in (prefix / "lib").glob(f"python{ver}*" if ver else "python3*"):
+                paths += [lib / "site-packages", lib / "dist-packages"]
+            paths.append(prefix / "lib" / "python3" / "dist-packages")
+    return [p for p in paths if p.is_dir()]
+
+def _top_level_names(dist) -> List[str]:
+    """Import names a distribution provides: top_level.txt, else derived from RECORD."""
+    txt = dist.read_text("top_level.txt")
+    if txt:
+        return [n.strip() for n in txt.splitlines() if n.strip()]
+    names = set()
+    for f in dist.files or []:
+        parts = f.parts
+        if not parts or parts[0].endswith((".dist-info", ".egg-info", ".data")) or parts[0] in ("..", "__pycache__"):
+            continue
+        head = parts[0]
+        if len(parts) == 1:
+            if head.endswith(".py"): names.add(head[:-3])
+            elif head.endswith((".so", ".pyd")): names.add(head.split(".", 1)[0])
+        else:
+            names.add(head)
+    return sorted(names)
+
+def static_scan(venv_name: str) -> Dict[str, dict]:
+    """Map every importable top-level name in the venv → {"dist", "version"} from metadata only."""
+    import importlib.metadata as im
+    fp = fingerprint(venv_name) or ""
+    memo = _STATIC_MEMO.get((venv_name, fp))
+    if memo is not None and fp:
+        return memo
+    out: Dict[str, dict] = {}
+    for sp in reversed(_static_paths(venv_name)):       # venv entries win over system ones
+        for dist in im.distributions(path=[str(sp)]):
+            name = dist.metadata["Name"] if dist.metadata else None
+            if not name:
                 continue
-            if line.startswith("MISS:::"):
-                parts = line.split(":::", 2)
-                mod = parts[1] if len(parts) > 1 else "unknown"
-                err = parts[2] if len(parts) > 2 else "import error"
-                missing.append(mod)
-                reasons.append(f"{mod}: {err}")
+            exact = name.lower().replace("-", "_")
+            for mod in _top_level_names(dist):
+                prev = out.get(mod)
+                # namespace shared by several dists (PySide6, PySide6_Addons…): prefer the eponymous one
+                if prev and prev["path"] == str(sp) and prev["dist"].lower().replace("-", "_") == mod.lower():
+                    continue
+                if prev and prev["path"] == str(sp) and exact != mod.lower():
+                    continue
+                out[mod] = {"dist": name, "version": dist.version, "path": str(sp)}
+    _STATIC_MEMO[(venv_name, fp)] = out
+    return out
+
+def static_probe(venv_name: str, mods: List[str] | None = None) -> Dict[str, dict]:
+    """probe()-shaped result from static_scan(): installed ≠ importable, but costs no subprocess."""
+    if mods is None:
+        mods = _imports_for(venv_name)
+    found = static_scan(venv_name)
+    res: Dict[str, dict] = {}
+    for m in mods:
+        hit = found.get(m.split(".")[0])
+        if hit:
+            res[m] = {"ok": True, "dist": hit["dist"], "version": hit["version"], "static": True}
+        else:
+            res[m] = {"ok": False, "error": "not installed (metadata scan)", "static": True}
+    res["_python"] = {"exe": str(_pybin(venv_name)), "info": "(static scan; use Details for a live import)"}
+    return res
+
+def _try_imports_verbose(py: Path, mods: List[str]) -> Tuple[bool, List[str], List[str]]:
+    """Kept for existing callers; now backed by a single probe process."""
+    res = _run_probe(py, mods) if Path(py).exists() else {}
+    missing = [m for m in mods if not res.get(m, {}).get("ok")]
+    reasons = [f"{m}: {res.get(m, {}).get('error', 'import error')}" for m in missing]
     return (len(missing) == 0, missing, reasons)
 
-def validate(venv_name: str) -> Tuple[bool, List[str]]:
-    """Kept for existing callers; returns (ok, missing_imports)."""
+def validate(venv_name: str, *, mode: str = "deep", force: bool = False) -> Tuple[bool, List[str]]:
+    """
+    Kept for existing callers; returns (ok, missing_imports).
+    mode="deep": import in the venv interpreter (cached by fingerprint).
+    mode="fast": read installed metadata only — instant, no subprocess.
+    """
     if not is_created(venv_name):
         return (False, ["_venv_missing_"])
-    req = EXPECTED.get(venv_name, {})
-    mods = req.get("imports", [])
+    mods = _imports_for(venv_name)
     if not mods:
         return (True, [])
-    ok, missing, _ = _try_imports_verbose(_pybin(venv_name), mods)
-    return (ok, missing)
+    res = static_probe(venv_name, mods) if mode == "fast" else cached_probe(venv_name, mods, force=force)
+    missing = [m for m in mods if not res.get(m, {}).get("ok")]
+    return (len(missing) == 0, missing)
 
-def details(venv_name: str) -> Dict[str, dict]:
-    """Return per-module status with versions/reasons when possible."""
+def details(venv_name: str, *, mode: str = "deep", force: bool = False) -> Dict[str, dict]:
+    """Return per-module status with versions/reasons (plus import time in deep mode)."""
+    if not _pybin(venv_name).exists():
+        return {}
+    mods = _imports_for(venv_name)
+    res = static_probe(venv_name, mods) if mode == "fast" else cached_probe(venv_name, mods, force=force)
     out: Dict[str, dict] = {}
-    py = _pybin(venv_name)
-    if not py.exists():
-        return out
-    req = EXPECTED.get(venv_name, {})
-    mods = req.get("imports", [])
-    ok, missing, reasons = _try_imports_verbose(py, mods)
-    reason_map = {r.split(':',1)[0]: r for r in reasons}
     for m in mods:
-        info = {"ok": m not in missing}
-        if not info["ok"]:
-            info["error"] = reason_map.get(m, "import failed")
-        # best-effort version
-        try:
-            code = (
-                f"import importlib.metadata as im; "
-                f"print(im.version('{m}'))"
-            )
-            r = subprocess.run([str(py), "-c", code], capture_output=True, text=True)
-            v = (r.stdout or "").strip()
-            if v:
-                info["version"] = v
-        except Exception:
-            pass
+        info = dict(res.get(m) or {"ok": False})
+        if not info.get("ok"):
+            info.setdefault("error", "import failed")
         out[m] = info
-    out["_python"] = {"exe": str(py), "info": py_info(venv_name)}
+    out["_python"] = res.get("_python", {"exe": str(_pybin(venv_name)), "info": ""})
     return out
@@ -14,12 +14,22 @@ from PySide6.QtWidgets import (
 # Theme / Runtimes
 from app.core.theme import ThemeManager, SCHEMES
 from app.core.venv_tools import EXPECTED, is_created, validate, details
-from app.core.runtime_registry import rescan_and_update
+from app.core.runtime_registry import rescan_and_update, RegistryWatcher
+from app.core.validation_scheduler import ValidationScheduler
+from app.core.runtime_host import shutdown_runtime_host
+from app.core.venv_provision import Provisioner, packages_for, setup_script
+from app.core.server_health import ServerHealthMonitor, HealthState
+from app.core.stream_coalescer import ChunkCoalescer
+from app.core.conversation_manager import ConversationManager
+from app.core.context_budget import budgeter_from_config, context_window
+from app.core.pull_manager import pull_manager_from_config
+from app.core.model_meta import ModelMetaCache, describe
+from app.core.residency import residency_from_config
 
 # Ollama client (stream + non-stream)
 from app.core.ollama_tools import (
-    server_ok, list_models, pull_model, delete_model, prompt, prompt_stream_iter,
-    list_conversations, load_conversation, save_conversation,
+    server_ok, delete_model, chat, chat_stream_iter, StreamCancel,
+    configure_conversation_log,
     which_ollama, install_ollama_linux, install_ollama_windows
 )
 
@@ -33,6 +43,7 @@ from app.ui.quick_tour import QuickTour
 from app.ui.diagnostics_dialog import DiagnosticsDialog
 from app.ui.quick_llm_dialog import QuickLLMDialog
 from app.ui.license_dialog import LicenseDialog
+from app.ui.markdown_stream import IncrementalMarkdown
 
 # Config
 from app.core.settings import load_config, save_config
@@ -51,6 +62,9 @@ class _TextDialog(QDialog):
         lay.addWidget(btns)
 
 
+def _status_text(ok: bool, missing: list) -> str:
+    return "created" if ok else ("missing" if missing in ([], ["_venv_missing_"]) else f"missing: {', '.join(missing)}")
+
 class MainWindow(QMainWindow):
     def __init__(self):
         super().__init__()
@@ -62,6 +76,43 @@ class MainWindow(QMainWindow):
 
         self._conv_name = "default"
         self._current_model: Optional[str] = None
+        try: configure_conversation_log(**self.config.get("conversations", {}))
+        except Exception: pass
+        # Conversations are served from memory and written behind on a worker thread
+        self._convs = ConversationManager()
+        self._budget = budgeter_from_config(self.config)
+
+        # Server reachability is probed off the UI thread; widgets read the cached state.
+        self._health = ServerHealthMonitor(self.config, parent=self)
+        self._health.stateChanged.connect(self._on_health_changed)
+        # model downloads stream progress in the background; several can be queued
+        self._pulls = pull_manager_from_config(self.config, parent=self)
+        self._pulls.progress.connect(self._on_pull_progress)
+        self._pulls.finished.connect(self._on_pull_finished)
+        self._pull_labels: dict = {}
+        # model list + /api/show metadata: served from the on-disk cache, refreshed in the background
+        self._meta = ModelMetaCache(self.config, parent=self)
+        self._meta.listed.connect(self._on_models_listed)
+        self._meta.updated.connect(self._on_model_meta)
+        # the picked model is preloaded; LRU models are unloaded to stay under the memory budget
+        self._residency = residency_from_config(self.config, parent=self)
+        self._residency.changed.connect(self._on_resident_changed)
+        self._residency.preloaded.connect(self._on_model_preloaded)
+        self._resident: dict = {}
+
+        # Venv validation runs on a worker pool; rows update as each venv reports back.
+        workers = int(self.config.get("runtimes", {}).get("validate_workers", 4) or 4)
+        self._validator = ValidationScheduler(workers, parent=self)
+        self._validator.result.connect(self._on_venv_validated)
+        self._validator.finished.connect(self._on_validation_batch)
+        self._validation_cbs: dict = {}     # batch id -> callback(results)
+        self._refine_batch = 0
+        self._venv_rows: dict = {}          # venv name -> status QTableWidgetItem
+        # Venv builds run in parallel in the background (shared pip cache); the UI stays usable.
+        self._provisioner = Provisioner(int(self.config.get("runtimes", {}).get("provision_workers", 3) or 3), parent=self)
+        self._provisioner.progress.connect(self._on_provision_progress)
+        self._provisioner.line.connect(self._on_provision_line)
+        self._provisioner.finished.connect(self._on_provision_finished)
 
         self._status = QStatusBar(self); self.setStatusBar(self._status)
         self._build_menu()
@@ -75,9 +126,24 @@ class MainWindow(QMainWindow):
 
         self._wire_shortcuts()
         self._update_status()
+        self._health.start()
+        self._residency.start()
+
+        # venvs created/removed outside the Hub (scripts, other apps) show up without a manual refresh
+        self._reg_venvs: Optional[dict] = None
+        self._registry = RegistryWatcher(EXPECTED, parent=self)
+        self._registry.changed.connect(self._on_registry_changed)
+        self._registry.start()
 
         self._stream_thread: Optional[QThread] = None
         self._stream_worker: Optional[MainWindow._StreamWorker] = None
+        self._coalescer: Optional[ChunkCoalescer] = None
+        self._stream_gen = 0
+        # Streamed text is drained into the view at most once per frame
+        self._flush_timer = QTimer(self)
+        try: self._flush_timer.setInterval(max(1, int(self.config.get("streaming", {}).get("flush_interval_ms", 16))))
+        except Exception: self._flush_timer.setInterval(16)
+        self._flush_timer.timeout.connect(self._flush_stream)
 
         if self.config.get("show_licenses_on_start", True):
             self._open_licenses()
@@ -181,50 +247,33 @@ class MainWindow(QMainWindow):
 
         self._op_log = QTextEdit(); self._op_log.setReadOnly(True); self._op_log.hide()
 
-        def run_script(script_path: str, on_done):
-            dlg = QProgressDialog("Working…", "", 0, 0, self)
-            dlg.setWindowTitle("Installing / Updating")
-            dlg.setCancelButton(None)
-            dlg.setWindowModality(Qt.WindowModality.ApplicationModal)
-            dlg.show()
-            proc = QProcess(self)
-            proc.setProcessChannelMode(QProcess.ProcessChannelMode.MergedChannels)
-            if os.name == "nt":
-                proc.setProgram("powershell"); proc.setArguments(["-ExecutionPolicy","Bypass","-File", script_path])
-            else:
-                proc.setProgram("bash"); proc.setArguments([script_path])
-            proc.readyReadStandardOutput.connect(lambda: self._op_log.insertPlainText(proc.readAllStandardOutput().data().decode("utf-8","ignore")))
-            proc.readyReadStandardError.connect(lambda: self._op_log.insertPlainText(proc.readAllStandardError().data().decode("utf-8","ignore")))
-            def finished(code, status): dlg.close(); on_done(code)
-            proc.finished.connect(finished); proc.start()
-
         def make_run(name, st_item):
             def _run():
-                script = f"scripts/setup_venv_{name}.sh" if os.name != "nt" else f"scripts\\setup_venv_{name}.ps1"
-                if not os.path.exists(script):
-                    QMessageBox.warning(self, "Script missing", f"{script} not found."); return
-                st_item.setText("installing…"); self._op_log.clear(); self._op_log.show()
-                def done(_code):
-                    ok, missing = validate(name) if name in EXPECTED else (is_created(name), [])
-                    st_item.setText("created" if ok else ("missing" if missing == ["_venv_missing_"] else "missing: " + ", ".join(missing)))
-                    QMessageBox.information(self, "Result", f"{name}: {'OK' if ok else 'Missing: ' + ', '.join(missing)}")
-                run_script(script, done)
+                if setup_script(name) is None and not packages_for(name):
+                    QMessageBox.warning(self, "Script missing", f"No setup script for {name}."); return
+                self._op_log.show(); self._provision([name])
             return _run
 
         def make_validate(name):
-            def _val():
-                ok, missing = validate(name) if name in EXPECTED else (is_created(name), [])
+            def report(res):
+                ok, missing = res.get(name, (False, []))
                 if ok: QMessageBox.information(self, "Validate", f"{name}: OK")
                 else:
                     if missing == ["_venv_missing_"]: QMessageBox.warning(self, "Validate", f"{name}: venv not created yet.")
                     else: QMessageBox.warning(self, "Validate", f"{name}: missing imports: {', '.join(missing)}")
+            def _val():
+                st = self._venv_rows.get(name)
+                if st is not None: st.setText("validating…")
+                self._validate_async([name], report)
             return _val
 
         def make_details(name):
             def _det():
                 info = details(name); txt=[]
                 for mod, d in info.items():
-                    if d.get("ok"): txt.append(f"✔ {mod}  —  {d.get('version') or '(version unknown)'}")
+                    if mod == "_python": txt.append(f"🐍 {d.get('info') or d.get('exe', '')}"); continue
+                    took = f"  ({d['import_s']:.2f} s)" if isinstance(d.get("import_s"), (int, float)) else ""
+                    if d.get("ok"): txt.append(f"✔ {mod}  —  {d.get('version') or '(version unknown)'}{took}")
                     else: txt.append(f"✖ {mod}  —  {d.get('error','import failed')}")
                 if not txt: txt=["(no modules defined for this venv)"]
                 _TextDialog(f"{name} — Import details", "\n".join(txt), self).exec()
@@ -238,32 +287,17 @@ class MainWindow(QMainWindow):
                 if n == "embeddings": choices += ["cuda"]
                 choice, ok = QInputDialog.getItem(self, f"{n} backend", "Select:", choices, 0, False)
                 if not ok: return
-                if os.name == "nt":
-                    script = {"cpu":f"scripts\\setup_venv_{n}_cpu.ps1","cuda":f"scripts\\setup_venv_{n}_cuda.ps1","rocm":f"scripts\\setup_venv_{n}_rocm.ps1","intel":f"scripts\\setup_venv_{n}_intel.ps1"}.get(choice)
-                else:
-                    script = {"cpu":f"scripts/setup_venv_{n}_cpu.sh","cuda":f"scripts/setup_venv_{n}_cuda.sh","rocm":f"scripts/setup_venv_{n}_rocm.sh","intel":f"scripts/setup_venv_{n}_intel.sh"}.get(choice)
-                if script and os.path.exists(script):
-                    st_item = table.item(row, 1)
-                    def after(_code):
-                        ok, missing = validate(n) if n in EXPECTED else (is_created(n), [])
-                        st_item.setText("created" if ok else ("missing" if missing == ["_venv_missing_"] else "missing: " + ", ".join(missing)))
-                    self._op_log.clear(); self._op_log.show()
-                    dlg = QProgressDialog("Installing backend…", "", 0, 0, self); dlg.setCancelButton(None); dlg.setWindowModality(Qt.ApplicationModal); dlg.show()
-                    proc = QProcess(self)
-                    if os.name == "nt": proc.setProgram("powershell"); proc.setArguments(["-ExecutionPolicy","Bypass","-File", script])
-                    else: proc.setProgram("bash"); proc.setArguments([script])
-                    proc.setProcessChannelMode(QProcess.MergedChannels)
-                    proc.readyReadStandardOutput.connect(lambda: self._op_log.insertPlainText(proc.readAllStandardOutput().data().decode("utf-8","ignore")))
-                    proc.readyReadStandardError.connect(lambda: self._op_log.insertPlainText(proc.readAllStandardError().data().decode("utf-8","ignore")))
-                    proc.finished.connect(lambda *_: (dlg.close(), after(0))); proc.start()
+                script = setup_script(n, choice)
+                if script is not None:
+                    self._op_log.show(); self._provision([n], scripts={n: script})
                 else:
                     QMessageBox.information(self, "Backend", f"No installer for {n}:{choice} on this OS yet.")
             backend_btn.clicked.connect(_pick_backend); table.setCellWidget(row, 2, backend_btn)
 
             table.setItem(row, 0, QTableWidgetItem(name))
-            ok, missing = validate(name) if name in EXPECTED else (is_created(name), [])
-            status = "created" if ok else ("missing" if missing == ["_venv_missing_"] else f"missing: {', '.join(missing)}")
-            st_item = QTableWidgetItem(status); table.setItem(row, 1, st_item)
+            ok, missing = validate(name, mode="fast")  # metadata only: no interpreter start
+            st_item = QTableWidgetItem(_status_text(ok, missing)); table.setItem(row, 1, st_item)
+            self._venv_rows[name] = st_item
 
             btn_run = QPushButton("Create/Update"); btn_run.clicked.connect(make_run(name, st_item)); table.setCellWidget(row, 3, btn_run)
             btn_val = QPushButton("Validate"); btn_val.clicked.connect(make_validate(name)); table.setCellWidget(row, 4, btn_val)
@@ -271,10 +305,16 @@ class MainWindow(QMainWindow):
             logbtn = QPushButton("Open Log"); logbtn.clicked.connect(lambda _=None: self._op_log.show()); table.setCellWidget(row, 6, logbtn)
 
         table.resizeColumnsToContents(); lay.addWidget(table, 1)
+        # the fast pass above only reads metadata; confirm real imports in the background
+        self._refine_batch = self._validate_async(names)
 
         bottom = QHBoxLayout(); btn_check_all = QPushButton("Check All"); btn_refresh = QPushButton("Refresh Status")
         btn_check_all.clicked.connect(self._check_all_venvs); btn_refresh.clicked.connect(self._refresh_runtime_status)
-        bottom.addWidget(btn_check_all); bottom.addStretch(1); bottom.addWidget(btn_refresh); lay.addLayout(bottom)
+        btn_missing = QPushButton("Create Missing"); btn_missing.setToolTip("Build every venv that does not exist yet, in parallel")
+        btn_missing.clicked.connect(lambda: self._provision([n for n in names if not is_created(n)]))
+        btn_cancel_builds = QPushButton("Cancel Builds"); btn_cancel_builds.clicked.connect(lambda: self._provisioner.cancel())
+        bottom.addWidget(btn_check_all); bottom.addWidget(btn_missing); bottom.addWidget(btn_cancel_builds)
+        bottom.addStretch(1); bottom.addWidget(btn_refresh); lay.addLayout(bottom)
 
         lay.addWidget(self._op_log, 1)
         return w
@@ -306,9 +346,13 @@ class MainWindow(QMainWindow):
         top2.addSpacing(12)
         top2.addWidget(QLabel("Conversation:")); top2.addWidget(self.cmb_conv, 1); top2.addWidget(self.btn_new_conv)
         outer.addLayout(top2)
+        self.lbl_model_info = QLabel(""); self.lbl_model_info.setEnabled(False); outer.addWidget(self.lbl_model_info)
 
         adv = QHBoxLayout(); self.pull_edit = QLineEdit(); self.pull_edit.setPlaceholderText("Advanced: pull model (e.g., qwen2.5:7b)")
-        self.btn_pull = QPushButton("Pull"); adv.addWidget(self.pull_edit, 1); adv.addWidget(self.btn_pull); outer.addLayout(adv)
+        self.btn_pull = QPushButton("Pull"); adv.addWidget(self.pull_edit, 1); adv.addWidget(self.btn_pull)
+        self.btn_pull_cancel = QPushButton("Cancel Pulls"); self.btn_pull_cancel.setEnabled(False); adv.addWidget(self.btn_pull_cancel)
+        outer.addLayout(adv)
+        self.lbl_pull = QLabel(""); self.lbl_pull.setWordWrap(True); self.lbl_pull.hide(); outer.addWidget(self.lbl_pull)
 
         split = QSplitter(Qt.Orientation.Vertical)
         up = QWidget(); up_l = QVBoxLayout(up)
@@ -318,12 +362,14 @@ class MainWindow(QMainWindow):
         self.chk_stream = QCheckBox("Stream"); self.chk_stream.setChecked(True)
         self.chk_md = QCheckBox("Markdown"); self.chk_md.setChecked(True)
         row_opts.addWidget(self.chk_stream); row_opts.addWidget(self.chk_md); row_opts.addStretch(1)
-        self.btn_send = QPushButton("Send (Ctrl+Enter)"); row_opts.addWidget(self.btn_send)
+        self.btn_stop = QPushButton("Stop"); self.btn_stop.setEnabled(False); self.btn_stop.setToolTip("Stop the reply being generated")
+        self.btn_send = QPushButton("Send (Ctrl+Enter)"); row_opts.addWidget(self.btn_stop); row_opts.addWidget(self.btn_send)
 
         up_l.addWidget(self.inp, 1); up_l.addLayout(row_opts)
 
         down = QWidget(); down_l = QVBoxLayout(down)
         self.out = QTextEdit(); self.out.setReadOnly(True); down_l.addWidget(self.out, 1)
+        self._md_view = IncrementalMarkdown(self.out)
 
         split.addWidget(up); split.addWidget(down); outer.addWidget(split, 1)
 
@@ -340,7 +386,9 @@ class MainWindow(QMainWindow):
         self.cmb_model.currentIndexChanged.connect(lambda _: self._on_model_changed())
         self.cmb_conv.currentIndexChanged.connect(lambda _: self._on_conv_changed())
         self.btn_pull.clicked.connect(self._pull_now)
+        self.btn_pull_cancel.clicked.connect(lambda: self._pulls.cancel())
         self.btn_send.clicked.connect(self._send_prompt)
+        self.btn_stop.clicked.connect(self._cancel_stream)
         self.inp.keyPressEvent = self._prompt_keypress(self.inp.keyPressEvent)
 
         self._refresh_server_state(); self._load_models(); self._load_conversations()
@@ -348,17 +396,25 @@ class MainWindow(QMainWindow):
 
     # ===== streaming worker =====
     class _StreamWorker(QObject):
-        chunk = Signal(str); done = Signal(str); error = Signal(str)
-        def __init__(self, model: str, text: str, config: dict | None):
-            super().__init__(); self.model, self.text, self.config = model, text, config
+        """Streams /api/chat into a ChunkCoalescer; the GUI drains it on a frame timer."""
+        # every signal carries the stream generation so the GUI can drop late ones from old streams
+        done = Signal(int, str); error = Signal(int, str); cancelled = Signal(int, str)
+        def __init__(self, gen: int, model: str, messages: list[dict], config: dict | None, coalescer: ChunkCoalescer,
+                     options: dict | None = None):
+            super().__init__(); self.model, self.messages, self.config, self.options = model, messages, config, options
+            self.gen, self.coalescer = gen, coalescer
+            self.stats: dict = {}     # filled from the final 'done' record (prompt_eval_count, …)
+            self.cancel = StreamCancel()
         def run(self):
+            acc: list[str] = []
             try:
-                acc: list[str] = []
-                for piece in prompt_stream_iter(self.model, self.text, config=self.config, options=None, timeout=600):
-                    if piece: acc.append(piece); self.chunk.emit(piece)
-                self.done.emit("".join(acc))
+                for piece in chat_stream_iter(self.model, self.messages, config=self.config, options=self.options,
+                                              stats=self.stats, cancel=self.cancel, timeout=600):
+                    if piece: acc.append(piece); self.coalescer.push(piece)
+                (self.cancelled if self.cancel.cancelled else self.done).emit(self.gen, "".join(acc))
             except Exception as e:
-                self.error.emit(str(e))
+                if self.cancel.cancelled: self.cancelled.emit(self.gen, "".join(acc))
+                else: self.error.emit(self.gen, str(e))
 
     # ===== helpers =====
     def _render_reply_markdown(self, text: str):
@@ -368,22 +424,68 @@ class MainWindow(QMainWindow):
         self.out.setPlainText(text)
 
     def _refresh_server_state(self):
-        ok = server_ok(self.config)
-        self.lbl_srv.setText("Server: ✅ running" if ok else "Server: ❌ not reachable (127.0.0.1:11434)")
-        enabled = bool(ok)
+        """Apply the cached health state to the widgets and ask the monitor for a fresh probe."""
+        st = self._health.state
+        if not st.last_checked: self.lbl_srv.setText("Server: (checking…)")
+        else: self.lbl_srv.setText(f"Server: ✅ {st.label()}" if st.up else f"Server: ❌ {st.label()}")
+        enabled = bool(st.up)
         for w in (self.cmb_model, self.cmb_conv, self.btn_refresh_models, self.btn_pull, self.btn_send, self.btn_delete_model): w.setEnabled(enabled)
-        self._update_status(); return ok
+        self._health.poke()
+        self._update_status(); return st.up
+
+    def _on_health_changed(self, st: HealthState):
+        was_up = getattr(self, "_last_health_up", None)
+        self._last_health_up = st.up
+        if not hasattr(self, "lbl_srv"): return
+        self.lbl_srv.setText(f"Server: ✅ {st.label()}" if st.up else f"Server: ❌ {st.label()}")
+        if was_up == st.up: self._update_status(); return
+        for w in (self.cmb_model, self.cmb_conv, self.btn_refresh_models, self.btn_pull, self.btn_send, self.btn_delete_model): w.setEnabled(st.up)
+        if st.up: self._load_models()
+        else: self._update_status()
 
     def _load_models(self):
+        if not self._health.is_up():
+            self.cmb_model.clear(); self.cmb_model.addItem("(no server)"); self.lbl_model_info.setText(""); return
+        # last known list first (instant), then the live one via _on_models_listed
+        self._fill_models(self._meta.models(), empty="(loading…)")
+        self._meta.refresh(self.config)
+
+    def _fill_models(self, metas: list, empty: str = "(no models yet)"):
+        keep = self._current_model
+        names = [m["name"] for m in metas]
+        self.cmb_model.blockSignals(True)
         self.cmb_model.clear()
-        if not server_ok(self.config): self.cmb_model.addItem("(no server)"); return
-        models = list_models(self.config)
-        if not models: self.cmb_model.addItem("(no models yet)")
-        else:
-            for m in models: self.cmb_model.addItem(m)
-        if self._current_model is None and models:
-            self._current_model = models[0]; self._set_combo_current_text(self.cmb_model, self._current_model)
-        self._update_status()
+        if not names: self.cmb_model.addItem(empty)
+        for i, m in enumerate(metas):
+            self.cmb_model.addItem(m["name"]); self.cmb_model.setItemData(i, describe(m), Qt.ItemDataRole.ToolTipRole)
+        if keep in names: self._set_combo_current_text(self.cmb_model, keep)
+        self.cmb_model.blockSignals(False)
+        # a refill is not a user choice: track the selection, but don't persist it or preload
+        if names: self._current_model = self.cmb_model.currentText()
+        self._show_model_info(); self._update_status()
+
+    def _on_models_listed(self, metas: list):
+        if self._health.is_up(): self._fill_models(metas)
+
+    def _on_model_meta(self, name: str, meta: dict):
+        i = self.cmb_model.findText(name)
+        if i >= 0: self.cmb_model.setItemData(i, describe(meta), Qt.ItemDataRole.ToolTipRole)
+        if name == self.cmb_model.currentText(): self._show_model_info()
+
+    def _show_model_info(self):
+        name = self.cmb_model.currentText()
+        txt = describe(self._meta.get(name)); r = self._resident.get(name)
+        if r:
+            gpu = f", {100 * r['size_vram'] // r['size']}% GPU" if r.get("size") else ""
+            txt += f"  —  loaded ({r['size'] / 1e9:.1f} GB{gpu})"
+        self.lbl_model_info.setText(txt)
+
+    def _on_resident_changed(self, models: list):
+        self._resident = {m["name"]: m for m in models}
+        self._show_model_info()
+
+    def _on_model_preloaded(self, name: str, ok: bool, secs: float):
+        if ok: self._status.showMessage(f"{name} ready ({secs:.1f} s)", 3000)
 
     def _delete_selected_model(self):
         name = self.cmb_model.currentText().strip()
@@ -395,30 +497,34 @@ class MainWindow(QMainWindow):
         else: QMessageBox.warning(self, "Delete", f"Failed: {msg}")
 
     def _load_conversations(self):
-        names = list_conversations() or ["default"]
+        names = self._convs.names() or ["default"]
         self.cmb_conv.clear()
         for n in names: self.cmb_conv.addItem(n)
         self._set_combo_current_text(self.cmb_conv, getattr(self, "_conv_name", "default"))
         self._update_status()
 
     def _new_conv(self):
-        i = 1; existing = set(list_conversations())
+        i = 1; existing = set(self._convs.names())
         while True:
             nm = f"conv_{i}"
             if nm not in existing: break
             i += 1
         self._conv_name = nm
-        save_conversation(nm, {"id": nm, "model": self._current_model, "messages": []})
+        self._convs.save(nm, {"id": nm, "model": self._current_model, "messages": []})
         self._load_conversations()
 
     def _on_model_changed(self):
         self._current_model = self.cmb_model.currentText()
-        data = load_conversation(getattr(self, "_conv_name", "default"))
-        data["model"] = self._current_model; save_conversation(self._conv_name, data); self._update_status()
+        self._convs.update_meta(getattr(self, "_conv_name", "default"), model=self._current_model); self._update_status()
+        self._show_model_info()
+        name = self._current_model or ""
+        if self._health.is_up() and name and not name.startswith("("):
+            self._residency.select(name, size_hint=(self._meta.get(name) or {}).get("size", 0),
+                                   options=self._chat_window(name)[1])   # same num_ctx as chat: no reload
 
     def _on_conv_changed(self):
         self._conv_name = self.cmb_conv.currentText()
-        data = load_conversation(self._conv_name)
+        data = self._convs.get(self._conv_name)
         if data.get("model"): self._set_combo_current_text(self.cmb_model, data["model"])
         self._update_status()
 
@@ -426,83 +532,148 @@ class MainWindow(QMainWindow):
         name = self.pull_edit.text().strip()
         if not name: return
         if not self._maybe_show_model_notice(): return
-        ok, msg = pull_model(name, self.config)
-        QMessageBox.information(self, "Pull", f"{'OK' if ok else 'Failed'}: {msg}")
-        self._load_models()
+        self._pulls.set_config(self.config)
+        if not self._pulls.enqueue(name):
+            self._status.showMessage(f"{name} is already being pulled.", 3000); return
+        self.pull_edit.clear()
+
+    def _on_pull_progress(self, name: str, prog):
+        self._pull_labels[name] = prog.label()
+        active = self._pulls.active()
+        self.lbl_pull.setText("\n".join(self._pull_labels[n] for n in self._pull_labels if n in active or n == name))
+        self.lbl_pull.setVisible(bool(active)); self.btn_pull_cancel.setEnabled(bool(active))
+
+    def _on_pull_finished(self, name: str, ok: bool, msg: str):
+        self._pull_labels.pop(name, None)
+        active = self._pulls.active()
+        self.lbl_pull.setText("\n".join(self._pull_labels[n] for n in active if n in self._pull_labels))
+        self.lbl_pull.setVisible(bool(active)); self.btn_pull_cancel.setEnabled(bool(active))
+        self._status.showMessage(f"Pull {name}: {'OK' if ok else 'failed — ' + msg}", 8000)
+        if ok: self._load_models()
+        elif msg != "cancelled": QMessageBox.warning(self, "Pull", f"{name}: {msg}")
 
     def _send_prompt(self):
-        if not server_ok(self.config):
-            QMessageBox.warning(self, "Ollama", "Server not reachable at 127.0.0.1:11434 (or configured host)."); return
+        if not self._health.is_up():
+            self._health.poke()
+            QMessageBox.warning(self, "Ollama", f"Server not reachable at {self._health.state.host} (or configured host)."); return
         model = (self._current_model or self.cmb_model.currentText()).strip()
         if not model or model.startswith("("):
             QMessageBox.information(self, "Ollama", "Pick a model first."); return
         text = self.inp.toPlainText().strip()
         if not text: return
 
-        # save user message immediately
-        try:
-            data = load_conversation(getattr(self, "_conv_name", "default"))
-            msgs = data.get("messages", []); msgs.append({"role":"user","content":text})
-            data["messages"] = msgs; data["model"] = model; save_conversation(getattr(self, "_conv_name", "default"), data)
+        # save user message immediately; the whole history goes to /api/chat
+        conv = getattr(self, "_conv_name", "default")
+        try: self._convs.append(conv, {"role":"user","content":text}, meta={"model": model})
         except Exception: pass
+        self._residency.touch(model)
+        history = [m for m in self._convs.get(conv).get("messages", []) if not str(m.get("content", "")).startswith("[error]")]
+        if not history: history = [{"role":"user","content":text}]
+        window, options = self._chat_window(model)
+        history = self._budget.select(history, conv, window=window)
 
         self.out.clear()
         if not (getattr(self, "chk_stream", None) and self.chk_stream.isChecked()):
-            ok, resp = prompt(model, text, config=self.config)
+            stats: dict = {}
+            ok, resp = chat(model, history, config=self.config, options=options, stats=stats)
             out = resp if ok else f"[error] {resp}"
             self._render_reply_markdown(out)
-            try:
-                data = load_conversation(getattr(self, "_conv_name", "default"))
-                msgs = data.get("messages", []); msgs.append({"role":"assistant","content":out})
-                data["messages"] = msgs; data["model"] = model; save_conversation(getattr(self, "_conv_name", "default"), data)
+            try: self._convs.append(conv, self._assistant_message(out, stats))
             except Exception: pass
             return
 
         # stream
         self._stop_stream_thread()
+        self._md_view.reset(markdown=bool(getattr(self, "chk_md", None) and self.chk_md.isChecked()))
         self._stream_thread = QThread(self)
-        self._stream_worker = MainWindow._StreamWorker(model, text, self.config)
+        self._coalescer = ChunkCoalescer()
+        self._stream_gen += 1
+        self._stream_worker = MainWindow._StreamWorker(self._stream_gen, model, history, self.config, self._coalescer, options)
         self._stream_worker.moveToThread(self._stream_thread)
         self._stream_thread.started.connect(self._stream_worker.run)
-        self._stream_worker.chunk.connect(self._on_stream_chunk)
         self._stream_worker.done.connect(self._on_stream_done)
         self._stream_worker.error.connect(self._on_stream_error)
-        self._stream_thread.start()
+        self._stream_worker.cancelled.connect(self._on_stream_cancelled)
+        self._stream_thread.start(); self._flush_timer.start(); self.btn_stop.setEnabled(True)
+
+    def _chat_window(self, model: str):
+        """(token budget, request options) for `model`. With known metadata the server is asked
+        for the same num_ctx the history was trimmed to; otherwise the config budget applies."""
+        meta = self._meta.get(model)
+        window = self._budget.window_for(meta)
+        return window, ({"num_ctx": window} if context_window(meta) else None)
+
+    def _flush_stream(self):
+        co = self._coalescer
+        if co is None: return
+        text = co.drain()
+        if not text: return
+        t0 = time.perf_counter()
+        self._on_stream_chunk(text)
+        co.record_flush(time.perf_counter() - t0)
 
     def _on_stream_chunk(self, piece: str):
         try:
-            cur = self.out.textCursor(); cur.movePosition(QTextCursor.End)
-            cur.insertText(piece.replace("\r\n","\n")); self.out.setTextCursor(cur)
+            self._md_view.append(piece)
         except Exception:
             self.out.setPlainText((self.out.toPlainText() or "") + piece)
 
-    def _on_stream_done(self, final_text: str):
+    def _on_stream_done(self, gen: int, final_text: str):
+        if gen != self._stream_gen or self._stream_worker is None: return   # late signal from an old stream
+        # finished blocks are already rendered; only the buffered remainder and open tail remain
+        self._flush_stream(); self._flush_timer.stop()
         try:
-            if getattr(self, "chk_md", None) and self.chk_md.isChecked():
-                self.out.clear(); self.out.setMarkdown(final_text)
-            else:
-                self.out.setPlainText(final_text)
+            self._md_view.finish()
         except Exception:
             self.out.setPlainText(final_text)
+        stats = dict(self._stream_worker.stats) if self._stream_worker is not None else {}
+        if self._coalescer is not None:
+            prefill = f" | prefill {stats['prompt_eval_count']} tok" if "prompt_eval_count" in stats else ""
+            self._status.showMessage(f"Stream: {self._coalescer.stats.summary()}{prefill}", 10000)
         self._stop_stream_thread()
-        try:
-            data = load_conversation(getattr(self, "_conv_name", "default"))
-            msgs = data.get("messages", []); msgs.append({"role":"assistant","content":final_text})
-            data["messages"] = msgs; data["model"] = self._current_model or self.cmb_model.currentText().strip()
-            save_conversation(getattr(self, "_conv_name", "default"), data)
+        try: self._convs.append(getattr(self, "_conv_name", "default"), self._assistant_message(final_text, stats))
         except Exception: pass
 
-    def _on_stream_error(self, err: str):
+    @staticmethod
+    def _assistant_message(text: str, stats: dict) -> dict:
+        """Assistant turn plus the server's token accounting (prompt_eval_count = prefill actually done)."""
+        msg = {"role": "assistant", "content": text}
+        for k in ("prompt_eval_count", "eval_count", "prompt_eval_duration", "eval_duration"):
+            if k in stats: msg[k] = stats[k]
+        return msg
+
+    def _cancel_stream(self):
+        """Stop button: tear down the HTTP stream now; the worker reports back via `cancelled`."""
+        if self._stream_worker is not None:
+            self._stream_worker.cancel.cancel()
+
+    def _on_stream_cancelled(self, gen: int, partial: str):
+        if gen != self._stream_gen or self._stream_worker is None: return
+        self._flush_stream(); self._flush_timer.stop()
+        try: self._md_view.finish(); self.out.append("\n[stopped]")
+        except Exception: pass
+        self._stop_stream_thread()
+        if partial.strip():
+            try: self._convs.append(getattr(self, "_conv_name", "default"), {"role":"assistant","content":partial,"cancelled":True})
+            except Exception: pass
+
+    def _on_stream_error(self, gen: int, err: str):
+        if gen != self._stream_gen or self._stream_worker is None: return
+        self._flush_stream(); self._flush_timer.stop()
         try: self.out.append(f"\n[error] {err}")
         except Exception: pass
         self._stop_stream_thread()
 
     def _stop_stream_thread(self):
+        self._flush_timer.stop()
         try:
+            # closing the socket unblocks the worker at once and stops server-side generation
+            if self._stream_worker is not None: self._stream_worker.cancel.cancel()
             if self._stream_thread is not None:
                 self._stream_thread.quit(); self._stream_thread.wait(2000)
         except Exception: pass
         self._stream_thread = None; self._stream_worker = None
+        if hasattr(self, "btn_stop"): self.btn_stop.setEnabled(False)
 
     def _maybe_show_model_notice(self) -> bool:
         try:
@@ -521,28 +692,80 @@ class MainWindow(QMainWindow):
             return True
 
     # ===== Runtimes helpers =====
+    def _validate_async(self, names, on_done=None, *, force: bool = False) -> int:
+        """Queue deep validation of `names`; rows update as results arrive, on_done(results) at the end."""
+        batch = self._validator.submit(list(names), force=force)
+        if on_done is not None: self._validation_cbs[batch] = on_done
+        return batch
+
+    def _on_venv_validated(self, _batch: int, name: str, ok: bool, missing: list):
+        st_item = self._venv_rows.get(name)
+        if st_item is not None: st_item.setText(_status_text(ok, missing))
+
+    def _on_validation_batch(self, batch: int, results: dict):
+        cb = self._validation_cbs.pop(batch, None)
+        if cb is not None:
+            try: cb(results)
+            except Exception as e: self._status.showMessage(f"Validation: {e}", 5000)
+
+    def _provision(self, names, scripts=None):
+        queued = self._provisioner.submit(list(names), scripts=scripts)
+        if queued: self._status.showMessage(f"Building {len(queued)} venv(s) in the background…", 5000)
+        elif names: self._status.showMessage("Already building.", 3000)
+        else: self._status.showMessage("Nothing to build: every venv exists.", 3000)
+
+    def _on_provision_progress(self, name: str, frac: float, msg: str):
+        st_item = self._venv_rows.get(name)
+        if st_item is not None: st_item.setText(f"installing {frac * 100:.0f}% — {msg}")
+
+    def _on_provision_line(self, name: str, text: str):
+        self._op_log.append(f"[{name}] {text}")
+
+    def _on_provision_finished(self, name: str, ok: bool, msg: str):
+        self._op_log.append(f"[{name}] {'done' if ok else 'FAILED'}: {msg}")
+        st_item = self._venv_rows.get(name)
+        if st_item is not None: st_item.setText("validating…" if ok else f"build failed: {msg}"[:120])
+        if ok: self._validate_async([name], force=True)
+        busy = self._provisioner.active()
+        self._status.showMessage(f"{name}: {msg}" + (f" — still building: {', '.join(busy)}" if busy else ""), 8000)
+        try: rescan_and_update(EXPECTED)
+        except Exception: pass
+
+    def _on_registry_changed(self, reg: dict):
+        venvs = reg.get("venvs", {}) or {}
+        prev, self._reg_venvs = self._reg_venvs, venvs
+        if prev is None: return           # first snapshot: the table was just built
+        moved = [n for n in set(prev) | set(venvs) if prev.get(n) != venvs.get(n) and n in self._venv_rows]
+        for n in moved:
+            self._venv_rows[n].setText(_status_text(*validate(n, mode="fast")))
+        if moved: self._validate_async(moved)
+
     def _refresh_runtime_status(self):
         try: rescan_and_update(EXPECTED)
         except Exception: pass
-        table = getattr(self, "_venv_table", None)
-        if not table: return
-        for row in range(table.rowCount()):
-            name = table.item(row, 0).text(); st_item = table.item(row, 1)
-            if not st_item: continue
-            ok, missing = validate(name) if name in EXPECTED else (is_created(name), [])
-            st_item.setText("created" if ok else ("missing" if missing == ["_venv_missing_"] else f"missing: {', '.join(missing)}"))
+        if not self._venv_rows: return
+        for name, st_item in self._venv_rows.items():
+            ok, missing = validate(name, mode="fast")   # instant metadata pass, refined below
+            st_item.setText(_status_text(ok, missing))
+        self._validator.cancel(self._refine_batch)
+        self._refine_batch = self._validate_async(list(self._venv_rows))
 
     def _check_all_venvs(self):
-        rows = getattr(self, "_venv_table", None).rowCount() if getattr(self, "_venv_table", None) else 0
-        lines = []
-        for r in range(rows):
-            name = self._venv_table.item(r, 0).text()
-            ok, missing = validate(name) if name in EXPECTED else (is_created(name), [])
-            if ok: lines.append(f"{name}: OK")
-            else:
-                if missing == ["_venv_missing_"]: lines.append(f"{name}: venv not created yet")
-                else: lines.append(f"{name}: missing imports: {', '.join(missing)}")
-        _TextDialog("Venv Check — Summary", "\n".join(lines) if lines else "(no rows)", self).exec()
+        names = list(self._venv_rows)
+        if not names:
+            _TextDialog("Venv Check — Summary", "(no rows)", self).exec(); return
+        self._status.showMessage(f"Checking {len(names)} venvs…")
+        def report(results):
+            lines = []
+            for name in names:
+                ok, missing = results.get(name, (False, []))
+                if ok: lines.append(f"{name}: OK")
+                else:
+                    if missing == ["_venv_missing_"]: lines.append(f"{name}: venv not created yet")
+                    else: lines.append(f"{name}: missing imports: {', '.join(missing)}")
+            self._status.clearMessage()
+            _TextDialog("Venv Check — Summary", "\n".join(lines), self).exec()
+        self._validate_async(names, report)
 
     # ===== Shortcuts / Help =====
     def _wire_shortcuts(self):
@@ -574,7 +797,7 @@ class MainWindow(QMainWindow):
         LicenseDialog(self).exec()
 
     def _update_status(self):
-        srv = "Ollama:OK" if server_ok(self.config) else "Ollama:OFF"
+        srv = "Ollama:OK" if self._health.is_up() else "Ollama:OFF"
         model = self._current_model or "(none)"
         conv = getattr(self, "_conv_name", "default")
         self._status.showMessage(f"{srv} | Model: {model} | Conv: {conv} —  Ctrl+O switch, Ctrl+K commands")
@@ -583,7 +806,7 @@ class MainWindow(QMainWindow):
         QuickLLMDialog(self).exec()
 
     def _action_quick_model(self):
-        QuickModelDialog(self).exec()
+        QuickModelDialog(self, ollama_models=self._meta.models()).exec()
 
     def _open_quick_tour(self):
         QuickTour(self).exec()
@@ -617,7 +840,7 @@ class MainWindow(QMainWindow):
         try:
             port = int(self.edit_ollama_port.text()) if hasattr(self, 'edit_ollama_port') else int(self.config.get("ollama_port", 11434))
         except Exception: port = 11434
-        self.config["ollama_port"] = port; save_config(self.config)
+        self.config["ollama_port"] = port; save_config(self.config); self._health.set_config(self.config); self._residency.set_config(self.config)
         env = os.environ.copy(); env["OLLAMA_HOST"] = f"127.0.0.1:{port}"
         if folder:
             try:
@@ -728,6 +951,26 @@ class MainWindow(QMainWindow):
         log("[Ollama] Could not stop the server automatically."); return False
 
 
+    def closeEvent(self, evt):
+        self._stop_stream_thread()
+        try: self._validator.shutdown()
+        except Exception: pass
+        try: self._pulls.shutdown()
+        except Exception: pass
+        try: self._residency.stop()
+        except Exception: pass
+        try: self._registry.stop()
+        except Exception: pass
+        try: self._provisioner.shutdown()
+        except Exception: pass
+        try: shutdown_runtime_host()
+        except Exception: pass
+        try: self._health.stop()
+        except Exception: pass
+        try: self._convs.close()
+        except Exception: pass
+        super().closeEvent(evt)
+
     def _prompt_keypress(self, super_impl):
         """Return a keypress handler that sends on Ctrl+Enter."""
         def handler(evt):
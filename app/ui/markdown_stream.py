@@ -0,0 +1,78 @@
+from __future__ import annotations
+from PySide6.QtGui import (QTextCursor, QTextBlockFormat, QTextCharFormat, QTextDocument,
+                           QTextDocumentFragment)
+from PySide6.QtWidgets import QTextEdit
+from app.core.markdown_blocks import MarkdownBlockSplitter
+
+class IncrementalMarkdown:
+    """
+    Renders a streamed reply into a QTextEdit block by block.
+    Finished blocks are converted to rich text once and never touched again;
+    only the trailing open block is removed and re-rendered on each append.
+    With markdown=False it degrades to a plain-text append.
+    """
+    def __init__(self, edit: QTextEdit, markdown: bool = True):
+        self.edit = edit
+        self.markdown = markdown
+        self._splitter = MarkdownBlockSplitter()
+        self._commit_pos = 0          # document position where the open tail starts
+        self._has_blocks = False
+
+    def reset(self, markdown: bool | None = None) -> None:
+        if markdown is not None:
+            self.markdown = markdown
+        self._splitter = MarkdownBlockSplitter()
+        self._commit_pos = 0; self._has_blocks = False
+        self.edit.clear()
+
+    def append(self, text: str) -> None:
+        if not text:
+            return
+        if not self.markdown:
+            cur = self.edit.textCursor(); cur.movePosition(QTextCursor.End)
+            cur.insertText(text.replace("\r\n", "\n")); self.edit.setTextCursor(cur)
+            return
+        done = self._splitter.feed(text)
+        self._render(done, self._splitter.tail)
+
+    def finish(self) -> None:
+        if self.markdown:
+            self._render(self._splitter.finish(), "")
+
+    # ----- internals -----
+    def _render(self, blocks: list[str], tail: str) -> None:
+        doc = self.edit.document()
+        cur = QTextCursor(doc)
+        cur.beginEditBlock()
+        try:
+            # drop the previously rendered open tail
+            cur.setPosition(min(self._commit_pos, doc.characterCount() - 1))
+            cur.movePosition(QTextCursor.End, QTextCursor.KeepAnchor)
+            cur.removeSelectedText()
+            for b in blocks:
+                self._insert(cur, b)
+            self._commit_pos = cur.position()
+            if tail.strip():
+                self._insert(cur, tail, commit=False)
+        finally:
+            cur.endEditBlock()
+        sb = self.edit.verticalScrollBar()
+        if sb is not None:
+            sb.setValue(sb.maximum())
+
+    def _insert(self, cur: QTextCursor, md: str, commit: bool = True) -> None:
+        cur.movePosition(QTextCursor.End)
+        if self._has_blocks:
+            # fresh, unformatted block so code/list formats do not bleed into the next one
+            cur.insertBlock(QTextBlockFormat(), QTextCharFormat())
+        first = cur.position()
+        src = QTextDocument(); src.setMarkdown(md.strip("\n"))
+        cur.insertFragment(QTextDocumentFragment(src))
+        # the fragment's first block merges into the current one and loses its block format
+        # (code fence, heading level, quote…), so copy it back explicitly
+        fmt = src.firstBlock().blockFormat()
+        if src.firstBlock().textList() is None:
+            head = QTextCursor(self.edit.document()); head.setPosition(first)
+            head.setBlockFormat(fmt)
+        if commit:
+            self._has_blocks = True
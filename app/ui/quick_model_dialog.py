@@ -1,15 +1,16 @@
 from __future__ import annotations
 from PySide6.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QLabel, QLineEdit,
-                               QTextEdit, QPushButton, QComboBox)
+                               QTextEdit, QPushButton, QComboBox, QListWidget, QListWidgetItem)
 from PySide6.QtCore import Qt
 from app.core.model_registry import list_models
+from app.core.model_meta import load_model_meta, describe
 
 class QuickModelDialog(QDialog):
     """
     Placeholder to pick/add a model. No heavy logic here—just a visual anchor so future apps
     know where model selection lives.
     """
-    def __init__(self, parent=None):
+    def __init__(self, parent=None, ollama_models=None):
         super().__init__(parent)
         self.setWindowTitle("Quick Model")
         self.setMinimumSize(520, 380)
@@ -24,6 +25,16 @@ class QuickModelDialog(QDialog):
         row.addWidget(self.handle,1)
         lay.addLayout(row)
 
+        # Installed Ollama models with cached /api/show metadata (no network round-trip)
+        self.installed = QListWidget()
+        for m in (load_model_meta() if ollama_models is None else ollama_models):
+            it = QListWidgetItem(f"{m['name']}    {describe(m)}"); it.setData(Qt.UserRole, m["name"])
+            self.installed.addItem(it)
+        if self.installed.count():
+            lay.addWidget(QLabel("Installed (Ollama):")); lay.addWidget(self.installed, 1)
+            self.installed.itemClicked.connect(self._pick_installed)
+            self.installed.itemDoubleClicked.connect(lambda it: (self._pick_installed(it), self.accept()))
+
         lay.addWidget(QLabel("Notes:"))
         self.notes = QTextEdit(); lay.addWidget(self.notes,1)
 
@@ -40,3 +51,6 @@ class QuickModelDialog(QDialog):
         existing = list_models()
         if existing:
             self.notes.setPlainText("Existing models:\n" + "\n".join(f"- {k}: {v.get('type')}" for k,v in existing.items()))
+
+    def _pick_installed(self, it):
+        self.kind.setCurrentText("ollama"); self.handle.setText(f"ollama:{it.data(Qt.UserRole)}")
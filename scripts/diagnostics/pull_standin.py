@@ -0,0 +1,122 @@
+"""
+Local stand-in for Ollama's streaming /api/pull that serves fake layers, plus a self-check
+of app/core/pull_manager.py against it (progress, drop → retry/resume, bandwidth cap).
+
+  python scripts/diagnostics/pull_standin.py            # run the checks, exit 0/1
+  python scripts/diagnostics/pull_standin.py --serve    # only serve (point OLLAMA_HOST at it)
+
+Model names starting with "drop" lose the connection once halfway through the first layer;
+names starting with "missing" answer with an error record. Progress is kept per name, so a
+re-pull resumes where the previous stream stopped, like the real server's partial blobs.
+"""
+import json, os, sys, threading, time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+LAYERS = {"sha256:layer1": 4_000_000, "sha256:layer2": 1_000_000}
+STEP, DELAY = 100_000, 0.01          # bytes per progress record, seconds between records
+STATE, LOCK = {}, threading.Lock()   # name -> {"done": {digest: bytes}, "drops": n, "requests": n}
+
+class StandIn(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    def log_message(self, *a): pass
+
+    def _line(self, obj) -> None:
+        data = (json.dumps(obj) + "\n").encode()
+        self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data)); self.wfile.flush()
+
+    def do_GET(self):
+        body = json.dumps({"models": []}).encode() if self.path == "/api/tags" else b"{}"
+        self.send_response(200 if self.path == "/api/tags" else 404)
+        self.send_header("Content-Type", "application/json"); self.send_header("Content-Length", str(len(body)))
+        self.end_headers(); self.wfile.write(body)
+
+    def do_POST(self):
+        n = int(self.headers.get("Content-Length", 0))
+        req = json.loads(self.rfile.read(n) or b"{}")
+        name = req.get("model") or req.get("name") or ""
+        if self.path != "/api/pull":
+            self.send_response(404); self.send_header("Content-Length", "0"); self.end_headers(); return
+        with LOCK:
+            st = STATE.setdefault(name, {"done": dict.fromkeys(LAYERS, 0), "drops": int(name.startswith("drop")), "requests": 0})
+            st["requests"] += 1
+        self.send_response(200); self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked"); self.end_headers()
+        try:
+            self._line({"status": "pulling manifest"})
+            if name.startswith("missing"):
+                self._line({"error": "pull model manifest: file does not exist"})
+            else:
+                for digest, total in LAYERS.items():
+                    while st["done"][digest] < total:
+                        time.sleep(DELAY)
+                        st["done"][digest] = min(total, st["done"][digest] + STEP)
+                        self._line({"status": f"pulling {digest[7:19]}", "digest": digest,
+                                    "total": total, "completed": st["done"][digest]})
+                        if st["drops"] and st["done"][digest] >= total // 2:
+                            st["drops"] -= 1
+                            self.connection.shutdown(2); return
+                self._line({"status": "verifying sha256 digest"}); self._line({"status": "success"})
+            self.wfile.write(b"0\r\n\r\n")
+        except OSError:
+            pass   # client went away (cancel / bandwidth cap)
+
+def serve(port: int = 0) -> ThreadingHTTPServer:
+    srv = ThreadingHTTPServer(("127.0.0.1", port), StandIn)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    return srv
+
+def _pull(mgr, app, name: str, timeout: float = 30.0):
+    snaps, done = [], []
+    mgr.progress.connect(lambda n, p: snaps.append(p) if n == name else None)
+    mgr.finished.connect(lambda n, ok, msg: done.append((ok, msg)) if n == name else None)
+    t0 = time.monotonic(); mgr.enqueue(name)
+    while not done and time.monotonic() - t0 < timeout:
+        app.processEvents(); time.sleep(0.01)
+    app.processEvents()
+    return (done[0] if done else (False, "timeout")), snaps, time.monotonic() - t0
+
+def check() -> bool:
+    sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+    from PySide6.QtCore import QCoreApplication
+    from app.core.pull_manager import PullManager
+    app = QCoreApplication.instance() or QCoreApplication([])
+    srv = serve()
+    cfg = {"ollama": {"host": "127.0.0.1", "port": srv.server_address[1]}}
+    total, results = sum(LAYERS.values()), []
+
+    def report(label: str, ok: bool, detail: str) -> None:
+        results.append(ok); print(f"[{'OK' if ok else 'FAIL'}] {label}: {detail}")
+
+    mgr = PullManager(cfg, backoff=0.1, emit_interval=0.05)
+    (ok, msg), snaps, _ = _pull(mgr, app, "plain")
+    report("progress", ok and snaps[-1].completed == total and any(0 < s.fraction < 1 for s in snaps),
+           f"{msg}, {len(snaps)} updates, {snaps[-1].completed if snaps else 0}/{total} bytes")
+
+    (ok, msg), snaps, _ = _pull(mgr, app, "drop-once")
+    seen = [s.completed for s in snaps if s.total]
+    resumed = all(b >= a for a, b in zip(seen, seen[1:]))      # never restarted from zero
+    report("retry/resume", ok and STATE["drop-once"]["requests"] == 2 and resumed,
+           f"{msg}, {STATE['drop-once']['requests']} requests, monotonic progress: {resumed}")
+
+    (ok, msg), _, _ = _pull(mgr, app, "missing-model")
+    report("server error", not ok and "does not exist" in msg, msg)
+    mgr.shutdown()
+
+    cap = 2_000_000                                             # bytes/s; 1 s burst is allowed
+    mgr = PullManager(cfg, max_bps=cap, backoff=0.1, emit_interval=0.05)
+    (ok, msg), _, secs = _pull(mgr, app, "capped")
+    floor = (total - cap) / cap * 0.9
+    report("rate cap", ok and secs >= floor, f"{msg}, {total / 1e6:.0f} MB in {secs:.1f} s (≥ {floor:.1f} s expected)")
+    mgr.shutdown(); srv.shutdown()
+    return all(results)
+
+if __name__ == "__main__":
+    if "--serve" in sys.argv:
+        port = int(sys.argv[sys.argv.index("--serve") + 1]) if len(sys.argv) > sys.argv.index("--serve") + 1 else 11435
+        serve(port); print(f"stand-in /api/pull on 127.0.0.1:{port} (Ctrl+C to stop)")
+        try:
+            while True: time.sleep(3600)
+        except KeyboardInterrupt:
+            pass
+    else:
+        sys.exit(0 if check() else 1)